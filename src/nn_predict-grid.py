@@ -5,12 +5,14 @@
 # Copyright 2020 Franz Brauße <franz.brausse@manchester.ac.uk>
 # See the LICENSE file for terms of distribution.
 
-import datetime, argparse, csv, itertools, json, sys
+import datetime, argparse, csv, itertools, json, os, sys
+import collections, functools, multiprocessing, pickle
 
 from tensorflow.keras.models import load_model
 from tensorflow import keras
 import tensorflow as tf
 
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 
@@ -29,11 +31,13 @@ def safe_ranges(spec, bnds):
 			b = bnds[s['label']]
 			yield i, range(round(b['min']), round(b['max'])+1)
 
+# number of points of the grid itertools.product(*ranges)
+def grid_size(ranges):
+	return functools.reduce(lambda a, b: a*b, map(len, ranges), 1)
+
 def safe_grid(spec, bnds, log = lambda *args: None):
 	ranges = dict(safe_ranges(spec, bnds))
-	import functools
-	log('generating grid with %d entries' %
-	    functools.reduce(lambda a, b: a*b, map(len, ranges.values()), 1))
+	log('generating grid with %d entries' % grid_size(ranges.values()))
 	return pd.DataFrame(itertools.product(*ranges.values()),
 	                    columns=[spec[i]['label'] for i in ranges])
 
@@ -45,6 +49,60 @@ def safe_grid(spec, bnds, log = lambda *args: None):
 	#print(list(data.take(3).as_numpy_iterator()))
 	#print(list(map(lambda r: r[0].shape, data.take(3).as_numpy_iterator())))
 
+# yields the grid itertools.product(*ranges) in blocks of at most block_size
+# points, as DataFrames with the given column labels, starting at grid point
+# start and ending before grid point stop; points are numbered in the order of
+# itertools.product, that is, the last dimension varies fastest. Each block is
+# decoded from the mixed-radix representation of the point numbers, so the
+# full grid is never materialized and enumeration can resume at any offset.
+def safe_grid_blocks(ranges, labels, block_size, start = 0, stop = None):
+	ranges = [np.asarray(r) for r in ranges]
+	n = grid_size(ranges)
+	stop = n if stop is None else min(stop, n)
+	for b in range(start, stop, block_size):
+		idx = np.arange(b, min(b + block_size, stop), dtype=np.int64)
+		cols = []
+		for r in reversed(ranges):
+			cols.append(r[idx % len(r)])
+			idx = idx // len(r)
+		yield pd.DataFrame(dict(zip(labels, reversed(cols))))
+
+# yields the points of the values file in blocks of at most block_size points,
+# skipping the first start points and ending before point stop
+def values_blocks(path, labels, block_size, start = 0, stop = None):
+	for blk in pd.read_csv(path, skiprows=range(1, start + 1), chunksize=block_size,
+	                       nrows=None if stop is None else max(0, stop - start)):
+		yield blk[labels].reset_index(drop=True)
+
+# returns a function mapping a 2D array of scaled inputs to a 2D array of
+# scaled responses; models saved by pickle (.pkl) are expected to provide
+# the sklearn interface predict(), otherwise a keras model is loaded
+def load_predictor(path):
+	if path.endswith('.pkl'):
+		with open(path, 'rb') as f:
+			m = pickle.load(f)
+		return lambda X: np.asarray(m.predict(X)).reshape(len(X), -1)
+	m = load_model(path)
+	return lambda X: m.predict(X, batch_size=1 << 16, workers=0)
+
+# names of the columns of the predictions: responses and the objective
+def pred_names(gen):
+	resps = list(gen['response'])
+	if len(gen['response']) != 1 or gen['objective'] != gen['response'][0]:
+		resps.append(gen['objective'])
+	return resps
+
+# predicts the responses and evaluates the objective on the points of the
+# block, drops the points whose objective is below obj_threshold
+def predict_block(gen, si, so, predict, safe, obj_threshold = None):
+	pred = so.inverse_transform(predict(si.transform(safe)))
+	for j, resp in enumerate(gen['response']):
+		safe[resp] = pred[:,j]
+	if len(gen['response']) != 1 or gen['objective'] != gen['response'][0]:
+		safe[gen['objective']] = safe.eval(gen['objective'])
+	if obj_threshold is not None:
+		safe = safe.query('(%s) >= %s' % (gen['objective'], obj_threshold))
+	return safe
 
 def nn_predict_grid(spec, bnds, gen, model, values, obj_threshold = None,
                     log = lambda *args: None):
@@ -75,6 +133,86 @@ def nn_predict_grid(spec, bnds, gen, model, values, obj_threshold = None,
 	return get_response_features(safe, get_input_names(spec), resps)
 
 
+# state of a worker process of nn_predict_grid_blocks(), set up once per
+# process by _init_worker() to avoid sending the model with every block
+_worker = None
+
+def _init_worker(model_path, spec, bnds, gen, obj_threshold):
+	global _worker
+	si, so = io_scalers(spec, gen, bnds)
+	_worker = (gen, si, so, load_predictor(model_path), obj_threshold)
+
+def _predict_worker_block(safe):
+	return predict_block(*_worker[:4], safe, _worker[4])
+
+# Streaming evaluation of the model on the points yielded by blocks: blocks are
+# predicted in the current process (jobs <= 1) or distributed over jobs worker
+# processes with at most 2*jobs blocks in flight, so memory is bounded by the
+# block size irrespective of the grid size. Yields pairs (n, safe) where n is
+# the number of points in the block and safe are the points of the block that
+# pass obj_threshold, including the predicted responses and the objective, in
+# the order of the blocks.
+def nn_predict_grid_blocks(spec, bnds, gen, model_path, blocks, obj_threshold = None,
+                           jobs = 1):
+	assert gen['pp']['features'] == 'min-max'
+	assert 'objective' in gen
+	if jobs <= 1:
+		_init_worker(model_path, spec, bnds, gen, obj_threshold)
+		for safe in blocks:
+			yield len(safe), _predict_worker_block(safe)
+		return
+	ctx = multiprocessing.get_context('spawn')
+	with ctx.Pool(jobs, initializer=_init_worker,
+	              initargs=(model_path, spec, bnds, gen, obj_threshold)) as pool:
+		pending = collections.deque()
+		for safe in blocks:
+			pending.append((len(safe), pool.apply_async(_predict_worker_block, (safe,))))
+			if len(pending) >= 2 * jobs:
+				n, r = pending.popleft()
+				yield n, r.get()
+		while pending:
+			n, r = pending.popleft()
+			yield n, r.get()
+
+# Consumes the blocks predicted by nn_predict_grid_blocks(): with top_k, only
+# the top_k points with largest objective are kept and written at the end,
+# starting from the points in the output and predicted CSV files written by
+# the run evaluating the points before offset, if any; otherwise the passing
+# points of each block are appended to the output (and predicted) CSV files
+# as soon as the block is evaluated. Progress is logged as the range of
+# evaluated points, to be used with option --offset to resume an interrupted
+# run.
+def save_predicted_blocks(spec, gen, predicted, output, pred_output, top_k = None,
+                          offset = 0, log = lambda *args: None):
+	input_names = get_input_names(spec)
+	resps = pred_names(gen)
+	top = None
+	if top_k is not None and offset > 0 and os.path.exists(output):
+		top = pd.concat([pd.read_csv(output), pd.read_csv(pred_output)], axis=1)
+	done = offset
+	passed = 0
+	header = offset == 0
+	for n, safe in predicted:
+		done += n
+		passed += len(safe)
+		if top_k is not None:
+			top = safe if top is None else pd.concat([top, safe], ignore_index=True)
+			top = top.nlargest(top_k, gen['objective'])
+		elif len(safe) > 0 or header:
+			feat, pred = get_response_features(safe, input_names, resps)
+			feat.to_csv(output, index=False, header=header, mode='w' if header else 'a')
+			if pred_output is not None:
+				pred.to_csv(pred_output, index=False, header=header,
+				            mode='w' if header else 'a')
+			header = False
+		log('evaluated points [%d, %d):' % (offset, done), passed, 'points passed')
+	if top_k is not None and top is not None:
+		feat, pred = get_response_features(top, input_names, resps)
+		feat.to_csv(output, index=False)
+		if pred_output is not None:
+			pred.to_csv(pred_output, index=False)
+
+
 def obj_scaler(gen, resp_bnds, log = lambda *args: None):
 	rng = obj_range(gen, resp_bnds)
 	log('obj range:', rng)
@@ -84,7 +222,8 @@ def obj_scaler(gen, resp_bnds, log = lambda *args: None):
 def parse_args(argv):
 	p = argparse.ArgumentParser(prog=argv[0])
 	p.add_argument('model', metavar='MODEL',
-	               help='Path to serialized NN model')
+	               help='Path to serialized NN model, or to a pickled ' +
+	                    'sklearn model (.pkl)')
 	p.add_argument('-s', '--spec', required=True,
 	               help='Path to .spec file')
 	p.add_argument('-b', '--bounds', required=True,
@@ -102,7 +241,30 @@ def parse_args(argv):
 	p.add_argument('-v', '--values',
 	               help='Optional path to file with points to predict ' +
 	                    '(generate grid otherwise)')
-	return p.parse_args(argv[1:])
+	p.add_argument('-n', '--block-size', type=int, default=0,
+	               help='Evaluate the grid (or values) in blocks of this ' +
+	                    'many points without materializing it; 0 evaluates ' +
+	                    'all points at once (default)')
+	p.add_argument('--offset', type=int, default=0,
+	               help='In block mode, start at this grid point (or row of ' +
+	                    'values), e.g. to resume an interrupted run; ' +
+	                    'results are appended to the output files, or ' +
+	                    'merged with their top-k points with --top-k')
+	p.add_argument('--count', type=int,
+	               help='In block mode, evaluate at most this many points')
+	p.add_argument('-k', '--top-k', type=int,
+	               help='In block mode, only output the top-k points with ' +
+	                    'respect to the objective; requires --output and ' +
+	                    '--predicted when used with --offset')
+	p.add_argument('-j', '--jobs', type=int, default=1,
+	               help='In block mode, number of worker processes to ' +
+	                    'evaluate blocks in parallel')
+	args = p.parse_args(argv[1:])
+	if (args.top_k is not None and args.offset > 0 and
+	    (args.output is sys.stdout or args.predicted is None)):
+		p.error('--top-k with --offset requires --output and --predicted ' +
+		        'files holding the top-k points before the offset')
+	return args
 
 if __name__ == "__main__":
 	args = parse_args(sys.argv)
@@ -122,6 +284,29 @@ if __name__ == "__main__":
 	                log=log)
 	abs_t = sc.denorm(float(args.threshold)) if args.threshold is not None else None
 
+	if args.block_size > 0:
+		stop = None if args.count is None else args.offset + args.count
+		if args.values is None:
+			ranges = dict(safe_ranges(spec, bnds))
+			log('evaluating grid with %d entries in blocks of %d' %
+			    (grid_size(ranges.values()), args.block_size))
+			blocks = safe_grid_blocks(ranges.values(),
+			                          [spec[i]['label'] for i in ranges],
+			                          args.block_size, args.offset, stop)
+		else:
+			blocks = values_blocks(args.values,
+			                       [s['label'] for s in spec
+			                        if s['type'] in ('knob','categorical','input')],
+			                       args.block_size, args.offset, stop)
+		timed(lambda: save_predicted_blocks(spec, gen,
+		                                    nn_predict_grid_blocks(spec, bnds, gen,
+		                                                           args.model, blocks,
+		                                                           abs_t, args.jobs),
+		                                    args.output, args.predicted,
+		                                    args.top_k, args.offset, log=log),
+		      'block-wise prediction', log=log)
+		sys.exit(0)
+
 	model = load_model(args.model)
 	values = (timed(lambda: safe_grid(spec, bnds, log=log),
 	                                  'generating grid', log=log)
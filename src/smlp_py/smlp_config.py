@@ -20,6 +20,7 @@ class SmlpConfig:
         self._DEF_INTERACTIVE_PLOTS = True
         self._DEF_SEED = None
         self._DEF_LOAD_CONFIGURATION = None
+        self._DEF_JOBS = 1
         
         self.config_params_dict = {
             'labeled_data': {'abbr':'data', 'default':self._DEF_LABELED_DATA, 'type':str, 
@@ -34,6 +35,10 @@ class SmlpConfig:
                     '[default: {}]'.format(str(self._DEF_INTERACTIVE_PLOTS))},
             'seed': {'abbr':'seed', 'default':self._DEF_SEED, 'type':int, 
                 'help':'Initial random seed [default {}]'.format(str(self._DEF_SEED))},
+            'jobs': {'abbr':'jobs', 'default':self._DEF_JOBS, 'type':int, 
+                'help':'Number of worker processes to use for independent model exploration tasks, ' +
+                    'such as checking multiple queries or assertions; the results are reported in the ' +
+                    'same order as with a single process [default {}]'.format(str(self._DEF_JOBS))},
             'log_files_prefix': {'abbr':'pref', 'default':self._DEF_LOG_FILE_PREFIX, 'type':str, 
                 'help':'String to be used as prefix for the output files ' + 
                     '[default: {}]'.format(str(self._DEF_LOG_FILE_PREFIX))},
@@ -8,6 +8,9 @@ import numpy as np
 import pandas as pd
 import pickle
 import json
+import hashlib
+import shutil
+import tempfile
 
 #from mrmr import mrmr_regression
 from sklearn.preprocessing import MinMaxScaler
@@ -56,6 +59,12 @@ class SmlpData:
         self._DEF_SCALE_RESPONSES = True
         self._DEF_IMPUTE_RESPONSES = False
         self._DEF_RESPONSE_PLOTS = True # should response values distribution plots be genrated?
+        self._DEF_DATA_CHUNK_SIZE = 0 # number of csv rows read at a time when loading data; 0 means read at once
+        self._data_chunk_size = self._DEF_DATA_CHUNK_SIZE
+        self._DEF_DATA_CACHE = None # directory of the cache of preprocessed training data; None means no caching
+        self._data_cache = self._DEF_DATA_CACHE
+        self._DEF_COMPACT_DTYPES = False # should features be downcast to narrowest integer types and to float32?
+        self._compact_dtypes = self._DEF_COMPACT_DTYPES
         
         # SMLP default values of positive and negative samples in banary responses 
         self.SMLP_NEGATIVE_VALUE = int(0)
@@ -200,6 +209,32 @@ class SmlpData:
                     'multiple responses and different responses have missing values in different samples: ' +
                     'this might be a better alternative compared to dropping rows where at least one response '
                     'has a missing value [default: ' + str(self._DEF_IMPUTE_RESPONSES) + ']'},
+            'data_chunk_size': {'abbr':'data_chunk', 'default':self._DEF_DATA_CHUNK_SIZE, 'type':int,
+                'help':'Number of rows of the input csv file to read at a time during data preprocessing. ' +
+                    'When positive, the data is loaded in chunks of that many rows, and dropping rows with ' +
+                    'missing responses, dropping constant features and imputing missing values are computed ' +
+                    'from per column statistics accumulated over the chunks. The file is parsed twice, one ' +
+                    'chunk at a time, and the numeric and boolean columns of the loaded data are written to ' +
+                    'temporary .npy files next to the report files and memory-mapped, thus loading does not ' +
+                    'keep these columns in memory; non-numeric columns are kept in memory, and later steps ' +
+                    'that transform whole data frames (encoding, scaling, splitting, model training) still ' +
+                    'create in-memory copies. Value 0 means the whole file is read at once ' +
+                    '[default: {}]'.format(str(self._DEF_DATA_CHUNK_SIZE))},
+            'data_cache': {'abbr':'data_cache', 'default':self._DEF_DATA_CACHE, 'type':str,
+                'help':'Directory of a cache of preprocessed training data, shared across runs: the training ' +
+                    'data after preprocessing, feature selection, encoding, scaling and splitting, together with ' +
+                    'the scalers, levels and features dictionaries, is saved there under a key computed from the ' +
+                    'content of the data file and the data processing options, and later runs with the same key ' +
+                    'load it (with the data arrays memory-mapped) instead of processing the data file again. ' +
+                    'Training data is not cached when options train_random_n or train_uniform_n are used. ' +
+                    'Value None means no caching [default: {}]'.format(str(self._DEF_DATA_CACHE))},
+            'compact_dtypes': {'abbr':'compact_dtypes', 'default':self._DEF_COMPACT_DTYPES, 'type':str_to_bool,
+                'help':'Should numeric features be stored in compact types after preprocessing: integer features ' +
+                    '(and float features declared as int in the spec, when all their values are integers) in the ' +
+                    'narrowest integer type holding their values, other float features as float32, and levels ' +
+                    'of categorical features encoded as narrowest integers? Roughly halves the memory used by ' +
+                    'the data and is carried through scaling and model training, at the cost of float32 precision ' +
+                    'of real valued features. Responses are not affected [default: {}]'.format(str(self._DEF_COMPACT_DTYPES))},
             'split_test': {'abbr':'split', 'default':self._DEF_SPLIT_TEST, 'type':float,
                 'help':'Fraction in (0,1] of data samples to split from training data' +
                     ' for testing; when the option value is 1,the dataset will be used ' +
@@ -277,6 +312,20 @@ class SmlpData:
     def set_spec_inst(self, spec_inst):
         self._specInst = spec_inst
     
+    # number of csv rows read at a time in preprocess_data(); 0 means the data is read at once
+    def set_data_chunk_size(self, data_chunk_size:int):
+        if data_chunk_size < 0:
+            raise Exception('Option data_chunk_size must be non-negative')
+        self._data_chunk_size = data_chunk_size
+    
+    # directory of the cache of preprocessed training data, see _data_cache_key()
+    def set_data_cache(self, data_cache:str):
+        self._data_cache = data_cache
+    
+    # should features be stored in compact types, see _compact_feature_dtypes()
+    def set_compact_dtypes(self, compact_dtypes:bool):
+        self._compact_dtypes = compact_dtypes
+    
     @property
     def unscaled_training_features(self):
         return self._X_orig_scale
@@ -372,7 +421,9 @@ class SmlpData:
                 if len(unseen_levels) > 0:
                     unseen_levels_dict[cf] = unseen_levels
                     continue
-            df[cf].replace(lvls, range(len(lvls)), inplace=True)
+            # the codes of levels, in the narrowest integer type; widened when compact types are not used
+            codes = pd.Categorical(df[cf], categories=lvls).codes
+            df[cf] = codes if self._compact_dtypes else codes.astype(np.int64)
 
         if len(unseen_levels_dict.keys()) > 0:
             err_msg = 'Categorical features in new data have lavels not seen in labeled data\n'
@@ -709,13 +760,218 @@ class SmlpData:
         
         return
         
+    # Names of variables declared as integers in the spec; these features are downcast to integer types when
+    # all their values are integers (option compact_dtypes, see _plan_feature_dtypes()).
+    def _int_declared_features(self):
+        if self._specInst is None or self._specInst.spec is None:
+            return []
+        int_tag = self._specInst.get_spec_integer_tag
+        return sorted([col for col, var_dom in self._specInst.get_spec_domain_dict.items() 
+            if var_dom['range'] == int_tag])
+    
+    # Update statistics stats (a dictionary with feature names as keys) used by _plan_feature_dtypes() with the
+    # values of the features feat_names in df, which can be the whole data or a chunk of it. The statistics of a
+    # feature are None if it is not numeric, and otherwise record whether its type is an integer type, whether
+    # all its values are integers, and the min and max of its values (None if it has no values).
+    def _update_feature_dtype_stats(self, stats:dict, df:pd.DataFrame, feat_names:list[str]):
+        for col in feat_names:
+            if col not in df.columns or (col in stats and stats[col] is None):
+                continue
+            if not pd_df_col_is_numeric(df, col):
+                stats[col] = None
+                continue
+            vals = df[col].dropna()
+            is_int = bool(np.issubdtype(vals.dtype, np.integer))
+            col_stats = {'is_int':is_int, 
+                'integral':is_int or bool((np.isfinite(vals) & (vals == np.floor(vals))).all()),
+                'min':vals.min() if len(vals) > 0 else None, 'max':vals.max() if len(vals) > 0 else None}
+            if col in stats:
+                prev = stats[col]
+                col_stats['is_int'] = col_stats['is_int'] and prev['is_int']
+                col_stats['integral'] = col_stats['integral'] and prev['integral']
+                if prev['min'] is not None:
+                    col_stats['min'] = prev['min'] if col_stats['min'] is None else min(prev['min'], col_stats['min'])
+                    col_stats['max'] = prev['max'] if col_stats['max'] is None else max(prev['max'], col_stats['max'])
+            stats[col] = col_stats
+        return stats
+    
+    # Types of numeric features for option compact_dtypes, computed from the statistics collected by 
+    # _update_feature_dtype_stats(): integer features get the narrowest integer type holding their values, 
+    # float features declared as integers in the spec get the narrowest integer type if all their values are 
+    # integers, and other float features get float32. The types only depend on statistics of whole columns, 
+    # thus data loaded in chunks gets the same types as data loaded at once. Responses keep their types since
+    # their types define classification vs regression analysis.
+    def _plan_feature_dtypes(self, stats:dict):
+        int_declared = self._int_declared_features()
+        feat_dtypes = {}
+        for col, col_stats in stats.items():
+            if col_stats is None:
+                continue
+            if col_stats['is_int'] or (col in int_declared and col_stats['integral']):
+                feat_dtypes[col] = np.int64
+                if col_stats['min'] is not None:
+                    for int_type in [np.int8, np.int16, np.int32]:
+                        if np.iinfo(int_type).min <= col_stats['min'] and col_stats['max'] <= np.iinfo(int_type).max:
+                            feat_dtypes[col] = int_type
+                            break
+            else:
+                feat_dtypes[col] = np.float32
+        return feat_dtypes
+    
+    # Downcast features in df (option compact_dtypes) after missing values have been imputed, to the types 
+    # feat_dtypes computed by _plan_feature_dtypes().
+    def _compact_feature_dtypes(self, df:pd.DataFrame, feat_dtypes:dict):
+        for col, dtype in feat_dtypes.items():
+            if col in df.columns:
+                df[col] = df[col].astype(dtype)
+        return df
+    
+    # Chunks of self._data_chunk_size rows of the columns of data_file, after dropping rows where at least one of
+    # the responses drop_na_resp is missing (when drop_na_resp is not None). Yields pairs (chunk, n) where chunk
+    # has the columns in the given order and n is the number of rows dropped from the chunk.
+    def _read_data_chunks(self, data_file:str, columns:list[str], drop_na_resp:list[str]):
+        read_cols = columns if drop_na_resp is None else lists_union_order_preserving_without_duplicates(
+            [columns, drop_na_resp])
+        for chunk in pd.read_csv(data_file, usecols=read_cols, chunksize=self._data_chunk_size):
+            rows_before = chunk.shape[0]
+            if drop_na_resp is not None:
+                chunk = chunk.dropna(subset=drop_na_resp)
+            yield chunk[columns], rows_before - chunk.shape[0]
+    
+    # Chunked counterpart of loading the data in preprocess_data() followed by dropping rows where at least 
+    # one of the responses drop_na_resp is missing (when drop_na_resp is not None), dropping constant columns
+    # not in keep_feat (when keep_feat is not None, that is, in training data) and imputing missing values with 
+    # the most frequent value of the column. The csv file is parsed twice, self._data_chunk_size rows at a time,
+    # and only one chunk is in memory at a time. The first pass finds the number of rows, the type of each column,
+    # the constant columns, the locations of missing values and statistics for types of features feat_names (see 
+    # _plan_feature_dtypes()). The second pass counts the values in columns with missing values to find the most
+    # frequent ones (SimpleImputer breaks ties by taking the smallest value, so do we) and writes the numeric and
+    # boolean columns into .npy files in a temporary directory next to the report files; these files are then
+    # imputed in place and memory-mapped as columns of the returned data, thus are read from disk on demand.
+    # Non-numeric columns are kept in memory. The row index labels are the ones of the whole csv file, and the 
+    # missing values locations are row positions after dropping rows, as in _compute_missing_values_dict().
+    def _load_data_chunks(self, data_file:str, columns:list[str], feat_names:list[str], drop_na_resp:list[str], 
+            keep_feat:list[str], data_version_str:str):
+        # first pass: number of rows, types of columns, constant columns, missing values locations
+        dtype_stats = {}
+        col_dtypes = {}
+        first_vals = {}
+        non_constant = set()
+        missing_vals_dict = {}
+        rows_count = 0
+        rows_dropped = 0
+        for chunk, dropped in self._read_data_chunks(data_file, columns, drop_na_resp):
+            rows_dropped += dropped
+            for col in columns:
+                dtype = chunk[col].dtype
+                if col not in col_dtypes or col_dtypes[col] == dtype:
+                    col_dtypes[col] = dtype
+                elif dtype.kind in 'iuf' and col_dtypes[col].kind in 'iuf':
+                    col_dtypes[col] = np.result_type(col_dtypes[col], dtype)
+                else:
+                    col_dtypes[col] = np.dtype(object)
+                if col in non_constant:
+                    continue
+                unique_vals = chunk[col].dropna().unique()
+                if len(unique_vals) > 1:
+                    non_constant.add(col)
+                elif len(unique_vals) == 1:
+                    if col not in first_vals:
+                        first_vals[col] = unique_vals[0]
+                    elif first_vals[col] != unique_vals[0]:
+                        non_constant.add(col)
+            missing_vals_rows_array, missing_vals_cols_array = np.where(chunk.isna())
+            for ind, col_ind in zip(missing_vals_rows_array, missing_vals_cols_array):
+                missing_vals_dict.setdefault(columns[col_ind], []).append(rows_count + ind)
+            rows_count += chunk.shape[0]
+            if self._compact_dtypes:
+                self._update_feature_dtype_stats(dtype_stats, chunk, feat_names)
+        if rows_dropped > 0:
+            self._data_logger.info(str(rows_dropped) + 
+                ' rows where at least one response is NA have been dropped from ' + str(data_version_str) + ' data')
+        
+        constant_cols_to_drop = []
+        if keep_feat is not None:
+            constant_cols_to_drop = [c for c in columns if c not in non_constant and c not in keep_feat]
+            if len(constant_cols_to_drop) > 0:
+                self._data_logger.info('The following constant features have been droped from ' + 
+                    str(data_version_str) + ' data:')
+                self._data_logger.info(str(constant_cols_to_drop))
+        columns = [c for c in columns if c not in constant_cols_to_drop]
+        missing_vals_dict = dict([(c, inds) for c, inds in missing_vals_dict.items() if c in columns])
+        if rows_count == 0:
+            data = pd.read_csv(data_file, usecols=columns, nrows=0)[columns]
+            return data, constant_cols_to_drop
+        
+        # types of the columns in the returned data; types of features are decided for whole columns,
+        # otherwise types could differ between chunks
+        if self._compact_dtypes:
+            col_dtypes.update(self._plan_feature_dtypes(dtype_stats))
+        
+        # second pass: most frequent values in columns with missing values, numeric and boolean columns are 
+        # written into .npy files (with missing values temporarily replaced by 0), other columns are collected
+        tmp_dir = tempfile.mkdtemp(prefix='.smlp_data_', dir=os.path.dirname(os.path.abspath(self.report_file_prefix)))
+        try:
+            index = np.lib.format.open_memmap(os.path.join(tmp_dir, 'index.npy'), mode='w+', 
+                dtype=np.int64, shape=(rows_count,))
+            col_arrays = {}
+            for k, col in enumerate(columns):
+                if np.dtype(col_dtypes[col]).kind in 'biuf':
+                    col_arrays[col] = np.lib.format.open_memmap(os.path.join(tmp_dir, str(k) + '.npy'), mode='w+',
+                        dtype=col_dtypes[col], shape=(rows_count,))
+                else:
+                    col_arrays[col] = []
+            value_counts = dict([(col, None) for col in missing_vals_dict.keys()])
+            pos = 0
+            for chunk, _ in self._read_data_chunks(data_file, columns, drop_na_resp):
+                n = chunk.shape[0]
+                index[pos:pos+n] = chunk.index
+                for col in columns:
+                    if col in value_counts:
+                        chunk_vc = chunk[col].value_counts()
+                        value_counts[col] = chunk_vc if value_counts[col] is None else \
+                            value_counts[col].add(chunk_vc, fill_value=0)
+                    if isinstance(col_arrays[col], list):
+                        col_arrays[col].append(chunk[col].to_numpy(dtype=object))
+                    elif col in value_counts:
+                        col_arrays[col][pos:pos+n] = chunk[col].fillna(0).to_numpy()
+                    else:
+                        col_arrays[col][pos:pos+n] = chunk[col].to_numpy()
+                pos += n
+            assert pos == rows_count
+        finally:
+            # the files stay readable through the memory maps until these are released
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        
+        # impute missing values at their locations
+        for col in columns:
+            if isinstance(col_arrays[col], list):
+                col_arrays[col] = np.concatenate(col_arrays[col])
+        if len(missing_vals_dict) > 0:
+            for col, inds in missing_vals_dict.items():
+                vc = value_counts[col]
+                if vc is not None and len(vc) > 0:
+                    col_arrays[col][inds] = min(vc.index[vc == vc.max()])
+            with open(self.missing_values_fname, 'w') as f:
+                json.dump(missing_vals_dict, f, indent='\t', cls=np_JSONEncoder)
+            self._missing_vals_dict = missing_vals_dict
+        
+        # copy=False keeps the columns memory-mapped instead of consolidating them into in-memory blocks
+        data = pd.DataFrame(dict([(col, col_arrays[col]) for col in columns]), index=pd.Index(index), copy=False)
+        return data, constant_cols_to_drop
+    
     def preprocess_data(self, data_file:str, feat_names:list[str], resp_names:list[str], feat_names_dict:dict, 
             keep_feat:list[str], impute_resp:bool, data_version_str:str, pos_value:int, neg_value:int, resp_to_bool):
         self._data_logger.info('loading ' + data_version_str + ' data')
-        data = pd.read_csv(data_file)
-        self._data_logger.info('data summary\n' + str(data.describe()))
-        #plot_data_columns(data)
-        self._data_logger.info(data_version_str + ' data\n' + str(data))
+        chunked = self._data_chunk_size > 0
+        if chunked:
+            # only the header is read here, the data is loaded in chunks after the columns are known
+            data = pd.read_csv(data_file, nrows=0)
+        else:
+            data = pd.read_csv(data_file)
+            self._data_logger.info('data summary\n' + str(data.describe()))
+            #plot_data_columns(data)
+            self._data_logger.info(data_version_str + ' data\n' + str(data))
 
         # sanity-check the response names aginst input data
         is_training = data_version_str == 'training'
@@ -738,17 +994,24 @@ class SmlpData:
         
         #print('data\n', data, '\n', 'feat_names', feat_names, 'resp_names', resp_names)
         # extract the required columns in data -- features and responses
-        if is_training or new_labeled:
-            data = data[feat_names + resp_names]
+        columns = feat_names + resp_names if is_training or new_labeled else feat_names
+        if chunked:
+            # rows with missing responses and constant features are dropped and missing values
+            # are imputed while loading the chunks, the same way as done below for the whole data
+            drop_na_resp = resp_names if is_training and not impute_resp else None
+            data, constant_feat = self._load_data_chunks(data_file, columns, feat_names, drop_na_resp,
+                keep_feat if is_training else None, data_version_str)
+            self._data_logger.info('data summary\n' + str(data.describe()))
         else:
-            data = data[feat_names]
+            data = data[columns]
         #print('data 0\n', data)
         
         # in training data, drop all rows where at least one response has a missing value
         if is_training:
-            if not impute_resp:
-                data = self._drop_rows_with_na_in_responses(data, resp_names, 'training'); #print('data 1\n', data)
-            data, constant_feat = self._drop_constant_features(data, keep_feat, 'training'); #print('constant_feat', constant_feat); print('data 2\n', data)
+            if not chunked:
+                if not impute_resp:
+                    data = self._drop_rows_with_na_in_responses(data, resp_names, 'training'); #print('data 1\n', data)
+                data, constant_feat = self._drop_constant_features(data, keep_feat, 'training'); #print('constant_feat', constant_feat); print('data 2\n', data)
             resp_names = [rn for rn in resp_names if not rn in constant_feat]; #print('resp_names', resp_names)
             feat_names = [fn for fn in feat_names if not fn in constant_feat]; #print('feat_names', feat_names)
             for rn in feat_names_dict.keys():
@@ -761,9 +1024,13 @@ class SmlpData:
             #print('feat_names_dict', feat_names_dict)
         # impute missing values; before doing that, save the missing values location information in 
         # self._missing_values_dict and write it out as json file.
-        self._compute_missing_values_dict(data)
-        imp = SimpleImputer(strategy="most_frequent")
-        data[ : ] = imp.fit_transform(data)
+        if not chunked:
+            self._compute_missing_values_dict(data)
+            imp = SimpleImputer(strategy="most_frequent")
+            data[ : ] = imp.fit_transform(data)
+            if self._compact_dtypes:
+                data = self._compact_feature_dtypes(data, 
+                    self._plan_feature_dtypes(self._update_feature_dtype_stats({}, data, feat_names)))
         self._data_logger.info(data_version_str + ' data after imputing missing values\n' + str(data))
 
         # convert columns (feature and responses) of type bool, if any, to object/string type
@@ -956,6 +1223,114 @@ class SmlpData:
         self._data_logger.info('Preparing ' + data_version_str + ' data for modeling: end')
         return res    
                 
+    # Key identifying the training data prepared by _prepare_data_for_modeling(): a hash of the content of the 
+    # data file and of all options that affect the preparation of the data, including the fingerprint of the 
+    # spec (variable types declared in the spec are used by option compact_dtypes).
+    def _data_cache_key(self, data_file, params):
+        h = hashlib.sha256()
+        with open(data_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        h.update(json.dumps(params, default=str).encode())
+        return h.hexdigest()
+    
+    # Load training data prepared by _prepare_data_for_modeling() from the cache entry with key cache_key, 
+    # return None if there is no such entry. Data frames with a single dtype are memory-mapped copy-on-write, 
+    # thus are read from disk on demand and can be modified without affecting the cache.
+    def _load_data_cache(self, cache_key):
+        cache_dir = os.path.join(self._data_cache, cache_key)
+        meta_file = os.path.join(cache_dir, 'meta.pkl')
+        if not os.path.isfile(meta_file):
+            return None
+        self._data_logger.info('Loading preprocessed training data from cache ' + str(cache_dir))
+        with open(meta_file, 'rb') as f:
+            meta = pickle.load(f)
+        frames = {}
+        for name, frame_meta in meta['frames'].items():
+            if frame_meta is None or isinstance(frame_meta, pd.DataFrame):
+                frames[name] = frame_meta
+            else:
+                index, columns, dtype = frame_meta
+                values = np.load(os.path.join(cache_dir, name + '.npy'), mmap_mode='c')
+                assert values.dtype == dtype
+                frames[name] = pd.DataFrame(values, index=index, columns=columns, copy=False)
+        return frames, meta['objects']
+    
+    # Save training data prepared by _prepare_data_for_modeling() as the cache entry with key cache_key. 
+    # Data frames with a single dtype are saved as .npy arrays (to be memory-mapped when loaded), other data 
+    # frames are pickled together with the remaining objects. The entry is written into a temporary directory 
+    # which is then renamed, so that runs sharing the cache never see partially written entries.
+    def _save_data_cache(self, cache_key, frames:dict, objects:dict):
+        cache_dir = os.path.join(self._data_cache, cache_key)
+        if os.path.isdir(cache_dir):
+            return
+        os.makedirs(self._data_cache, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self._data_cache)
+        frames_meta = {}
+        for name, df in frames.items():
+            if df is None or len(set(df.dtypes)) != 1:
+                frames_meta[name] = df
+            else:
+                np.save(os.path.join(tmp_dir, name + '.npy'), df.to_numpy())
+                frames_meta[name] = (df.index, df.columns, df.dtypes.iloc[0])
+        with open(os.path.join(tmp_dir, 'meta.pkl'), 'wb') as f:
+            pickle.dump({'frames': frames_meta, 'objects': objects}, f)
+        try:
+            os.rename(tmp_dir, cache_dir)
+            self._data_logger.info('Saved preprocessed training data into cache ' + str(cache_dir))
+        except OSError:
+            # another run has saved the same entry meanwhile
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    
+    # Cached version of _prepare_data_for_modeling() applied to training data: when the cache directory is
+    # set (option data_cache) and has an entry for the data file and options, the prepared training data
+    # is loaded from it, and the state _prepare_data_for_modeling() leaves in self (unscaled training data,
+    # scalers, missing values) is restored, otherwise the data is prepared and saved in the cache. Random and
+    # uniform sampling of training data (train_random_n, train_uniform_n) draw from the global random generator
+    # seeded with option seed, thus data prepared with sampling is not cached: a cache hit would skip these draws
+    # and change the random state used later, e.g. in model training.
+    def _prepare_training_data_cached(self, data_file:str, split_test:float, feat_names:list[str], 
+            resp_names:list[str], keep_feat:list[str], out_prefix:str, train_first_n:int, train_random_n:int, 
+            train_uniform_n:int, interactive_plots:bool, response_plots:bool, mrmr_features_n:int, pos_value, 
+            neg_value, resp_to_bool, scaler_type:str, scale_features:bool, scale_responses:bool, impute_responses:bool):
+        use_cache = self._data_cache is not None and train_random_n < 1 and train_uniform_n < 1
+        if self._data_cache is not None and not use_cache:
+            self._data_logger.info('Training data sampling is random, preprocessed training data is not cached')
+        if use_cache:
+            cache_key = self._data_cache_key(data_file, [split_test, feat_names, resp_names, keep_feat, 
+                train_first_n, train_random_n, train_uniform_n, mrmr_features_n, pos_value, neg_value, resp_to_bool, 
+                scaler_type, scale_features, scale_responses, impute_responses, self._compact_dtypes, 
+                self._int_declared_features() if self._compact_dtypes else None, self._specInst.get_spec_fingerprint])
+            cached = self._load_data_cache(cache_key)
+            if cached is not None:
+                frames, objects = cached
+                self._X_orig_scale, self._y_orig_scale = frames['X_orig'], frames['y_orig']
+                self._mm_scaler_feat, self._mm_scaler_resp = objects['mm_scaler_feat'], objects['mm_scaler_resp']
+                self._missing_vals_dict = objects['missing_vals_dict']
+                if self._missing_vals_dict is not None:
+                    with open(self.missing_values_fname, 'w') as f:
+                        json.dump(self._missing_vals_dict, f, indent='\t', cls=np_JSONEncoder)
+                if response_plots:
+                    response_distribution_plot(out_prefix, frames['y'], objects['resp_names'], interactive_plots)
+                return frames['X'], frames['y'], frames['X_train'], frames['y_train'], frames['X_test'], \
+                    frames['y_test'], objects['mm_scaler_feat'], objects['mm_scaler_resp'], objects['feat_names'], \
+                    objects['resp_names'], objects['levels_dict'], objects['model_features_dict']
+        
+        res = self._prepare_data_for_modeling(data_file, True, split_test, feat_names, resp_names, keep_feat, 
+            out_prefix, train_first_n, train_random_n, train_uniform_n, interactive_plots, response_plots,
+            mrmr_features_n, pos_value, neg_value, resp_to_bool, scaler_type, 
+            scale_features, scale_responses, impute_responses, None, None, None, None)
+        if use_cache:
+            X, y, X_train, y_train, X_test, y_test, mm_scaler_feat, mm_scaler_resp, \
+                feat_names, resp_names, levels_dict, model_features_dict = res
+            frames = {'X':X, 'y':y, 'X_train':X_train, 'y_train':y_train, 'X_test':X_test, 'y_test':y_test,
+                'X_orig':self._X_orig_scale, 'y_orig':self._y_orig_scale}
+            objects = {'mm_scaler_feat':mm_scaler_feat, 'mm_scaler_resp':mm_scaler_resp, 'feat_names':feat_names, 
+                'resp_names':resp_names, 'levels_dict':levels_dict, 'model_features_dict':model_features_dict,
+                'missing_vals_dict':self._missing_vals_dict}
+            self._save_data_cache(cache_key, frames, objects)
+        return res
+    
     # Process data to prepare components required for training models and prediction, and reporting results in
     # original scale. Supports also prediction and results reporting in origibal scale from saved model
     def process_data(self, report_file_prefix:str, data_file:str, new_data_file:str, is_training:bool, split_test, 
@@ -969,11 +1344,11 @@ class SmlpData:
         if data_file is not None:
             split_test = self._DEF_SPLIT_TEST if split_test is None else split_test
             X, y, X_train, y_train, X_test, y_test, mm_scaler_feat, mm_scaler_resp, \
-            feat_names, resp_names, levels_dict, model_features_dict = self._prepare_data_for_modeling(
-                data_file, True, split_test, feat_names, resp_names, keep_feat, report_file_prefix, 
+            feat_names, resp_names, levels_dict, model_features_dict = self._prepare_training_data_cached(
+                data_file, split_test, feat_names, resp_names, keep_feat, report_file_prefix, 
                 train_first_n, train_random_n, train_uniform_n, interactive_plots, response_plots,
                 mrmr_features_n, pos_value, neg_value, resp_to_bool, scaler_type, 
-                scale_features, scale_responses, impute_responses, None, None, None, None)
+                scale_features, scale_responses, impute_responses)
             
             # santy check that: mm_scaler_feat is not None --> scaler_type != 'none'
             assert not scaler_type == 'none' or mm_scaler_feat is None
@@ -2,7 +2,7 @@
 # This file is part of smlp.
 
 # imports from SMLP modules
-from smlp_py.smlp_logs import SmlpLogger, SmlpTracer
+from smlp_py.smlp_logs import SmlpLogger, SmlpTracer, SmlpTraceWriter
 from smlp_py.smlp_utils import str_to_bool, np_JSONEncoder
 from smlp_py.smlp_models import SmlpModels
 from smlp_py.smlp_data import SmlpData
@@ -17,6 +17,7 @@ from smlp_py.smlp_verify import SmlpVerify
 from smlp_py.smlp_query import SmlpQuery
 from smlp_py.smlp_optimize import SmlpOptimize
 from smlp_py.smlp_refine import SmlpRefine
+from smlp_py.smlp_partition import SmlpPartition
 
 # Combining simulation results, optimization, uncertainty analysis, sequential experiments
 # https://foqus.readthedocs.io/en/3.1.0/chapt_intro/index.html
@@ -46,6 +47,9 @@ class SmlpFlows:
         self.optInst.set_model_terms_inst(self.modelTernaInst)
         self.optInst.set_smlp_query_inst(self.queryInst)
         self.refineInst = SmlpRefine()
+        self.partitionInst = SmlpPartition()
+        self.partitionInst.set_spec_inst(self.specInst)
+        self._argv = argv
         
         # get args
         args_dict = self.modelInst.model_params_dict | \
@@ -61,6 +65,7 @@ class SmlpFlows:
                     self.queryInst.query_params_dict | \
                     self.verifyInst.asrt_params_dict | \
                     self.optInst.opt_params_dict | \
+                    self.partitionInst.partition_params_dict | \
                     self.solverInst.solver_params_dict #| \
                     
         self.args = self.configInst.args_dict_parse(argv, args_dict)
@@ -80,11 +85,15 @@ class SmlpFlows:
         self.verifyInst.set_logger(self.logger)
         self.queryInst.set_logger(self.logger)
         self.refineInst.set_logger(self.logger)
+        self.partitionInst.set_logger(self.logger)
         
         # set report and model files / file prefixes
         self.psgInst.set_report_file_prefix(self.configInst.report_file_prefix)
         self.dataInst.set_report_file_prefix(self.configInst.report_file_prefix)
         self.dataInst.set_model_file_prefix(self.configInst.model_file_prefix)
+        self.dataInst.set_data_chunk_size(self.args.data_chunk_size)
+        self.dataInst.set_data_cache(self.args.data_cache)
+        self.dataInst.set_compact_dtypes(self.args.compact_dtypes)
         self.modelInst.set_report_file_prefix(self.configInst.report_file_prefix)
         self.modelInst.set_model_file_prefix(self.configInst.model_file_prefix)
         self.optInst.set_report_file_prefix(self.configInst.report_file_prefix)
@@ -98,15 +107,28 @@ class SmlpFlows:
         # set spec file / spec and term params
         self.modelTernaInst.set_spec_file(self.args.spec)
         self.modelTernaInst.set_compress_rules(self.args.compress_rules)
+        self.modelTernaInst.set_tree_leaf_tolerance(self.args.tree_leaf_tolerance)
         self.modelTernaInst.set_simplify_terms(self.args.simplify_terms)
         self.modelTernaInst.set_tree_encoding(self.args.tree_encoding)
-        #self.modelTernaInst.set_cache_terms(self.args.cache_terms)
+        self.modelTernaInst.set_nn_encoding(self.args.nn_encoding)
+        self.modelTernaInst.set_nn_relu_bounds(self.args.nn_relu_bounds)
+        self.modelTernaInst.set_cache_terms(self.args.cache_terms, self.args.cache_terms_size)
+        self.modelTernaInst.set_cache_model_terms(self.args.cache_model_terms and 
+            (self.args.use_model or self.args.save_model))
         self.dataInst.set_spec_inst(self.specInst)
         self.specInst.set_radii(self.args.radius_absolute, self.args.radius_relative)
         self.specInst.set_deltas(self.args.delta_absolute, self.args.delta_relative)
+        self.optInst.set_incremental_search(self.args.incremental_search)
+        self.optInst.set_threshold_probes(self.args.threshold_probes)
+        self.optInst.set_jobs(self.args.jobs)
+        self.optInst.set_warm_start(self.args.warm_start)
+        self.optInst.set_lemma_store(self.args.lemma_store)
+        self.queryInst.set_jobs(self.args.jobs)
+        self.verifyInst.set_jobs(self.args.jobs)
         
         # set external solver to SMLP
         self.solverInst.set_solver_path(self.args.solver_path)
+        self.modelTernaInst.set_solver_portfolio(self.solverInst.set_solver_portfolio(self.args.solver_portfolio))
         
         # ML model exploration modes. They require a spec file for model exploration.
         self.model_prediction_modes = ['train', 'predict']
@@ -116,11 +138,19 @@ class SmlpFlows:
         
         # create and set tracer (to profile steps of system/model exploration algorithm)
         if self.args.analytics_mode in self.model_exploration_modes:
-            self.tracer = self.loggerInst.create_logger('smlp_tracer', self.trace_file, 
-                self.args.log_level, self.args.log_mode, self.args.log_time)
+            if self.args.trace_async:
+                trace_file = self.trace_file if self.args.trace_format == 'csv' else \
+                    self.trace_file.removesuffix('.csv') + '.records'
+                self.tracer = SmlpTraceWriter(trace_file, self.args.log_mode, self.args.log_time, 
+                    self.args.trace_format)
+            else:
+                self.tracer = self.loggerInst.create_logger('smlp_tracer', self.trace_file, 
+                    self.args.log_level, self.args.log_mode, self.args.log_time)
             self.optInst.set_tracer(self.tracer, self.args.trace_runtime, 
                 self.args.trace_precision, self.args.trace_anonymize)
             self.queryInst.set_lemma_precision(self.args.lemma_precision)
+            self.queryInst.set_reuse_ce_solver(self.args.reuse_ce_solver)
+            self.queryInst.set_ival_precheck(self.args.ival_precheck)
     
 
     # TODO !!!: is this the right place to define data_fname and new_data_fname and error_file ???
@@ -163,6 +193,19 @@ class SmlpFlows:
         self.logger.info('Executing run_smlp.py script: Start')
         self.logger.info('Running SMLP in mode "{}": Start'.format(args.analytics_mode))
         
+        # partitioned run: the partitions are separate SMLP runs, this run only merges their results
+        if args.partition is not None:
+            results_suffix = '_query_results.json' if args.analytics_mode == 'query' else '_optimization_results.json'
+            def partition_results_file(prefix):
+                return self.configInst.args_get_report_name_prefix(args.labeled_data, prefix, args.output_directory, 
+                    args.new_data, args.model_name, args.doe_spec_file)[0] + results_suffix
+            self.partitionInst.smlp_partition(self._argv, args.spec, args.partition, args.partition_hosts, 
+                args.jobs, args.analytics_mode, args.optimize_pareto, args.log_files_prefix, partition_results_file, 
+                self.configInst.report_file_prefix + results_suffix)
+            self.logger.info('Running SMLP in mode "{}": End'.format(args.analytics_mode))
+            self.logger.info('Executing run_smlp.py script: End')
+            return None
+        
         # extract response and feature names
         if args.analytics_mode in self.supervised_modes:
             if args.response is None:
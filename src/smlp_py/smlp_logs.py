@@ -8,6 +8,12 @@
 
 import os, sys, json
 import logging
+import time
+import queue
+import pickle
+import atexit
+import threading
+from fractions import Fraction
 #print(logging.__path__)
 from smlp_py.smlp_utils import str_to_bool
     
@@ -101,6 +107,8 @@ class SmlpTracer:
         self._DEF_TRACE_RUNTIME = 0 # whether / how many decinal points of runtimes to include in trace
         self._DEF_TRACE_PRECISION = 0 # whether / how many decinal points of fractions approx to include in trace
         self._DEF_TRACE_ANONYMIZE = False
+        self._DEF_TRACE_ASYNC = False
+        self._DEF_TRACE_FORMAT = 'csv'
         self.trace_params_dict = {
             'trace_runtime': {'abbr':'trace_runtime', 'default':str(self._DEF_TRACE_RUNTIME), 'type':int,
                 'help':'Should trace include solver runtimes and what precision to use in terms of number ' +
@@ -111,6 +119,114 @@ class SmlpTracer:
                     '(implying no rounding) [default: {}]'.format(str(self._DEF_TRACE_PRECISION))},
             'trace_anonymize':{'abbr':'trace_anonym', 'default':self._DEF_TRACE_ANONYMIZE, 'type':str_to_bool,
                 'help':'Should anonymized names of system inputs, knobs and outputs be uses in trace log file?' +
-                    '[default: {}]'.format(str(self._DEF_TRACE_ANONYMIZE))}
+                    '[default: {}]'.format(str(self._DEF_TRACE_ANONYMIZE))},
+            'trace_async':{'abbr':'trace_async', 'default':self._DEF_TRACE_ASYNC, 'type':str_to_bool,
+                'help':'Should the trace be written by a background thread, in batches, instead of being written ' +
+                    'synchronously on every solver check? The trace lines are then not echoed to stdout ' +
+                    '[default: {}]'.format(str(self._DEF_TRACE_ASYNC))},
+            'trace_format':{'abbr':'trace_format', 'default':self._DEF_TRACE_FORMAT, 'type':str,
+                'help':'Format of the trace file written when option trace_async is set: "csv" writes the ' +
+                    'usual csv trace file, "records" writes a compact binary file with suffix .records instead, ' +
+                    'which can be converted into the csv trace file using trace_records_to_csv() in module ' +
+                    'smlp_logs [default: {}]'.format(str(self._DEF_TRACE_FORMAT))}
         }
 
+
+# Render trace record (time stamp, message) as a line of the csv trace file, the same way as the tracer 
+# logger created by SmlpLogger.create_logger() does; the message is either a string or a row of values.
+def _trace_record_to_line(record, log_time:bool):
+    t, msg = record
+    if not isinstance(msg, str):
+        msg = ','.join([str(e) for e in msg])
+    if log_time:
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t)) + ' - ' + msg + '\n'
+    return msg + '\n'
+
+# Convert trace file written by SmlpTraceWriter in "records" format into the csv trace file.
+def trace_records_to_csv(records_file:str, csv_file:str, log_time:bool=True):
+    with open(records_file, 'rb') as rf, open(csv_file, 'w') as cf:
+        while True:
+            try:
+                records = pickle.load(rf)
+            except EOFError:
+                break
+            cf.write(''.join([_trace_record_to_line(r, log_time) for r in records]))
+
+# Asynchronous alternative to the tracer logger created by SmlpLogger.create_logger(), with the same info()
+# API for trace lines, plus write_row() for trace lines given as rows of values (which are rendered only by
+# the writer). Lines and rows are put into a queue together with their time stamp, and a background thread 
+# writes them into the trace file in batches, either as csv lines or, in "records" format, as pickled 
+# batches of records. Forked worker processes (see parallel_map()) do not have the writer thread, they 
+# append their records to the trace file directly -- the file is always written in append mode for this.
+class SmlpTraceWriter:
+    _BATCH_SIZE = 1024
+    
+    def __init__(self, trace_file:str, log_mode:str, log_time:bool, trace_format:str):
+        if trace_format not in ['csv', 'records']:
+            raise Exception('Unsupported trace format ' + str(trace_format))
+        self._records = trace_format == 'records'
+        self._file_mode = 'ab' if self._records else 'a'
+        self._trace_file = trace_file
+        self._log_time = log_time
+        if log_mode == 'w':
+            open(trace_file, 'w').close()
+        self._file = open(trace_file, self._file_mode)
+        self._queue = queue.SimpleQueue()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+    
+    def info(self, msg:str):
+        self._put((time.time(), msg))
+    
+    # in "records" format, values other than numbers and strings (like smlp algebraic numbers) are rendered
+    # here, since they cannot be pickled
+    def write_row(self, row):
+        if self._records:
+            row = [e if isinstance(e, (str, int, float, Fraction)) else str(e) for e in row]
+        self._put((time.time(), tuple(row)))
+    
+    def _put(self, record):
+        if os.getpid() != self._pid:
+            with open(self._trace_file, self._file_mode) as f:
+                self._write_batch(f, [record])
+            return
+        self._queue.put(record)
+    
+    def _write_batch(self, f, records):
+        if self._records:
+            pickle.dump(records, f)
+        else:
+            f.write(''.join([_trace_record_to_line(r, self._log_time) for r in records]))
+        f.flush()
+    
+    # the writer thread: waits for a record and writes it together with all records queued meanwhile 
+    # (up to _BATCH_SIZE records), until None is queued by close()
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self._BATCH_SIZE and batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [r for r in batch if r is not None]
+            if len(records) > 0:
+                self._write_batch(self._file, records)
+            if batch[-1] is None:
+                return
+    
+    # write out all queued records and stop the writer thread; called at exit
+    def close(self):
+        if self._thread is None or os.getpid() != self._pid:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+
+
+if __name__ == '__main__':
+    trace_records_to_csv(sys.argv[1], sys.argv[2])
+
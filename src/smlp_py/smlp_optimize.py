@@ -4,7 +4,7 @@
 import smlp
 from smlp_py.smlp_terms import SmlpTerms, ModelTerms, ScalerTerms
 from smlp_py.smlp_query import SmlpQuery
-from smlp_py.smlp_utils import (str_to_bool, np_JSONEncoder)
+from smlp_py.smlp_utils import (str_to_bool, np_JSONEncoder, parallel_map)
             
 from fractions import Fraction
 from decimal import Decimal
@@ -46,6 +46,16 @@ class SmlpOptimize:
         self._DEF_OBJECTIVES_EXPRS = None
         self._DEF_APPROXIMATE_FRACTIONS:bool = True
         self._DEF_FRACTION_PRECISION:int = 64
+        self._DEF_INCREMENTAL_SEARCH:bool = False
+        self._incremental_search = self._DEF_INCREMENTAL_SEARCH
+        self._DEF_THRESHOLD_PROBES:int = 1
+        self._threshold_probes = self._DEF_THRESHOLD_PROBES
+        self._jobs = 1
+        self._DEF_LEMMA_STORE:bool = False
+        self._lemma_store_enabled = self._DEF_LEMMA_STORE
+        self._lemma_store = None
+        self._DEF_WARM_START = None
+        self._warm_start_dict = None
         
         # Formulae alpha, beta, eta are used in single and pareto optimization tasks.
         # They are used to constrain control variables x and response variables y as follows:
@@ -101,7 +111,30 @@ class SmlpOptimize:
                 'help': 'Should solver problem instance vacuity check be performed? ' + 
                     'Vacuity checks whether the constraints are consistent and therefore at least ' +
                     'one satisfiable assignment exist to solver constraints. Relevant in "verify", "query", ' +
-                    '"optimize" and "optsyn" modes [default: ' + str(self._DEF_VACUITY_CHECK) + ']'}
+                    '"optimize" and "optsyn" modes [default: ' + str(self._DEF_VACUITY_CHECK) + ']'},
+            'incremental_search': {'abbr':'incr_search', 'default': self._DEF_INCREMENTAL_SEARCH, 'type':str_to_bool,
+                'help': 'Should a single incremental candidate solver instance be kept alive across the thresholds ' +
+                    'of the bisection search in single objective optimization (and in optimization of the active ' +
+                    'objectives in pareto optimization)? The model, eta and alpha constraints are then added to the ' +
+                    'solver only once, each threshold is checked within a push/pop scope, and the lemmas that remain ' +
+                    'valid for higher thresholds are kept [default: ' + str(self._DEF_INCREMENTAL_SEARCH) + ']'},
+            'threshold_probes': {'abbr':'thresh_probes', 'default':self._DEF_THRESHOLD_PROBES, 'type':int,
+                'help':'Number k of thresholds checked within each iteration of the search for the optimal threshold ' +
+                    'of an objective, once a lower and an upper bound are known. With k > 1, the thresholds split the ' +
+                    'interval between these bounds into k+1 parts of equal length and are checked in parallel, using ' +
+                    'up to the number of processes specified by option "jobs"; the highest proven threshold and the ' +
+                    'lowest disproven one shrink the interval by the factor k+1 in each iteration. With k = 1 bisection ' +
+                    'is performed [default {}]'.format(str(self._DEF_THRESHOLD_PROBES))},
+            'lemma_store': {'abbr':'lemma_store', 'default': self._DEF_LEMMA_STORE, 'type':str_to_bool,
+                'help': 'Should the lemmas learned from counter-examples during pareto optimization be stored and ' +
+                    'reused in later queries of the same run whose objectives thresholds imply the thresholds of the ' +
+                    'query the lemmas were learned from, instead of re-discovering the same counter-examples? ' +
+                    '[default: ' + str(self._DEF_LEMMA_STORE) + ']'},
+            'warm_start': {'abbr':'warm_start', 'default':self._DEF_WARM_START, 'type':str,
+                'help':'Optimization results json file of an earlier run in optimize or optsyn mode (on the same ' +
+                    'or a similar spec and model). The objectives thresholds reported in that file are used as the ' +
+                    'initial guesses for the lower and upper bounds of the objectives, which are checked first and ' +
+                    'are then refined (they are not assumed to hold) [default {}]'.format(str(self._DEF_WARM_START))}
         }
         
         # initialize the fields in the more status dictionary mode_status_dict as unknown/running
@@ -146,6 +179,86 @@ class SmlpOptimize:
     def set_smlp_query_inst(self, smlp_query_inst):
         self._queryInst = smlp_query_inst
     
+    def set_incremental_search(self, incremental_search:bool):
+        self._incremental_search = incremental_search
+    
+    def set_threshold_probes(self, threshold_probes:int):
+        if threshold_probes < 1:
+            raise Exception('Option threshold_probes must be a positive integer')
+        self._threshold_probes = threshold_probes
+    
+    def set_jobs(self, jobs:int):
+        self._jobs = jobs
+    
+    def set_lemma_store(self, lemma_store:bool):
+        self._lemma_store_enabled = lemma_store
+    
+    # The lemma store records the lemmas learned in the queries of a pareto optimization run, together with the
+    # context of the respective query: a dictionary mapping indices i of objectives to pairs (t_i, strict) which
+    # represents the constraints objv_i > t_i (when strict) or objv_i >= t_i on the objectives in that query
+    # (which is their conjunction, together with beta). A lemma excludes candidates whose stability region contains
+    # a counter-example to the query; a counter-example to a query is also a counter-example to any query implying
+    # it, thus the lemma remains valid for such queries. Model, alpha, beta, stability radii and delta are the same
+    # for all queries within a run (eta differs but does not affect the lemmas, it only restricts the candidates).
+    def _lemma_context_implies(self, context:dict, stored_context:dict):
+        for i, (t_stored, strict_stored) in stored_context.items():
+            if i not in context:
+                return False
+            (t, strict) = context[i]
+            if t < t_stored or (t == t_stored and strict_stored and not strict):
+                return False
+        return True
+    
+    # lemmas from the lemma store that are valid for a query with the given context (None if there is no store)
+    def stored_lemmas(self, context:dict):
+        if self._lemma_store is None or context is None:
+            return None
+        return [lemma for (stored_context, lemma) in self._lemma_store 
+            if self._lemma_context_implies(context, stored_context)]
+    
+    def store_lemmas(self, context:dict, lemmas:list):
+        if self._lemma_store is None or context is None or lemmas is None:
+            return
+        for lemma in lemmas:
+            self._lemma_store.append((context, lemma))
+    
+    # load the results of an earlier optimization run; this must be done before the results file of
+    # the current run is written (which might be the same file)
+    def set_warm_start(self, warm_start_file:str):
+        if warm_start_file is None:
+            self._warm_start_dict = None
+            return
+        with open(warm_start_file, 'r') as f:
+            self._warm_start_dict = json.load(f)
+    
+    # Thresholds (lo, up) of objective objv_name reported in the results of an earlier optimization run
+    # (option warm_start), scaled or in the original scale; up is None when it is not reported (e.g., in
+    # results of pareto optimization). Returns None if the results do not contain thresholds for objv_name.
+    def warm_start_thresholds(self, objv_name:str, scaled:bool):
+        if self._warm_start_dict is None or not isinstance(self._warm_start_dict.get(objv_name), dict):
+            return None
+        objv_res = self._warm_start_dict[objv_name]
+        suffix = '_scaled' if scaled else ''
+        if objv_res.get('threshold_lo' + suffix) is not None:
+            # results of optimize_single_objectives()
+            lo = float(objv_res['threshold_lo' + suffix])
+            up = objv_res.get('threshold_up' + suffix)
+        elif objv_res.get('threshold' + suffix) is not None:
+            # results of optimize_pareto_objectives()
+            lo = float(objv_res['threshold' + suffix])
+            up = None
+        else:
+            return None
+        return (lo, None if up is None else float(up))
+    
+    # Initial candidate bounds l0 and u0 for optimize_single_objective() derived from thresholds lo and up of an
+    # earlier run: if up is not known or is not greater than lo, then u0 is set to lo + epsilon. These bounds are
+    # checked before they are used (u0 first), and are adapted as usual when they turn out to be wrong.
+    def warm_start_l0_u0(self, lo:float, up:float, epsilon:float):
+        if up is None or up <= lo:
+            up = lo + epsilon
+        return lo, up
+    
     # record vacuity and best achieved objectives' thresholds while pareto optimization
     # is still in progress
     @property
@@ -251,146 +364,215 @@ class SmlpOptimize:
                 u0 = objv_bounds[orig_objv_name]['max']
             #print('l0', l0, 'u0', u0)
             assert l0 < u0
-
+        
+        # With incremental search, one candidate solver with the model, eta and alpha is used for all thresholds T.
+        # A lemma learned from a counter-example y while checking threshold T excludes candidates whose stability
+        # region contains y, where y violates beta or objv >= T. Such y violates objv >= T' for any T' >= T as well,
+        # therefore the lemma remains valid for all thresholds T' >= T. When threshold T is proven (STABLE_SAT), all
+        # further thresholds are greater than T, and the lemmas learned at T are added to the solver permanently
+        # (outside of the push/pop scope used for checking T); lemmas learned at disproven thresholds are dropped.
+        if self._incremental_search:
+            candidate_solver = self._queryInst.create_candidate_solver(smlp_domain, model_full_term_dict, 
+                eta, alpha, solver_logic)
+        else:
+            candidate_solver = None
+        
+        # context of the query for threshold T in the lemma store (see stored_lemmas()); in pareto optimization
+        # objv_term is the minimum of the active objectives, hence objv_term >= T means objv_i >= T for all of them
+        def lemma_context(T):
+            if self._lemma_store is None or call_info is None:
+                return None
+            return dict([(i, (T, False)) for i in call_info['active_objv']])
+        
+        # Formula checked for threshold T, together with the name and expression used in reports
+        def threshold_query(T):
+            #quer_form = objv_term > smlp.Cnst(T)
+            quer_form = objv_term >= smlp.Cnst(T)
+            quer_expr = '{} >= {}'.format(objv_expr, str(T)) if objv_expr is not None else None
+            quer_name = objv_name + '_' + str(T)
+            quer_and_beta = self._smlpTermsInst.smlp_and(quer_form, beta) if not beta == smlp.true else quer_form
+            return quer_name, quer_expr, quer_and_beta
+        
+        # With k-ary search (threshold_probes k > 1), k thresholds split the interval [l, u] into k+1 parts of
+        # equal length and are checked independently from each other, in up to self._jobs worker processes.
+        # Since terms cannot be sent between processes, the workers return the witnesses as python constants.
+        # The incremental candidate solver is not used for these checks (it cannot be shared by the workers).
+        def probe_threshold(T):
+            quer_name, quer_expr, quer_and_beta = threshold_query(T)
+            quer_res = self._queryInst.query_condition(
+                True, model_full_term_dict, quer_name, quer_expr, quer_and_beta, smlp_domain,
+                eta, alpha, theta_radii_dict, delta, solver_logic, False, sat_approx, sat_precision, 
+                stored_lemmas=self.stored_lemmas(lemma_context(T)))
+            witness = quer_res['witness']
+            if witness is not None:
+                witness = self._smlpTermsInst.witness_term_to_const(witness, False, sat_precision)
+            return (quer_res['query_status'], witness)
+        
         iter_count = 0
         while True:
             #print('top of while loop: l0', l0, 'u0', u0, 'l', l, 'u', u)
             if u == np.inf:
                 (T, u0) = (u0, 2*u0 - l0)
+                thresholds = [T]
             elif l == -np.inf:
                 (T, l0) = (l0, 2*l0 - u0)
+                thresholds = [T]
+            elif self._threshold_probes > 1:
+                k = self._threshold_probes
+                thresholds = [l + (u - l) * (i + 1) / (k + 1) for i in range(k)]
             else:
-                T = (l + u) / 2
-            #quer_form = objv_term > smlp.Cnst(T)
-            quer_form = objv_term >= smlp.Cnst(T)
-            quer_expr = '{} >= {}'.format(objv_expr, str(T)) if objv_expr is not None else None
-            quer_name = objv_name + '_' + str(T)
-            quer_and_beta = self._smlpTermsInst.smlp_and(quer_form, beta) if not beta == smlp.true else quer_form
-            #print('quer_and_beta', quer_and_beta) 'u0_l0_u_l_T'
-            self._opt_tracer.info('objective_thresholds_u0_l0_u_l_T, {} : {} : {} : {} : {}'.format(str(u0),str(l0),str(u),str(l),str(T)))
-            quer_res = self._queryInst.query_condition(
-                True, model_full_term_dict, quer_name, quer_expr, quer_and_beta, smlp_domain,
-                eta, alpha, theta_radii_dict, delta, solver_logic, False, sat_approx, sat_precision)
-            stable_witness_status = quer_res['query_status']
-            stable_witness_terms = quer_res['witness']
-            if stable_witness_status == 'UNSAT':
-                assert T <= u
-                self._opt_logger.info('Decreasing threshold upper bound for objective ' + str(objv_name) + ' from ' + str(u) + ' to ' + str(T))
-                u = T
-                #print('objv_bounds', objv_bounds)
-                # only the last value in P is used, and we want it to contain at least one element even if lower bound
-                # is not emproved within this function -- that is, stable_witness_status is never 'STABLE_SAT'. 
-                # For that reason we update P also in case stable_witness_status == 'UNSAT'. Unlike the case when
-                # stable_witness_status == 'STABLE_SAT', stable_witness_terms here will not include values of objectives
-                # or scaled objectives because these values are taken based on stable witness (stable candidate) which
-                # we don't have in this case. This fact (that stable_witness_terms does not have items with objectives
-                # or scaled objectives names) is used when this function is called from active_objectives_max_min_bounds():
-                # the latter function will extract values (scaled_)threshold_lo/up and replaces the rest by None, which 
-                # info is used to not call the reporting function report_current_thresholds() on the result of 
-                # active_objectives_max_min_bounds() (because the proven lower bound has not improved).
-                if len(P) == 0:
-                    stable_witness_terms = {}
-                    '''
-                    objectives_unscaler_terms_dict = self._scalerTermsInst.feature_unscaler_terms(objv_bounds, [orig_objv_name])
-                    # substitute scaled objective variables with scaled objective terms
-                    # in original objective terms within objectives_unscaler_terms_dict
-                    if objv_expr is not None:
-                        orig_objv_const_term = smlp.subst(objectives_unscaler_terms_dict[orig_objv_name], #objv_term, 
-                            {self._scalerTermsInst._scaled_name(orig_objv_name): objv_witn_val_term})
-                        #print('orig_objv_const_term', orig_objv_const_term)
-                        objv_name_unscaled = self._scalerTermsInst._unscaled_name(objv_name)
-                        if objv_name_unscaled in self.objv_names:
-                            stable_witness_terms[objv_name_unscaled] = orig_objv_const_term 
-                    '''
-                    if l not in [np.inf, -np.inf]:
-                        unscaled_threshold_lo = self._scalerTermsInst.unscale_constant_term(objv_bounds, orig_objv_name, l)
-                        #print('unscaled_threshold_lo: l', l, 'unsc', unscaled_threshold_lo)
-                        stable_witness_terms['threshold_lo_scaled'] = smlp.Cnst(l)
-                        stable_witness_terms['threshold_lo'] = unscaled_threshold_lo
-                    if u not in [np.inf, -np.inf]:
-                        unscaled_threshold_up = self._scalerTermsInst.unscale_constant_term(objv_bounds, orig_objv_name, u)
-                        #print('unscaled_threshold_up: l', l, 'unsc', unscaled_threshold_up)
-                        stable_witness_terms['threshold_up_scaled'] = smlp.Cnst(u)
-                        stable_witness_terms['threshold_up'] = unscaled_threshold_up
+                thresholds = [(l + u) / 2]
+            for T in thresholds:
+                self._opt_tracer.info('objective_thresholds_u0_l0_u_l_T, {} : {} : {} : {} : {}'.format(str(u0),str(l0),str(u),str(l),str(T)))
+            if len(thresholds) == 1:
+                T = thresholds[0]
+                quer_name, quer_expr, quer_and_beta = threshold_query(T)
+                T_context = lemma_context(T)
+                T_lemmas = [] if candidate_solver is not None or T_context is not None else None
+                quer_res = self._queryInst.query_condition(
+                    True, model_full_term_dict, quer_name, quer_expr, quer_and_beta, smlp_domain,
+                    eta, alpha, theta_radii_dict, delta, solver_logic, False, sat_approx, sat_precision, 
+                    candidate_solver, T_lemmas, self.stored_lemmas(T_context))
+                self.store_lemmas(T_context, T_lemmas)
+                if candidate_solver is not None and quer_res['query_status'] == 'STABLE_SAT':
+                    for lemma in T_lemmas:
+                        candidate_solver.add(lemma)
+                probes = [(T, quer_res['query_status'], quer_res['witness'])]
+            else:
+                # only the lowest disproven and the highest proven thresholds are relevant for updating u and l;
+                # u is updated first so that it is reported correctly with the new lower bound l. The lemmas
+                # learned in the worker processes are not added to the lemma store (they cannot be sent back).
+                probe_results = parallel_map(probe_threshold, thresholds, self._jobs)
+                probes = []
+                for (T, (stable_witness_status, _)) in zip(thresholds, probe_results):
+                    if stable_witness_status not in ['UNSAT', 'STABLE_SAT']:
+                        raise Exception('Unsupported value ' + str(stable_witness_status) + ' received from query_conditions')
+                unsat_thresholds = [T for (T, (s, _)) in zip(thresholds, probe_results) if s == 'UNSAT']
+                if len(unsat_thresholds) > 0:
+                    probes.append((min(unsat_thresholds), 'UNSAT', None))
+                sat_probes = [(T, w) for (T, (s, w)) in zip(thresholds, probe_results) if s == 'STABLE_SAT']
+                if len(sat_probes) > 0:
+                    (T, witness) = sat_probes[-1]
+                    probes.append((T, 'STABLE_SAT', self._smlpTermsInst.witness_const_to_term(witness)))
+            for (T, stable_witness_status, stable_witness_terms) in probes:
+                if stable_witness_status == 'UNSAT':
+                    assert T <= u
+                    self._opt_logger.info('Decreasing threshold upper bound for objective ' + str(objv_name) + ' from ' + str(u) + ' to ' + str(T))
+                    u = T
+                    #print('objv_bounds', objv_bounds)
+                    # only the last value in P is used, and we want it to contain at least one element even if lower bound
+                    # is not emproved within this function -- that is, stable_witness_status is never 'STABLE_SAT'. 
+                    # For that reason we update P also in case stable_witness_status == 'UNSAT'. Unlike the case when
+                    # stable_witness_status == 'STABLE_SAT', stable_witness_terms here will not include values of objectives
+                    # or scaled objectives because these values are taken based on stable witness (stable candidate) which
+                    # we don't have in this case. This fact (that stable_witness_terms does not have items with objectives
+                    # or scaled objectives names) is used when this function is called from active_objectives_max_min_bounds():
+                    # the latter function will extract values (scaled_)threshold_lo/up and replaces the rest by None, which 
+                    # info is used to not call the reporting function report_current_thresholds() on the result of 
+                    # active_objectives_max_min_bounds() (because the proven lower bound has not improved).
+                    if len(P) == 0:
+                        stable_witness_terms = {}
+                        '''
+                        objectives_unscaler_terms_dict = self._scalerTermsInst.feature_unscaler_terms(objv_bounds, [orig_objv_name])
+                        # substitute scaled objective variables with scaled objective terms
+                        # in original objective terms within objectives_unscaler_terms_dict
+                        if objv_expr is not None:
+                            orig_objv_const_term = smlp.subst(objectives_unscaler_terms_dict[orig_objv_name], #objv_term, 
+                                {self._scalerTermsInst._scaled_name(orig_objv_name): objv_witn_val_term})
+                            #print('orig_objv_const_term', orig_objv_const_term)
+                            objv_name_unscaled = self._scalerTermsInst._unscaled_name(objv_name)
+                            if objv_name_unscaled in self.objv_names:
+                                stable_witness_terms[objv_name_unscaled] = orig_objv_const_term 
+                        '''
+                        if l not in [np.inf, -np.inf]:
+                            unscaled_threshold_lo = self._scalerTermsInst.unscale_constant_term(objv_bounds, orig_objv_name, l)
+                            #print('unscaled_threshold_lo: l', l, 'unsc', unscaled_threshold_lo)
+                            stable_witness_terms['threshold_lo_scaled'] = smlp.Cnst(l)
+                            stable_witness_terms['threshold_lo'] = unscaled_threshold_lo
+                        if u not in [np.inf, -np.inf]:
+                            unscaled_threshold_up = self._scalerTermsInst.unscale_constant_term(objv_bounds, orig_objv_name, u)
+                            #print('unscaled_threshold_up: l', l, 'unsc', unscaled_threshold_up)
+                            stable_witness_terms['threshold_up_scaled'] = smlp.Cnst(u)
+                            stable_witness_terms['threshold_up'] = unscaled_threshold_up
+                        stable_witness_vals = self._smlpTermsInst.witness_term_to_const(
+                            stable_witness_terms, sat_approx, sat_precision)
+                        P.append(stable_witness_vals)
+                elif stable_witness_status == 'STABLE_SAT':
+                    #self._opt_logger.info('Increasing threshold lower bound for objective ' + str(objv_name) + ' from ' + str(l) + ' to ' + str(T))
+                    update_progress_report = False
+                    if l != -np.inf:
+                        update_progress_report = True
+                    #print('objv_term', objv_term, flush=True); print('stable_witness_terms', stable_witness_terms, flush=True)
+                    l_prev = l # save the value of l, it is for reporting only.
+                    #if objv_expr is not None: # the objective is not a symbolic max_min term, we may need its value, at least to see search progress
+                    objv_witn_val_term = smlp.subst(objv_term, stable_witness_terms); #print('objv_witn_val_term', objv_witn_val_term)
+                    #using objective values as lower bounds is not sound since objective value in sat model is the ceneter-point value 
+                    # and the objective's value is not guaranteed to be a lower bound in entire stability region
+                    #objv_witn_val = self._smlpTermsInst.ground_smlp_expr_to_value(objv_witn_val_term, sat_approx, sat_precision)
+                    #assert objv_witn_val >= T
+                    #l = objv_witn_val
+                    l = T
+                    self._opt_logger.info('Increasing threshold lower bound for objective ' + str(objv_name) + ' from ' + str(l_prev) + ' to ' + str(l))
+                    #if objv_expr is not None:
+                    stable_witness_terms[objv_name] = objv_witn_val_term
+                    if call_info is not None and call_info['update_thresholds'] and update_progress_report:
+                        witness_vals_dict = self._smlpTermsInst.witness_term_to_const(stable_witness_terms, sat_approx,  
+                            sat_precision); #print('witness_vals_dict', witness_vals_dict)
+                        #if objv_name in witness_vals_dict:
+                        del witness_vals_dict[objv_name]; #print('witness_vals_dict after del', witness_vals_dict)
+                        #print('call_info', call_info, 'iter', iter_count)
+                        s = call_info['objv_thresholds']
+                        for i in call_info['active_objv']:
+                            s[i] = l
+                        #print('s for single objv', s)
+                        self.report_current_thresholds(s, witness_vals_dict, self.objv_bounds_dict, self.objv_names, self.objv_exprs, 
+                            False, (call_info['global_iter'], iter_count), scale_objectives)
+                
+                    # Enhancement: could avid computing unscaled_threshold_lo and unscaled_threshold_up in case scale_objectives is True
+                    # and only add fields 'threshold_lo_scaled' and 'threshold_up_scaled' to stable_witness_terms
+                    #print('before updating P: l0', l0, 'u0', u0, 'l', l, 'u', u)
+                    if scale_objectives: 
+                        #print('objv_bounds', objv_bounds)
+                        objectives_unscaler_terms_dict = self._scalerTermsInst.feature_unscaler_terms(objv_bounds, [orig_objv_name])
+                        # substitute scaled objective variables with scaled objective terms
+                        # in original objective terms within objectives_unscaler_terms_dict
+                        if objv_expr is not None:
+                            orig_objv_const_term = smlp.subst(objectives_unscaler_terms_dict[orig_objv_name], #objv_term, 
+                                {self._scalerTermsInst._scaled_name(orig_objv_name): objv_witn_val_term})
+                            #print('orig_objv_const_term', orig_objv_const_term)
+                            objv_name_unscaled = self._scalerTermsInst._unscaled_name(objv_name)
+                            if objv_name_unscaled in self.objv_names:
+                                stable_witness_terms[objv_name_unscaled] = orig_objv_const_term 
+                        if l not in [np.inf, -np.inf]:
+                            unscaled_threshold_lo = self._scalerTermsInst.unscale_constant_term(objv_bounds, orig_objv_name, l)
+                            #print('unscaled_threshold_lo: l', l, 'unsc', unscaled_threshold_lo)
+                            stable_witness_terms['threshold_lo_scaled'] = smlp.Cnst(l)
+                            stable_witness_terms['threshold_lo'] = unscaled_threshold_lo
+                        if u not in [np.inf, -np.inf]:
+                            unscaled_threshold_up = self._scalerTermsInst.unscale_constant_term(objv_bounds, orig_objv_name, u)
+                            #print('unscaled_threshold_up: l', l, 'unsc', unscaled_threshold_up)
+                            stable_witness_terms['threshold_up_scaled'] = smlp.Cnst(u)
+                            stable_witness_terms['threshold_up'] = unscaled_threshold_up
+                    else:
+                        #assert False
+                        if l not in [np.inf, -np.inf]:
+                            stable_witness_terms['threshold_lo'] = smlp.Cnst(l)
+                        if u not in [np.inf, -np.inf]:
+                            stable_witness_terms['threshold_up'] = smlp.Cnst(u)
+                    stable_witness_terms['max_in_data'] = smlp.Cnst(objv_bounds[orig_objv_name]['max'])
+                    stable_witness_terms['min_in_data'] = smlp.Cnst(objv_bounds[orig_objv_name]['min'])
+                    #print('stable_witness_terms', stable_witness_terms, flush=True)
                     stable_witness_vals = self._smlpTermsInst.witness_term_to_const(
                         stable_witness_terms, sat_approx, sat_precision)
-                    P.append(stable_witness_vals)
-            elif stable_witness_status == 'STABLE_SAT':
-                #self._opt_logger.info('Increasing threshold lower bound for objective ' + str(objv_name) + ' from ' + str(l) + ' to ' + str(T))
-                update_progress_report = False
-                if l != -np.inf:
-                    update_progress_report = True
-                #print('objv_term', objv_term, flush=True); print('stable_witness_terms', stable_witness_terms, flush=True)
-                l_prev = l # save the value of l, it is for reporting only.
-                #if objv_expr is not None: # the objective is not a symbolic max_min term, we may need its value, at least to see search progress
-                objv_witn_val_term = smlp.subst(objv_term, stable_witness_terms); #print('objv_witn_val_term', objv_witn_val_term)
-                #using objective values as lower bounds is not sound since objective value in sat model is the ceneter-point value 
-                # and the objective's value is not guaranteed to be a lower bound in entire stability region
-                #objv_witn_val = self._smlpTermsInst.ground_smlp_expr_to_value(objv_witn_val_term, sat_approx, sat_precision)
-                #assert objv_witn_val >= T
-                #l = objv_witn_val
-                l = T
-                self._opt_logger.info('Increasing threshold lower bound for objective ' + str(objv_name) + ' from ' + str(l_prev) + ' to ' + str(l))
-                #if objv_expr is not None:
-                stable_witness_terms[objv_name] = objv_witn_val_term
-                if call_info is not None and call_info['update_thresholds'] and update_progress_report:
-                    witness_vals_dict = self._smlpTermsInst.witness_term_to_const(stable_witness_terms, sat_approx,  
-                        sat_precision); #print('witness_vals_dict', witness_vals_dict)
-                    #if objv_name in witness_vals_dict:
-                    del witness_vals_dict[objv_name]; #print('witness_vals_dict after del', witness_vals_dict)
-                    #print('call_info', call_info, 'iter', iter_count)
-                    s = call_info['objv_thresholds']
-                    for i in call_info['active_objv']:
-                        s[i] = l
-                    #print('s for single objv', s)
-                    self.report_current_thresholds(s, witness_vals_dict, self.objv_bounds_dict, self.objv_names, self.objv_exprs, 
-                        False, (call_info['global_iter'], iter_count), scale_objectives)
                 
-                # Enhancement: could avid computing unscaled_threshold_lo and unscaled_threshold_up in case scale_objectives is True
-                # and only add fields 'threshold_lo_scaled' and 'threshold_up_scaled' to stable_witness_terms
-                #print('before updating P: l0', l0, 'u0', u0, 'l', l, 'u', u)
-                if scale_objectives: 
-                    #print('objv_bounds', objv_bounds)
-                    objectives_unscaler_terms_dict = self._scalerTermsInst.feature_unscaler_terms(objv_bounds, [orig_objv_name])
-                    # substitute scaled objective variables with scaled objective terms
-                    # in original objective terms within objectives_unscaler_terms_dict
-                    if objv_expr is not None:
-                        orig_objv_const_term = smlp.subst(objectives_unscaler_terms_dict[orig_objv_name], #objv_term, 
-                            {self._scalerTermsInst._scaled_name(orig_objv_name): objv_witn_val_term})
-                        #print('orig_objv_const_term', orig_objv_const_term)
-                        objv_name_unscaled = self._scalerTermsInst._unscaled_name(objv_name)
-                        if objv_name_unscaled in self.objv_names:
-                            stable_witness_terms[objv_name_unscaled] = orig_objv_const_term 
-                    if l not in [np.inf, -np.inf]:
-                        unscaled_threshold_lo = self._scalerTermsInst.unscale_constant_term(objv_bounds, orig_objv_name, l)
-                        #print('unscaled_threshold_lo: l', l, 'unsc', unscaled_threshold_lo)
-                        stable_witness_terms['threshold_lo_scaled'] = smlp.Cnst(l)
-                        stable_witness_terms['threshold_lo'] = unscaled_threshold_lo
-                    if u not in [np.inf, -np.inf]:
-                        unscaled_threshold_up = self._scalerTermsInst.unscale_constant_term(objv_bounds, orig_objv_name, u)
-                        #print('unscaled_threshold_up: l', l, 'unsc', unscaled_threshold_up)
-                        stable_witness_terms['threshold_up_scaled'] = smlp.Cnst(u)
-                        stable_witness_terms['threshold_up'] = unscaled_threshold_up
+                    #print('adding to P', (stable_witness_vals, stable_witness_vals[objv_name]))
+                    #P.append((stable_witness_vals, stable_witness_vals[objv_name]))
+                    #if save_trace or l + epsilon > u:
+                    # Enhancement !!! we only use the last element of P -- could override existing last element instead of inserting.
+                    # Inserting is required for profiling which will be implemented soon.
+                    P.append(stable_witness_vals)
                 else:
-                    #assert False
-                    if l not in [np.inf, -np.inf]:
-                        stable_witness_terms['threshold_lo'] = smlp.Cnst(l)
-                    if u not in [np.inf, -np.inf]:
-                        stable_witness_terms['threshold_up'] = smlp.Cnst(u)
-                stable_witness_terms['max_in_data'] = smlp.Cnst(objv_bounds[orig_objv_name]['max'])
-                stable_witness_terms['min_in_data'] = smlp.Cnst(objv_bounds[orig_objv_name]['min'])
-                #print('stable_witness_terms', stable_witness_terms, flush=True)
-                stable_witness_vals = self._smlpTermsInst.witness_term_to_const(
-                    stable_witness_terms, sat_approx, sat_precision)
-                
-                #print('adding to P', (stable_witness_vals, stable_witness_vals[objv_name]))
-                #P.append((stable_witness_vals, stable_witness_vals[objv_name]))
-                #if save_trace or l + epsilon > u:
-                # Enhancement !!! we only use the last element of P -- could override existing last element instead of inserting.
-                # Inserting is required for profiling which will be implemented soon.
-                P.append(stable_witness_vals)
-            else:
-                raise Exception('Unsupported value ' + str(stable_witness_status) + ' received from query_conditions')
+                    raise Exception('Unsupported value ' + str(stable_witness_status) + ' received from query_conditions')
             
             if l + epsilon > u:
                 # false when if l = -np.inf and u = np.inf
@@ -432,17 +614,32 @@ class SmlpOptimize:
             self._modelTermsInst.compute_objectives_terms(objv_names, objv_exprs, objv_bounds_dict, scale_objectives)
         
         # TODO: set sat_approx to False once dump and load with Fractions will work
-        opt_conf = {}
-        for i, (objv_name, objv_term) in enumerate(list(objv_terms_dict.items())):
+        objv_terms_list = list(objv_terms_dict.items())
+        def optimize_objective_i(i):
+            (objv_name, objv_term) = objv_terms_list[i]
             objv_expr = objv_exprs[i]
             if scale_objectives:
                 objv_epsn = epsilon
             else:
                 objv_epsn = self.unscale_relative_constant_val(objv_bounds_dict, objv_names[i], epsilon)
             #print('objv_epsn', objv_epsn)
-            opt_conf[objv_names[i]] = self.optimize_single_objective(model_full_term_dict, objv_name, objv_expr, 
+            warm_start = self.warm_start_thresholds(objv_names[i], scale_objectives)
+            if warm_start is not None:
+                l0, u0 = self.warm_start_l0_u0(*warm_start, objv_epsn)
+                self._opt_logger.info('Warm start of objective ' + str(objv_name) + ' with threshold bounds ' + 
+                    str(l0) + ' and ' + str(u0))
+            else:
+                l0, u0 = None, None
+            return self.optimize_single_objective(model_full_term_dict, objv_name, objv_expr, 
                 objv_term, objv_epsn, smlp_domain, eta, theta_radii_dict, alpha, beta, delta, solver_logic, scale_objectives, objv_names[i], 
-                objv_bounds_dict, None, sat_approx=True, sat_precision=64, save_trace=False); #print('opt_conf', opt_conf)
+                objv_bounds_dict, None, sat_approx=True, sat_precision=64, save_trace=False, l0=l0, u0=u0)
+        
+        # The objectives are optimized independently from each other, thus with multiple jobs they are optimized
+        # in parallel worker processes, each using its own solvers (and copy of the model terms). The results are
+        # collected in the order of the objectives, thus the reported results do not depend on the number of jobs
+        # and on the order in which the jobs complete. Within each worker, thresholds are checked sequentially.
+        opt_conf_list = parallel_map(optimize_objective_i, list(range(len(objv_terms_list))), self._jobs)
+        opt_conf = dict(zip(objv_names, opt_conf_list)); #print('opt_conf', opt_conf)
         self.mode_status_dict['smlp_execution'] = 'completed'
         with open(self.optimization_results_file+'.json', 'w') as f:
             json.dump(opt_conf | self.mode_status_dict, f, indent='\t', cls=np_JSONEncoder)
@@ -503,9 +700,19 @@ class SmlpOptimize:
         # optimize_single_objective() should be set to subset_threshold, otherwise l is set to -inf.
         if len(t_vals) > 0:
             l0 = subset_threshold; l = l0
+            u0 = 1
         else:
-            l0 = 0; l = -np.inf
-        u0 = 1; u = np.inf
+            # with warm start, the min of the thresholds of the objectives in the earlier run (that is, the
+            # threshold common to all objectives) is used as the first guess for the max-min of the objectives
+            warm_starts = [self.warm_start_thresholds(objv_name, scale_objectives) for objv_name in self.objv_names]
+            if len(warm_starts) > 0 and warm_starts.count(None) == 0:
+                l0, u0 = self.warm_start_l0_u0(min([ws[0] for ws in warm_starts]), None, epsilon)
+                self._opt_logger.info('Warm start of objectives ' + str(min_name) + ' with threshold bounds ' + 
+                    str(l0) + ' and ' + str(u0))
+            else:
+                l0 = 0; u0 = 1
+            l = -np.inf
+        u = np.inf
         '''
         if len(t_vals) > 0:
             objv_bounds = {min_name: {'min':subset_threshold, 'max' :1}}
@@ -670,6 +877,9 @@ class SmlpOptimize:
         objv_count = len(objv_names)
         objv_enum = range(objv_count)
         
+        # lemmas learned in the queries of this run, reused in later queries (see stored_lemmas())
+        self._lemma_store = [] if self._lemma_store_enabled else None
+        
         # In this dictionary we record the achieved bounds on fixed objectives (these bounds are not
         # attampted for improvement in future iterations). This dictionary is for sanity check only,
         # implemented by fuction sanity_check_fixed_objv_thresholds().
@@ -772,8 +982,12 @@ class SmlpOptimize:
                     #print('queryform', quer_form)
                     quer_and_beta = self._smlpTermsInst.smlp_and(quer_form, beta) if not beta == smlp.true else quer_form
                     opt_quer_name = 'thresholds_' + '_'.join(str(x) for x in t) + '_check'
+                    quer_context = dict([(i, (t[i], True)) for i in objv_enum]) if self._lemma_store is not None else None
+                    quer_lemmas = [] if quer_context is not None else None
                     quer_res = self._queryInst.query_condition(True, model_full_term_dict, opt_quer_name, 'True', quer_and_beta, 
-                        smlp_domain, eta, alpha, theta_radii_dict, delta, solver_logic, True, sat_approx, sat_precision)
+                        smlp_domain, eta, alpha, theta_radii_dict, delta, solver_logic, True, sat_approx, sat_precision,
+                        None, quer_lemmas, self.stored_lemmas(quer_context))
+                    self.store_lemmas(quer_context, quer_lemmas)
                 #print('quer_res', quer_res)
                 if quer_res['query_status'] != 'STABLE_SAT':
                     self._opt_logger.info('Fixing objective {} at threshold {}...\n'.format(str(j), str(s[j])))
@@ -805,6 +1019,9 @@ class SmlpOptimize:
         
         self.report_current_thresholds(s, witness, objv_bounds_dict, objv_names, objv_exprs, 
             True, (call_n, 'Final'), scale_objectives)
+        if self._lemma_store is not None:
+            self._opt_logger.info('Lemma store contains {} lemmas'.format(len(self._lemma_store)))
+            self._lemma_store = None
         
         self._opt_logger.info('Pareto optimization: End')
         return s
@@ -0,0 +1,199 @@
+# SPDX-License-Identifier: Apache-2.0
+# This file is part of smlp.
+
+import os
+import sys
+import json
+import shlex
+import threading
+import subprocess
+
+from smlp_py.smlp_utils import np_JSONEncoder
+
+# Partitioned model exploration: the knob grids in the spec file are split into sub-grids using
+# SmlpSpec.split_spec(), SMLP is run on each of the resulting sub-spec files (partitions) as a separate
+# process -- locally or on remote hosts over ssh, assuming the current directory is shared with the hosts --
+# and the results of the partitions are merged into the results file of the partitioned run.
+class SmlpPartition:
+    def __init__(self):
+        self._partition_logger = None
+        self._specInst = None
+
+        self._DEF_PARTITION = None
+        self._DEF_PARTITION_HOSTS = None
+        self.partition_params_dict = {
+            'partition': {'abbr':'partition', 'default':self._DEF_PARTITION, 'type':str,
+                'help':'Comma separated list of knob:splits pairs, say p1:2,p2:3, defining a partitioned run ' +
+                    'in modes "optimize", "optsyn" and "query": the grid of each listed knob in the spec file is ' +
+                    'split into the given number of sub-grids, SMLP is run on each combination of sub-grids ' +
+                    '(partition) as a separate process, and the results of the partitions are merged into the ' +
+                    'results file of this run. Up to jobs partitions are run in parallel (see option jobs). ' +
+                    'Use option use_model to avoid training the model in every partition ' +
+                    '[default: {}]'.format(str(self._DEF_PARTITION))},
+            'partition_hosts': {'abbr':'partition_hosts', 'default':self._DEF_PARTITION_HOSTS, 'type':str,
+                'help':'Comma separated list of hosts to run partitions on, over ssh, one partition at a time ' +
+                    'per host; the current directory must be shared with the hosts. When not specified, the ' +
+                    'partitions are run locally [default: {}]'.format(str(self._DEF_PARTITION_HOSTS))}
+        }
+
+    def set_logger(self, logger):
+        self._partition_logger = logger
+
+    def set_spec_inst(self, spec_inst):
+        self._specInst = spec_inst
+
+    # parse value of option partition into lists of knobs and of the respective numbers of splits
+    def parse_partition(self, partition:str):
+        knobs, splits = [], []
+        for knob_splits in partition.split(','):
+            knob, sep, n = knob_splits.rpartition(':')
+            if sep == '' or knob == '' or not n.isdigit() or int(n) < 1:
+                raise Exception('Incorrect knob:splits pair ' + str(knob_splits) + ' in option partition')
+            knobs.append(knob)
+            splits.append(int(n))
+        return knobs, splits
+
+    # command line arguments argv of the current run without the partition options
+    def _argv_without_partition(self, argv:list[str]):
+        options = ['-partition', '--partition', '-partition_hosts', '--partition_hosts']
+        res = []
+        skip = False
+        for arg in argv:
+            if skip:
+                skip = False
+            elif arg in options:
+                skip = True
+            elif arg.split('=', 1)[0] not in options:
+                res.append(arg)
+        return res
+
+    # Run the partitions: partition i runs SMLP with the command line of the current run, except that the
+    # spec file is replaced with the i-th sub-spec file and the prefix of output files gets suffix _part<i>
+    # (argparse takes the last value of repeated options). Each worker thread runs partitions one at a time,
+    # either locally or on its host. Returns the list of exit codes of the partitions.
+    def _run_partitions(self, argv:list[str], spec_files:list[str], prefixes:list[str], jobs:int, hosts:list[str]):
+        base_cmd = [sys.executable] + self._argv_without_partition(argv)
+        cmds = [base_cmd + ['-spec', spec_file, '-pref', prefix] for spec_file, prefix in zip(spec_files, prefixes)]
+        return_codes = [None] * len(cmds)
+        next_partition = iter(range(len(cmds)))
+        lock = threading.Lock()
+
+        def worker(host):
+            while True:
+                with lock:
+                    i = next(next_partition, None)
+                if i is None:
+                    return
+                if host is None:
+                    cmd = cmds[i]
+                else:
+                    cmd = ['ssh', host, 'cd ' + shlex.quote(os.getcwd()) + ' && ' + shlex.join(cmds[i])]
+                self._partition_logger.info('Running partition ' + str(i) + ' (' + str(spec_files[i]) + ')' +
+                    ('' if host is None else ' on host ' + str(host)))
+                return_codes[i] = subprocess.run(cmd, stdout=subprocess.DEVNULL).returncode
+                self._partition_logger.info('Partition ' + str(i) + ' exited with code ' + str(return_codes[i]))
+
+        workers = hosts if hosts is not None else [None] * max(1, min(jobs, len(cmds)))
+        threads = [threading.Thread(target=worker, args=(host,)) for host in workers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return return_codes
+
+    # names of the entries in results of partitions which have field field_name -- objectives or queries
+    def _result_entries(self, results:list[dict], field_name:str):
+        return list(dict.fromkeys([k for res in results if res is not None for k, v in res.items()
+            if isinstance(v, dict) and field_name in v]))
+
+    # Stable optima of single objectives: for each objective, the result of the partition with the greatest
+    # lower bound of the objective's threshold is selected, since the partitions cover the knob grid. The
+    # optimum over the whole grid is only bounded from above by the greatest upper bound of the partitions, 
+    # thus the upper bound of the merged result is taken from the partition with the greatest upper bound.
+    def _merge_single_objective_results(self, results:list[dict], spec_files:list[str]):
+        merged = {}
+        objv_names = self._result_entries(results, 'threshold_lo')
+        for objv_name in objv_names:
+            best = None
+            highest = None
+            for res, spec_file in zip(results, spec_files):
+                if res is None or not isinstance(res.get(objv_name), dict) or 'threshold_lo' not in res[objv_name]:
+                    continue
+                if best is None or float(res[objv_name]['threshold_lo']) > float(best['threshold_lo']):
+                    best = res[objv_name] | {'partition': spec_file}
+                if 'threshold_up' in res[objv_name] and (highest is None or 
+                        float(res[objv_name]['threshold_up']) > float(highest['threshold_up'])):
+                    highest = res[objv_name]
+            if highest is not None:
+                for field_name in ['threshold_up', 'threshold_up_scaled']:
+                    if field_name in highest:
+                        best[field_name] = highest[field_name]
+            merged[objv_name] = best
+        return merged
+
+    # Pareto optimization: the final thresholds of the partitions that are not dominated by final thresholds
+    # of other partitions (all objectives are maximized) form the merged set of pareto points.
+    def _merge_pareto_results(self, results:list[dict], spec_files:list[str]):
+        points = []
+        objv_names = self._result_entries(results, 'threshold')
+        for res, spec_file in zip(results, spec_files):
+            if res is None or not all([isinstance(res.get(o), dict) and 'threshold' in res[o] for o in objv_names]):
+                continue
+            points.append((tuple([float(res[o]['threshold']) for o in objv_names]),
+                dict([(k, v) for k, v in res.items() if isinstance(v, dict)]) | {'partition': spec_file}))
+        def dominated(p, q):
+            return all([a <= b for a, b in zip(p, q)]) and p != q
+        return {'pareto_points': [point for t, point in points if not any([dominated(t, s) for s, _ in points])]}
+
+    # Queries: a query passes if it passes in at least one partition; the witness of the first such partition
+    # is reported. The query is feasible if it is feasible in at least one partition.
+    def _merge_query_results(self, results:list[dict], spec_files:list[str]):
+        merged = {}
+        for quer_name in self._result_entries(results, 'query_status'):
+            quer_res = [(res[quer_name], spec_file) for res, spec_file in zip(results, spec_files)
+                if res is not None and quer_name in res]
+            passed = [(r, spec_file) for r, spec_file in quer_res if r.get('query_status') == 'PASS']
+            if len(passed) > 0:
+                merged[quer_name] = passed[0][0] | {'partition': passed[0][1]}
+            else:
+                merged[quer_name] = {'query_feasible': str(any([r.get('query_feasible') == 'true'
+                    for r, _ in quer_res])).lower(), 'query_stable': 'false', 'query_status': 'FAIL', 'query_result': None}
+        return merged
+
+    # Split the spec file, run the partitions, merge their results and write them into results_file of the run.
+    # Function partition_results_file maps output file prefix of a partition to its results file.
+    def smlp_partition(self, argv:list[str], spec_file:str, partition:str, hosts:str, jobs:int, mode:str,
+            pareto:bool, run_prefix:str, partition_results_file, results_file:str):
+        if mode not in ['optimize', 'optsyn', 'query']:
+            raise Exception('Partitioned runs are not supported in mode ' + str(mode))
+        if spec_file is None:
+            raise Exception('Partitioned runs require a spec file')
+        knobs, splits = self.parse_partition(partition)
+        spec_files = self._specInst.split_spec(spec_file, knobs, splits)
+        prefixes = [('' if run_prefix is None else run_prefix + '_') + 'part' + str(i) for i in range(len(spec_files))]
+        self._partition_logger.info('Running ' + str(len(spec_files)) + ' partitions: ' + str(spec_files))
+        return_codes = self._run_partitions(argv, spec_files, prefixes, jobs,
+            None if hosts is None else hosts.split(','))
+
+        results = []
+        for prefix, return_code in zip(prefixes, return_codes):
+            res_file = partition_results_file(prefix)
+            if return_code != 0 or not os.path.isfile(res_file):
+                results.append(None)
+                continue
+            with open(res_file, 'r') as f:
+                results.append(json.load(f))
+
+        if mode == 'query':
+            merged = self._merge_query_results(results, spec_files)
+        elif pareto:
+            merged = self._merge_pareto_results(results, spec_files)
+        else:
+            merged = self._merge_single_objective_results(results, spec_files)
+        completed = all([res is not None and res.get('smlp_execution') == 'completed' for res in results])
+        merged['partitions'] = dict([(spec_file, 'failed' if res is None else res.get('smlp_execution'))
+            for spec_file, res in zip(spec_files, results)])
+        merged['smlp_execution'] = 'completed' if completed else 'partial'
+        with open(results_file, 'w') as f:
+            json.dump(merged, f, indent='\t', cls=np_JSONEncoder)
+        self._partition_logger.info('Merged results of partitions saved in ' + str(results_file))
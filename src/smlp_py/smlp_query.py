@@ -3,10 +3,11 @@
 
 from fractions import Fraction
 import json
+import os
 
 import smlp
 from smlp_py.smlp_terms import ModelTerms, SmlpTerms
-from smlp_py.smlp_utils import np_JSONEncoder #, str_to_bool
+from smlp_py.smlp_utils import np_JSONEncoder, str_to_bool, parallel_map
 
 
 class SmlpQuery:
@@ -17,6 +18,18 @@ class SmlpQuery:
         self._DEF_QUERY_NAMES = None
         self._DEF_QUERY_EXPRS = None
         self._DEF_LEMMA_PRECISION = 0
+        self._DEF_REUSE_CE_SOLVER = False
+        self._reuse_ce_solver = self._DEF_REUSE_CE_SOLVER
+        self._DEF_IVAL_PRECHECK = False
+        self._ival_precheck = self._DEF_IVAL_PRECHECK
+        self._jobs = 1
+        
+        # incremental counter-example solvers with model terms and alpha already added, shared by all counter-example
+        # searches on the same domain, model terms, alpha and solver logic (see get_counter_example_solver()) 
+        self._ce_solver_pool = []
+        # process that created the solvers in self._ce_solver_pool, and pools inherited from it by worker processes
+        self._ce_solver_pool_pid = os.getpid()
+        self._ce_solver_pools_inherited = []
         
         # keys in the dictionary capturing the results of function self.query_condition()
         self._query_stable = 'stable'
@@ -34,7 +47,17 @@ class SmlpQuery:
             'lemma_precision':{'abbr':'lemma_prec', 'default':self._DEF_LEMMA_PRECISION, 'type':int,
                 'help':'Number of decimals after zero to use when approximating lemmas in model exploration modes. ' +
                     'The default value 0 means that lemmas should not be approximated (full precision should be used ' +
-                    '[default: {}]'.format(str(self._DEF_LEMMA_PRECISION))}
+                    '[default: {}]'.format(str(self._DEF_LEMMA_PRECISION))},
+            'reuse_ce_solver':{'abbr':'reuse_ce', 'default':self._DEF_REUSE_CE_SOLVER, 'type':str_to_bool,
+                'help':'Should counter-example search re-use one incremental solver instance with the model terms ' +
+                    'and alpha constraints, instead of building a new solver for every candidate? The stability ' + 
+                    'region around the candidate and the negated query are then added within a push/pop scope ' +
+                    '[default: {}]'.format(str(self._DEF_REUSE_CE_SOLVER))},
+            'ival_precheck':{'abbr':'ival_precheck', 'default':self._DEF_IVAL_PRECHECK, 'type':str_to_bool,
+                'help':'Should stability of candidates be pre-checked using interval arithmetic before the ' +
+                    'counter-example search? The query is evaluated on the stability region of the knobs around ' +
+                    'the candidate and the ranges of the inputs; the solver is only called when the result is ' +
+                    'inconclusive [default: {}]'.format(str(self._DEF_IVAL_PRECHECK))}
         }
         
         # profiling SMLP run, the steps taken by the algorithm and solver runtimes
@@ -76,6 +99,16 @@ class SmlpQuery:
     def set_lemma_precision(self, lemma_precision):
         self._lemma_precision = lemma_precision
     
+    def set_reuse_ce_solver(self, reuse_ce_solver:bool):
+        self._reuse_ce_solver = reuse_ce_solver
+    
+    def set_ival_precheck(self, ival_precheck:bool):
+        self._ival_precheck = ival_precheck
+    
+    # number of worker processes used to check independent queries / assertions
+    def set_jobs(self, jobs:int):
+        self._jobs = jobs
+    
     @property
     def query_results_file(self):
         assert self.report_file_prefix is not None
@@ -165,17 +198,80 @@ class SmlpQuery:
     #   ! ( theta x y -> alpha y -> beta y /\ obj y >= T ) =
     #   ! ( ! theta x y \/ ! alpha y \/ beta y /\ obj y >= T ) =
     #   theta x y /\ alpha y /\ ! ( beta y /\ obj y >= T) 
+    # When ce_solver is None, a new solver is built for the counter-example search; otherwise ce_solver must be
+    # a solver returned by get_counter_example_solver() for the same domain, model terms and alpha, and theta and
+    # the negated query are added to it within a push/pop scope.
     def find_candidate_counter_example(self, universal, domain:smlp.domain, cand:dict, query:smlp.form2, 
-            model_full_term_dict:dict, alpha:smlp.form2, theta_radii_dict:dict, solver_logic:str): #, beta:smlp.form2
+            model_full_term_dict:dict, alpha:smlp.form2, theta_radii_dict:dict, solver_logic:str, ce_solver=None): #, beta:smlp.form2
+        theta = self._modelTermsInst.compute_stability_formula_theta(cand, None, theta_radii_dict, universal) 
+        if ce_solver is not None:
+            ce_solver.push()
+            try:
+                ce_solver.add(theta)
+                ce_solver.add(self._smlpTermsInst.smlp_not(query))
+                return self._modelTermsInst.smlp_solver_check(ce_solver, 'ce', self._lemma_precision)
+            finally:
+                ce_solver.pop()
         solver = self._modelTermsInst.create_model_exploration_instance_from_smlp_components(
             domain, model_full_term_dict, False, solver_logic)
-        theta = self._modelTermsInst.compute_stability_formula_theta(cand, None, theta_radii_dict, universal) 
         solver.add(theta); #print('adding theta', theta)
         solver.add(alpha); #print('adding alpha', alpha)
         solver.add(self._smlpTermsInst.smlp_not(query)); #print('adding negated quert', query)
         return self._modelTermsInst.smlp_solver_check(solver, 'ce', self._lemma_precision)
         #return solver.check()
     
+    # Interval arithmetic pre-check of stability of candidate cand, used before the counter-example search with
+    # find_candidate_counter_example(). The model terms are substituted into the query, which is then evaluated on
+    # the box formed by the stability region (theta) around the candidate values of the knobs and by the ranges of
+    # the inputs (alpha ranges; global alpha constraints are ignored, which only makes the box larger). Returns True
+    # if the query holds on the whole box (there is no counter-example), False if the query is violated on the whole
+    # box (any point, e.g. the candidate itself, is a counter-example) and None if the check is inconclusive or if
+    # model terms are not all terms of responses (e.g., tree models with flat encoding, NN models with dag encoding).
+    def check_candidate_stability_intervals(self, cand:dict, quer:smlp.form2, model_full_term_dict:dict, 
+            theta_radii_dict:dict):
+        if any(isinstance(t, list) for t in model_full_term_dict.values()):
+            return None
+        quer_inputs = self._smlpTermsInst.smlp_cnst_fold(quer, model_full_term_dict)
+        quer_vars = smlp.free_vars(quer_inputs)
+        if not quer_vars.isdisjoint(model_full_term_dict.keys()):
+            return None
+        alpha_ranges_dict = self._modelTermsInst._specInst.get_spec_alpha_bounds_dict
+        box_dict = {}
+        for var in quer_vars:
+            if var in theta_radii_dict:
+                val = self._smlpTermsInst.ground_smlp_expr_to_value(cand[var])
+                radii = theta_radii_dict[var]
+                rad = radii['rad-abs'] if radii['rad-abs'] is not None else radii['rad-rel'] * abs(val)
+                box_dict[var] = smlp.component(self._smlpTermsInst.smlp_real, interval=[val - rad, val + rad])
+            elif var in alpha_ranges_dict and alpha_ranges_dict[var]['min'] is not None and \
+                    alpha_ranges_dict[var]['max'] is not None:
+                box_dict[var] = smlp.component(self._smlpTermsInst.smlp_real, interval=alpha_ranges_dict[var])
+            else:
+                box_dict[var] = smlp.component(self._smlpTermsInst.smlp_real)
+        return smlp.ival_eval(smlp.domain(box_dict), quer_inputs)
+    
+    # Return an incremental solver with the model terms and alpha added, to be used for counter-example search
+    # by find_candidate_counter_example(). Only the candidate dependent constraints differ between counter-example
+    # searches, therefore one solver is built per domain, model terms, alpha and solver logic and is re-used in 
+    # all queries in the run that share these components (e.g., all thresholds in an optimization run).
+    # Worker processes forked by parallel_map() start with an empty pool: the inherited solvers can be external
+    # solver processes (with --solver_path or --solver_portfolio) that the parent keeps talking to over the same
+    # pipes. The inherited solvers are kept alive but never used, since deleting them would terminate the solver
+    # processes of the parent.
+    def get_counter_example_solver(self, domain:smlp.domain, model_full_term_dict:dict, alpha:smlp.form2, solver_logic:str):
+        if self._ce_solver_pool_pid != os.getpid():
+            self._ce_solver_pools_inherited.append(self._ce_solver_pool)
+            self._ce_solver_pool = []
+            self._ce_solver_pool_pid = os.getpid()
+        for dom, terms, alph, logic, ce_solver in self._ce_solver_pool:
+            if dom is domain and terms is model_full_term_dict and alph is alpha and logic == solver_logic:
+                return ce_solver
+        ce_solver = self._modelTermsInst.create_model_exploration_instance_from_smlp_components(
+            domain, model_full_term_dict, True, solver_logic)
+        ce_solver.add(alpha)
+        self._ce_solver_pool.append((domain, model_full_term_dict, alpha, solver_logic, ce_solver))
+        return ce_solver
+    
     # Enhancement !!!: at least add here the delta condition
     def generalize_counter_example(self, coex):
         return coex
@@ -431,13 +527,29 @@ class SmlpQuery:
             with open(results_file, 'w') as f:
                 json.dump(mode_status_dict, f, indent='\t', cls=np_JSONEncoder)    
         
+        def validate_query_witness(quer_name):
+            return self.validate_witness_smt(universal, model_full_term_dict, quer_name, quer_expr_dict[quer_name], 
+                quer_forms_dict[quer_name], witn_dict[quer_name], domain, eta, alpha, theta_radii_dict, delta, solver_logic, 
+                True, float_approx, float_precision)
+        
+        # with multiple jobs, the witnesses are validated in worker processes and the results are then reported
+        # in the loop below in the order of the queries; otherwise they are validated within the loop below
+        if self._jobs > 1:
+            valid_quer_names = [quer_name for quer_name in quer_forms_dict.keys() 
+                if mode_status_dict[quer_name][CONSISTENCY] != 'false']
+            witness_status_dict = dict(zip(valid_quer_names, 
+                parallel_map(validate_query_witness, valid_quer_names, self._jobs)))
+        else:
+            witness_status_dict = None
+        
         for quer_name, quer_form in quer_forms_dict.items():
             #print('quer_name', quer_name, 'quer_form', quer_form)
             witn_form = witn_form_dict[quer_name]; #print('witn_form', witn_form) 
             if mode_status_dict[quer_name][CONSISTENCY] != 'false':    
-                witn_i_dict = witn_dict[quer_name]
-                witness_status_str = self.validate_witness_smt(universal, model_full_term_dict, quer_name, quer_expr_dict[quer_name], quer_form,
-                    witn_i_dict, domain, eta, alpha, theta_radii_dict, delta, solver_logic, True, float_approx, float_precision)
+                if witness_status_dict is not None:
+                    witness_status_str = witness_status_dict[quer_name]
+                else:
+                    witness_status_str = validate_query_witness(quer_name)
                 #print('witness_status_str', witness_status_str)
                 if universal:
                     for k,v in witness_status_str.items():
@@ -510,32 +622,74 @@ class SmlpQuery:
             data_bounds_json_path, bounds_factor, T_resp_bounds_csv_path)
         
 
+    # Build an incremental solver instance for candidate search: the domain and the model terms are declared
+    # and the constraints eta and alpha are added; the query itself is not added. Besides being used within
+    # query_condition(), this function is used to create a candidate solver that is kept alive across a sequence
+    # of related queries (e.g., across thresholds of the bisection search in single objective optimization), and
+    # is passed to query_condition() through its candidate_solver argument.
+    def create_candidate_solver(self, domain:smlp.domain, model_full_term_dict:dict, eta:smlp.form2, 
+            alpha:smlp.form2, solver_logic:str):
+        candidate_solver = self._modelTermsInst.create_model_exploration_instance_from_smlp_components(
+            domain, model_full_term_dict, True, solver_logic)
+        candidate_solver.add(eta)
+        candidate_solver.add(alpha)
+        #candidate_solver.add(beta)
+        return candidate_solver
+    
     # Enhancement !!!: implement timeout ? UNKNOWN return value
+    # When candidate_solver is None, a new candidate solver is built for the query. Otherwise candidate_solver
+    # must be an incremental solver built by create_candidate_solver() on the same domain, model terms, eta and 
+    # alpha; the query and the lemmas learned while solving the query are then added within a push/pop scope, thus
+    # candidate_solver is returned to its original state when this function returns. If lemmas is not None, the 
+    # lemmas learned from the counter-examples (negations of stability regions around the counter-examples) are
+    # appended to it, so that the caller can re-use them in related queries for which these lemmas remain valid.
     def query_condition(self, universal, model_full_term_dict:dict, quer_name:str, quer_expr:str, quer:smlp.form2, 
             domain:smlp.domain, eta:smlp.form2, alpha:smlp.form2, theta_radii_dict:dict, #beta:smlp.form2, 
-            delta:dict, solver_logic:str, witn:bool, sat_approx:bool, sat_precision:int):
+            delta:dict, solver_logic:str, witn:bool, sat_approx:bool, sat_precision:int, candidate_solver=None, lemmas=None,
+            stored_lemmas=None):
+        if candidate_solver is None:
+            candidate_solver = self.create_candidate_solver(domain, model_full_term_dict, eta, alpha, solver_logic)
+            candidate_solver.add(quer)
+            self._add_stored_lemmas(candidate_solver, stored_lemmas)
+            return self._query_condition(universal, candidate_solver, model_full_term_dict, quer_name, quer_expr, quer, 
+                domain, alpha, theta_radii_dict, delta, solver_logic, witn, sat_approx, sat_precision, lemmas)
+        
+        candidate_solver.push()
+        try:
+            candidate_solver.add(quer)
+            self._add_stored_lemmas(candidate_solver, stored_lemmas)
+            return self._query_condition(universal, candidate_solver, model_full_term_dict, quer_name, quer_expr, quer, 
+                domain, alpha, theta_radii_dict, delta, solver_logic, witn, sat_approx, sat_precision, lemmas)
+        finally:
+            candidate_solver.pop()
+    
+    # stored_lemmas are lemmas learned while checking earlier queries that are implied by the current query; they
+    # exclude the same candidates as before, without searching for the respective counter-examples again
+    def _add_stored_lemmas(self, candidate_solver, stored_lemmas):
+        if stored_lemmas is None or len(stored_lemmas) == 0:
+            return
+        self._query_logger.info('Reusing {} lemmas learned in earlier queries'.format(len(stored_lemmas)))
+        for lemma in stored_lemmas:
+            candidate_solver.add(lemma)
+    
+    # candidate / counter-example loop of query_condition() on candidate_solver that already has the query added
+    def _query_condition(self, universal, candidate_solver, model_full_term_dict:dict, quer_name:str, quer_expr:str, 
+            quer:smlp.form2, domain:smlp.domain, alpha:smlp.form2, theta_radii_dict:dict, delta:dict, solver_logic:str, 
+            witn:bool, sat_approx:bool, sat_precision:int, lemmas:list):
         # feasibility (existence) of at least one candidate
         feasible = None
         if quer_expr is not None:
             self._query_logger.info('Querying condition {} <-> {}'.format(str(quer_name), str(quer_expr)))
         else:
             self._query_logger.info('Querying condition {} <-> {}'.format(str(quer_name), str(quer)))
-        #print('query', quer, 'eta', eta, 'delta', delta)
-        candidate_solver = self._modelTermsInst.create_model_exploration_instance_from_smlp_components(
-            domain, model_full_term_dict, True, solver_logic)
-        
-        # add the remaining user constraints and the query
-        candidate_solver.add(eta)
-        candidate_solver.add(alpha)
-        #candidate_solver.add(beta)
-        candidate_solver.add(quer)
-        #print('eta', eta); print('alpha', alpha);  print('quer', quer); 
-        #print('solving query', quer)
+        #print('query', quer, 'delta', delta)
         self._query_tracer.info('{},{}'.format('synthesis' if universal else 'query', str(quer_name))) #, str(quer_expr) ,{}
         use_approxiamted_fractions = self._lemma_precision != 0
         assert self._lemma_precision >= 0 and isinstance(self._lemma_precision, int)
         approx_ca_models = {} # save rounded ca models to check whether rounded models occure repeaedly
         approx_ce_models = {} # save rounded ce models to check whether rounded models occure repeaedly
+        ce_solver = self.get_counter_example_solver(domain, model_full_term_dict, alpha, solver_logic) if \
+            self._reuse_ce_solver else None
         while True:
             # solve Ex. eta x /\ Ay. theta x y -> alpha y -> (beta y /\ query)
             print('searching for a candidate', flush=True)
@@ -559,15 +713,22 @@ class SmlpQuery:
                         approx_ca_models[h] = 0
                     #print('ca_model_approx', ca_model_approx)
                 feasible = True
-                if use_approxiamted_fractions:
-                    ce = self.find_candidate_counter_example(universal, domain, ca_model_approx, quer, model_full_term_dict, alpha, 
-                        theta_radii_dict, solver_logic)
+                cand = ca_model_approx if use_approxiamted_fractions else ca_model
+                ival_stable = self.check_candidate_stability_intervals(cand, quer, model_full_term_dict, 
+                    theta_radii_dict) if self._ival_precheck else None
+                if ival_stable is None:
+                    ce = self.find_candidate_counter_example(universal, domain, cand, quer, model_full_term_dict, alpha, 
+                        theta_radii_dict, solver_logic, ce_solver)
+                    ce_sat = self._modelTermsInst.solver_status_sat(ce)
+                    ce_unsat = self._modelTermsInst.solver_status_unsat(ce)
                 else:
-                    ce = self.find_candidate_counter_example(universal, domain, ca_model, quer, model_full_term_dict, alpha, 
-                        theta_radii_dict, solver_logic)
-                if self._modelTermsInst.solver_status_sat(ce): #isinstance(ce, smlp.sat):
+                    self._query_logger.info('Candidate stability decided by interval arithmetic: ' + 
+                        ('stable' if ival_stable else 'not stable'))
+                    ce_sat, ce_unsat = not ival_stable, ival_stable
+                if ce_sat: #isinstance(ce, smlp.sat):
                     print('candidate not stable -- continue search', flush=True)
-                    ce_model = self._modelTermsInst.get_solver_model(ce) #ce.model
+                    # if the query is violated on the whole stability region, the candidate is a counter-example
+                    ce_model = self._modelTermsInst.get_solver_model(ce) if ival_stable is None else ca_model #ce.model
                     cem = ce_model.copy(); #print('ce model', cem)
                     # drop Assignements to responses from ce
                     for var in ce_model.keys():
@@ -589,9 +750,12 @@ class SmlpQuery:
                     else:
                         lemma = self.generalize_counter_example(cem); #print('lemma', lemma)
                     theta = self._modelTermsInst.compute_stability_formula_theta(lemma, delta, theta_radii_dict, universal)
-                    candidate_solver.add(self._smlpTermsInst.smlp_not(theta))
+                    not_theta = self._smlpTermsInst.smlp_not(theta)
+                    candidate_solver.add(not_theta)
+                    if lemmas is not None:
+                        lemmas.append(not_theta)
                     continue
-                elif self._modelTermsInst.solver_status_unsat(ce): #isinstance(ce, smlp.unsat):
+                elif ce_unsat: #isinstance(ce, smlp.unsat):
                     #print('candidate stable -- return candidate')
                     self._query_logger.info('Query completed with result: STABLE_SAT (satisfiable)')
                     if witn: # export witness (use numbers as values, not terms)
@@ -613,7 +777,7 @@ class SmlpQuery:
                 #print('query unsuccessful: witness does not exist (query is unsat)')
                 return {'query_status':'UNSAT', 'witness':None, 'feasible':feasible}
             elif self._modelTermsInst.solver_status_unknown(ca): #isinstance(ca, smlp.unknown):
-                self._opt_logger.info('Completed with result: {}'.format('UNKNOWN'))
+                self._query_logger.info('Completed with result: {}'.format('UNKNOWN'))
                 return {'query_status':'UNKNOWN', 'witness':None, 'feasible':feasible}
                 #raise Exception('UNKNOWN return value in candidate search is currently not supported for queries')
             else:
@@ -625,10 +789,13 @@ class SmlpQuery:
             domain:smlp.domain, eta:smlp.form2, alpha:smlp.form2, theta_radii_dict:dict,
             delta:dict, solver_logic, witn:bool, sat_approx:bool, sat_precision:int):
         assert list(quer_forms_dict.keys()) == quer_names
-        quer_res_dict = {}
-        for i, (quer_name, quer_form) in enumerate(quer_forms_dict.items()):
-            quer_res_dict[quer_name] = self.query_condition(universal, model_full_term_dict, quer_name, quer_exprs[i], 
-                quer_form, domain, eta, alpha, theta_radii_dict, delta, solver_logic, witn, sat_approx, sat_precision)
+        def query_i(i):
+            quer_name = quer_names[i]
+            return self.query_condition(universal, model_full_term_dict, quer_name, quer_exprs[i], 
+                quer_forms_dict[quer_name], domain, eta, alpha, theta_radii_dict, delta, solver_logic, witn, sat_approx, sat_precision)
+        # the queries are independent and can be checked in parallel; the results are collected in the order of quer_names
+        quer_res_list = parallel_map(query_i, list(range(len(quer_names))), self._jobs)
+        quer_res_dict = dict(zip(quer_names, quer_res_list))
         return quer_res_dict
     
     # querying conditions on a model to find a stable witness satisfying this condition in entire stability region
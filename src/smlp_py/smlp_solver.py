@@ -12,6 +12,7 @@ class SmlpSolver:
         self._DEF_SOLVER = 'z3'
         self._DEF_SOLVER_PATH = None
         self._DEF_SOLVER_LOGIC = 'ALL'
+        self._DEF_SOLVER_PORTFOLIO = None
         #self._DEF_SOLVER_INCREMENTAL = True
         
         '''
@@ -35,6 +36,12 @@ class SmlpSolver:
                 'help':'SMT2-lib theory with respect to which to solve model exploration task at hand, ' +
                         'in modes "verify," "query", "optimize" and "optsyn". ' +
                         '[default: {}]'.format(str(self._DEF_SOLVER_LOGIC))},
+            'solver_portfolio': {'abbr':'solver_portfolio', 'default': self._DEF_SOLVER_PORTFOLIO, 'type':str,
+                'help':'Semicolon separated list of commands of external solvers (e.g., other solvers, or the same ' +
+                        'solver with different random seeds or options) that race against the default solver on every ' +
+                        'solver check in modes "verify," "query", "optimize" and "optsyn". The first sat or unsat result ' +
+                        'is used, the remaining solvers are interrupted, and the winning solver is logged ' +
+                        '[default: {}]'.format(str(self._DEF_SOLVER_PORTFOLIO))},
             #'solver_incr': {'abbr':'solver_incr', 'default': self._DEF_SOLVER_INCREMENTAL, 'type':str_to_bool,
             #    'help':'Should sover be used in incremental mode? ' +
             #            '[default: {}]'.format(str(self._DEF_SOLVER_INCREMENTAL))}
@@ -47,6 +54,14 @@ class SmlpSolver:
         if solver_path is not None:
             #print({'inc_solver_cmd': solver_path}); 
             smlp.options({'inc_solver_cmd': solver_path})
+    
+    # set the solvers racing against the default solver; returns the list of their commands
+    def set_solver_portfolio(self, solver_portfolio:str):
+        if solver_portfolio is None:
+            return None
+        solver_cmds = [cmd.strip() for cmd in solver_portfolio.split(';') if cmd.strip() != '']
+        smlp.options({'race_solver_cmds': solver_cmds})
+        return solver_cmds
         
         
     
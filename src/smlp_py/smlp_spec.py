@@ -3,6 +3,9 @@
 
 import os
 import json
+import itertools
+import hashlib
+from types import MappingProxyType
 from fractions import Fraction
 
 from smlp_py.smlp_utils import get_expression_variables, list_unique_unordered, np_JSONEncoder
@@ -23,6 +26,7 @@ class SmlpSpec:
         self._domain_dict = None       # type and range of the interface variables (mainly free inputs and knobs), defined
                                        #     using spec field self._SPEC_INPUTS_BOUNDS and supporting integer and real types
                                        #     self._SPEC_RANGE_INTEGER, self._SPEC_RANGE_REAL
+        self._spec_index = None        # index of the spec computed once when the spec file is loaded, see _index_spec()
         self.radius_absolute = None
         self.radius_relative = None
         self.delta_absolute = None
@@ -319,6 +323,7 @@ class SmlpSpec:
             #self._spec_logger.info(json.stringif(self.spec_dict, ensure_ascii=False, indent='\t', cls=np_JSONEncoder)) #parse_float=Fraction
             #self.set_spec_tokens()
             self.sanity_check_spec()
+            self._index_spec()
             #print(self._SPEC_DICTIONARY_SPEC); print('spec_file', spec_file)
             #self.upgrade_spec(spec_file, '1.1', '1.2'); assert False
 
@@ -336,46 +341,71 @@ class SmlpSpec:
     #def set_spec_witness_file(self, witness_file):
     #    self._witness_file = witness_file
     
+    # Index the spec once it is loaded and sanity-checked, so that the accessors of the interface below do not 
+    # rescan self.spec on every call (some of them, like get_anonymized_interface, are used per solver call).
+    # The index is read-only: variable entries by label, labels of inputs, knobs and outputs in the order of 
+    # the spec, the anonymized interface, and a fingerprint of the spec -- a hash of its content which does 
+    # not depend on formatting of the spec file or on the order of fields within dictionaries.
+    def _index_spec(self):
+        def anomym_dict(var, name_pref):
+            return MappingProxyType(dict(zip(sorted(var), [name_pref + str(i) for i in range(len(var))])))
+        labels = dict([(tag, tuple([var_spec[self._SPEC_VARIABLE_LABEL] for var_spec in self.spec if 
+            var_spec[self._SPEC_VARIABLE_TYPE] == tag])) for tag in 
+            [self._SPEC_INPUT_TAG, self._SPEC_KNOB_TAG, self._SPEC_OUTPUT_TAG]])
+        inputs, knobs, outputs = labels[self._SPEC_INPUT_TAG], labels[self._SPEC_KNOB_TAG], labels[self._SPEC_OUTPUT_TAG]
+        self._spec_index = MappingProxyType({
+            'variables': MappingProxyType(dict([(var_spec[self._SPEC_VARIABLE_LABEL], var_spec) for var_spec in self.spec])),
+            'inputs': inputs,
+            'knobs': knobs,
+            'outputs': outputs,
+            'features': tuple([var_spec[self._SPEC_VARIABLE_LABEL] for var_spec in self.spec if 
+                var_spec[self._SPEC_VARIABLE_TYPE] in [self._SPEC_INPUT_TAG, self._SPEC_KNOB_TAG]]),
+            'interface': inputs + knobs + outputs,
+            'anonymized': MappingProxyType({'knobs':anomym_dict(knobs, 'p'), 'inputs':anomym_dict(inputs, 'x'), 
+                'outputs':anomym_dict(outputs, 'y')}),
+            'fingerprint': hashlib.sha256(json.dumps(self.spec_dict, sort_keys=True, default=str).encode()).hexdigest()
+        })
+    
     # API to compute thelist of responses in spec
     @property
     def get_spec_responses(self):
-        return [var_spec[self._SPEC_VARIABLE_LABEL] for var_spec in self.spec if 
-            var_spec[self._SPEC_VARIABLE_TYPE] == self._SPEC_OUTPUT_TAG]
+        return list(self._spec_index['outputs'])
     
     # API to compute the list of features in spec: free inputs and control inputs (knobs)
     @property
     def get_spec_features(self):
-        return [var_spec[self._SPEC_VARIABLE_LABEL] for var_spec in self.spec if 
-            var_spec[self._SPEC_VARIABLE_TYPE] in [self._SPEC_INPUT_TAG, self._SPEC_KNOB_TAG]]
+        return list(self._spec_index['features'])
     
     # API to compute list of knobs in spec
     @property
     def get_spec_knobs(self):
-        return [var_spec[self._SPEC_VARIABLE_LABEL] for var_spec in self.spec if 
-            var_spec[self._SPEC_VARIABLE_TYPE] == self._SPEC_KNOB_TAG]
+        return list(self._spec_index['knobs'])
     
     # API to compute the list of inputs in spec
     @property
     def get_spec_inputs(self):
-        return [var_spec[self._SPEC_VARIABLE_LABEL] for var_spec in self.spec if 
-            var_spec[self._SPEC_VARIABLE_TYPE] == self._SPEC_INPUT_TAG]
+        return list(self._spec_index['inputs'])
     
     # API to compute the list of inputs in spec
     @property
     def get_spec_interface(self):
-        return self.get_spec_inputs + self.get_spec_knobs + self.get_spec_responses
+        return list(self._spec_index['interface'])
+    
+    # spec entry (dictionary) of variable var_name, None if var_name is not declared in the spec
+    def get_spec_variable(self, var_name:str):
+        return self._spec_index['variables'].get(var_name)
     
     # anonymize system/model interface names -- knobs, inputs, outputs.
     # currently is used to anonymize trace logs for debugging.
     @property
     def get_anonymized_interface(self):
-        def anomym_dict(var, name_pref):
-            return dict(zip(sorted(var), [name_pref + str(i) for i in range(len(var))]))
-        anonymize_dict = {'knobs':{}, 'inputs':{}, 'outputs':{}}
-        anonymize_dict['knobs'] = anomym_dict(self.get_spec_knobs, 'p')
-        anonymize_dict['inputs'] = anomym_dict(self.get_spec_inputs, 'x')
-        anonymize_dict['outputs'] = anomym_dict(self.get_spec_responses, 'y')
-        return anonymize_dict
+        return self._spec_index['anonymized']
+    
+    # hash of the content of the spec, to be used as part of keys of caches depending on the spec;
+    # None if no spec file was loaded
+    @property
+    def get_spec_fingerprint(self):
+        return None if self._spec_index is None else self._spec_index['fingerprint']
         
     # API to get definition of the original system (that SMLP intends to model with ML).
     # If provided, it is a string that correponds to python expression of the system's funcion.
@@ -53,6 +53,10 @@ class SubgroupDiscovery:
         self.MAX_DIMENSION = 3
         self.TOP_RANKED = 15
         
+        # number of samples (rows of the 0/1 matrix of range features) processed at a time when
+        # computing frequencies of all ranges at once in feats_resp2num_freqs()
+        self._LEVELS_BLOCK_SIZE = 1 << 16
+        
         if not RangePlots_are_missing:
             self.instRangePlots = RangePlots()
         
@@ -319,6 +323,53 @@ class SubgroupDiscovery:
                 TRUE_POSITIVE:freqs[TRUE_POSITIVE], FALSE_POSITIVE:freqs_inv[TRUE_POSITIVE]}
 
 
+    # 0/1 matrix (of type bool) of samples (rows) by range features (columns) in levels_df that
+    # have value level; built column by column to avoid an object array for mixed column types
+    def _levels_df_to_matrix(self, levels_df:pd.DataFrame, level):
+        return np.column_stack([levels_df[c].to_numpy() == level for c in levels_df.columns])
+    
+    # Vectorized version of feat_resp2num_freqs() that computes the frequencies of all range features
+    # (columns) of levels_df at once: the sums of the scaled response resp01 and of its reflection 
+    # resp10 within each range are computed as the product of the two responses with the 0/1 matrix
+    # of the ranges, in blocks of self._LEVELS_BLOCK_SIZE samples. Returns a dictionary mapping names
+    # of range features to the frequencies that feat_resp2num_freqs() returns for the range feature.
+    def feats_resp2num_freqs(self, levels_df:pd.DataFrame, resp, non_range_feat, pos_value_name):
+        in_samples = self._levels_df_to_matrix(levels_df, 1)
+        n = in_samples.sum(axis=0)
+        N = in_samples.shape[0]
+        
+        resp = np.asarray(resp, dtype=np.float64)
+        resp_min = resp.min()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            resp01 = (resp - resp_min)/(resp.max()-resp_min)
+        resp10 = 1 - resp01
+        if pos_value_name == self.STAT_NEGATIVE_VALUE:
+            # we are looking for low values as problematic values
+            norm_resps = np.column_stack([resp10, resp01])
+        elif pos_value_name == self.STAT_POSITIVE_VALUE:
+            # we are looking for high values as problematic values
+            norm_resps = np.column_stack([resp01, resp10])
+        else:
+            raise Exception('Error: pos_value_name must be 0 or 1')
+        
+        in_sums = np.zeros((2, in_samples.shape[1]))
+        for i in range(0, N, self._LEVELS_BLOCK_SIZE):
+            j = i + self._LEVELS_BLOCK_SIZE
+            in_sums += norm_resps[i:j].T @ in_samples[i:j].astype(np.float64)
+        # as in feat_resp2num_freqs(), frequencies within empty ranges are undefined (NaN)
+        PosIn, NegIn = np.where(n > 0, in_sums, np.nan)
+        PosAll, NegAll = norm_resps.mean(axis=0)*N
+        PosOut, NegOut = PosAll - PosIn, NegAll - NegIn
+        
+        freqs_dict = {}
+        for i, feat_name in enumerate(levels_df.columns.tolist()):
+            if feat_name in non_range_feat:
+                freqs_dict[feat_name] = {FALSE_NEGATIVE:0,TRUE_NEGATIVE:0, TRUE_POSITIVE:0, FALSE_POSITIVE:0}
+            else:
+                freqs_dict[feat_name] = {FALSE_NEGATIVE:PosOut[i], TRUE_NEGATIVE:NegOut[i], 
+                    TRUE_POSITIVE:PosIn[i], FALSE_POSITIVE:NegIn[i]}
+        return freqs_dict
+    
     # For a range feature feat and response resp, this function computes multiple
     # scores associated with the range that are based on counts of positive and negative samples
     # withing the range and outside. These scores might include multiple PosInBalanced
@@ -329,10 +380,12 @@ class SubgroupDiscovery:
     # selecting the ranges and pairs that will be reported in the features ranking file.
     # The function is also called within ranked_fs_summary_to_fs_ranking just to compute 
     # positive vs negative sample statistics for ranges, pairs and triplets reported in features 
-    # ranking file.
+    # ranking file. When the frequencies of the range are already known (computed for all ranges
+    # at once by feats_resp2num_freqs()), they are passed through argument freqs_dict.
     def feat_resp2opt_scores(self, feat_name, feat, resp, non_range_feat, cls_reg_mode, 
-            pos_min_freq_thresh, pos_value_name, neg_value_name):
-        freqs_dict = self.feat_resp2num_freqs(feat_name, feat, resp, non_range_feat, pos_value_name) #neg_value_name
+            pos_min_freq_thresh, pos_value_name, neg_value_name, freqs_dict=None):
+        if freqs_dict is None:
+            freqs_dict = self.feat_resp2num_freqs(feat_name, feat, resp, non_range_feat, pos_value_name) #neg_value_name
         PosOut = freqs_dict[FALSE_NEGATIVE]    # fale negative FN
         NegOut = freqs_dict[TRUE_NEGATIVE]  # true negative TN
         PosIn = freqs_dict[TRUE_POSITIVE]      # true positive  TP
@@ -464,6 +517,32 @@ class SubgroupDiscovery:
             #print('class_samples_in_str', class_samples_in_str)
             return class_samples_in_str
              
+    # Vectorized version of feat_resp2pos_sample_indices() with expand=False, for all range features
+    # (columns) of levels_df at once. Returns a dictionary mapping TP_SAMPLE_INDICES, FP_SAMPLE_INDICES,
+    # FN_SAMPLE_INDICES and TN_SAMPLE_INDICES to dictionaries that map names of range features to the
+    # respective strings of concatenated names of samples (rows of levels_df).
+    def feats_resp2sample_indices(self, levels_df:pd.DataFrame, resp, pos_value_name, neg_value_name):
+        if len(resp) != levels_df.shape[0]:
+            raise Exception('Implementation error in function feats_resp2sample_indices')
+        rpa_class_indices_separator = '~~' # TODO create a command line option for this
+        rownms = np.array([str(r) for r in levels_df.index.tolist()], dtype=object)
+        resp = np.asarray(resp)
+        pos_samples = resp == pos_value_name
+        neg_samples = resp == neg_value_name
+        in_samples = self._levels_df_to_matrix(levels_df, 1)
+        out_samples = self._levels_df_to_matrix(levels_df, 0)
+        sample_indices_dict = {}
+        for ind_name, range_samples, class_samples in [(TP_SAMPLE_INDICES, in_samples, pos_samples), 
+                (FP_SAMPLE_INDICES, in_samples, neg_samples), (FN_SAMPLE_INDICES, out_samples, pos_samples), 
+                (TN_SAMPLE_INDICES, out_samples, neg_samples)]:
+            ind_dict = {}
+            for i, feat_name in enumerate(levels_df.columns.tolist()):
+                class_samples_in = rownms[np.flatnonzero(range_samples[:, i] & class_samples)]
+                ind_dict[feat_name] = 'none' if len(class_samples_in) == 0 else \
+                    rpa_class_indices_separator.join(class_samples_in)
+            sample_indices_dict[ind_name] = ind_dict
+        return sample_indices_dict
+    
     def fs_ranking_with_frequencies(self, resp:pd.Series, resp_name:str, non_range_feat:list, labeled_features:pd.DataFrame, 
             important_range_comb_levels_df:pd.DataFrame,  curr_fs_ranking_df:pd.DataFrame, ranked_fs_curr_1, cls_reg_mode:str, 
             all_min_freq_thresh, pos_min_freq_thresh, pos_value_name, neg_value_name, pos_sam_ind):
@@ -477,10 +556,15 @@ class SubgroupDiscovery:
                 curr_fs_ranking = pd.concat([ranked_fs_curr_1, curr_fs_ranking_df], axis=1)
         if not important_range_comb_levels_df is None:
             fs_rankinng_precisions_dict = {}
+            # frequencies of all ranges are computed at once, the scores of each range are then
+            # computed from its frequencies
+            freqs_dict = self.feats_resp2num_freqs(important_range_comb_levels_df, resp, non_range_feat, 
+                pos_value_name)
             for feat_name in important_range_comb_levels_df.columns.tolist():
                 #print('feat_name', feat_name, '\n', important_range_comb_levels_df[feat_name])
                 row = self.feat_resp2opt_scores(feat_name, important_range_comb_levels_df[feat_name], resp,
-                    non_range_feat, cls_reg_mode, pos_min_freq_thresh, pos_value_name, neg_value_name)
+                    non_range_feat, cls_reg_mode, pos_min_freq_thresh, pos_value_name, neg_value_name, 
+                    freqs_dict[feat_name])
                 fs_rankinng_precisions_dict[feat_name] = row
             rpa_frequencies_df = rows_dict_to_df(fs_rankinng_precisions_dict, RANGE_ANALYSIS_INDICATORS)
             assert list(curr_fs_ranking_df['important_features']) == important_range_comb_levels_df.columns.tolist()
@@ -491,21 +575,12 @@ class SubgroupDiscovery:
             #print(list(curr_fs_ranking_df['important_features'])); print(important_range_comb_levels_df.columns)
             
             if cls_reg_mode == CLASSIFICATION:
-                TruePosSampleIndices_dict = {}
-                FalsePosSampleIndices_dict = {}
-                TrueNegSampleIndices_dict = {}
-                FalseNegSampleIndices_dict = {}
-                row_indices = important_range_comb_levels_df.index.tolist()
-                for col in important_range_comb_levels_df.columns.tolist():
-                    feat = important_range_comb_levels_df[col]
-                    TruePosSampleIndices_dict[col] = self.feat_resp2pos_sample_indices(feat, resp, 
-                        row_indices, pos_value_name, neg_value_name, True, False)
-                    FalsePosSampleIndices_dict[col] = self.feat_resp2pos_sample_indices(feat, resp, 
-                        row_indices, pos_value_name, neg_value_name, False, False)
-                    FalseNegSampleIndices_dict[col] = self.feat_resp2pos_sample_indices(feat, resp, 
-                        row_indices, pos_value_name, neg_value_name, True, False, False)
-                    TrueNegSampleIndices_dict[col] = self.feat_resp2pos_sample_indices(feat, resp, 
-                        row_indices, pos_value_name, neg_value_name, False, False, False)
+                sample_indices_dict = self.feats_resp2sample_indices(important_range_comb_levels_df, resp, 
+                    pos_value_name, neg_value_name)
+                TruePosSampleIndices_dict = sample_indices_dict[TP_SAMPLE_INDICES]
+                FalsePosSampleIndices_dict = sample_indices_dict[FP_SAMPLE_INDICES]
+                FalseNegSampleIndices_dict = sample_indices_dict[FN_SAMPLE_INDICES]
+                TrueNegSampleIndices_dict = sample_indices_dict[TN_SAMPLE_INDICES]
                 tp_df = rows_dict_to_df(TruePosSampleIndices_dict, [TP_SAMPLE_INDICES])
                 fp_df = rows_dict_to_df(FalsePosSampleIndices_dict, [FP_SAMPLE_INDICES])
                 fn_df = rows_dict_to_df(FalseNegSampleIndices_dict, [FN_SAMPLE_INDICES])
@@ -13,8 +13,11 @@ import operator as op
 from fractions import Fraction
 import time
 import functools #for cacheing
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 import sys
+import os
+import glob
+import hashlib
 
 import smlp
 from smlp_py.smlp_utils import (np_JSONEncoder, lists_union_order_preserving_without_duplicates, 
@@ -50,30 +53,72 @@ from smlp_py.smlp_utils import (np_JSONEncoder, lists_union_order_preserving_wit
 # to solver instance separately (as many as required, depending on whether all responses are analysed together).
 
 
-USE_CACHE = False
+# Memoization of the term and formula constructors of SmlpTerms (the methods decorated with conditional_cache),
+# shared by all instances of SmlpTerms and enabled with option cache_terms. Terms and formulas cannot be used as
+# keys in python dictionaries (operator == applied to them builds a formula), therefore such arguments are keyed
+# on the identity of the node they refer to (see smlp.destruct_id()) and other arguments are keyed on their value.
+# The arguments are stored in the cache together with the result in order to keep the nodes alive (and thus their
+# identities unique) while they are in the cache. The least recently used entries are evicted once the number of
+# entries exceeds cache_terms_size.
+class SmlpTermsCache:
+    def __init__(self):
+        self._enabled = False
+        self._maxsize = None
+        self._entries = OrderedDict()
+        self._hits = defaultdict(int)
+        self._misses = defaultdict(int)
+    
+    def set_cache(self, enabled:bool, maxsize:int):
+        self._enabled = enabled
+        self._maxsize = maxsize
+        while self._maxsize is not None and len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+    
+    @property
+    def enabled(self):
+        return self._enabled
+    
+    # hits and misses per cached function
+    @property
+    def stats(self):
+        return dict([(f, {'hits': self._hits[f], 'misses': self._misses[f]}) 
+            for f in sorted(set(self._hits.keys()) | set(self._misses.keys()))])
+    
+    # raises TypeError if arg (or an element of arg if it is a list or tuple) is not hashable
+    def _arg_key(self, arg):
+        if isinstance(arg, smlp.term2) or isinstance(arg, smlp.form2):
+            return ('expr', smlp.destruct_id(arg))
+        if isinstance(arg, list) or isinstance(arg, tuple):
+            return (type(arg).__name__,) + tuple(self._arg_key(a) for a in arg)
+        hash(arg)
+        return (type(arg).__name__, arg)
+    
+    def call(self, func, obj, args, kwargs):
+        try:
+            key = (func.__name__, self._arg_key(args), self._arg_key(tuple(sorted(kwargs.items()))))
+        except TypeError:
+            return func(obj, *args, **kwargs)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self._hits[func.__name__] += 1
+            return self._entries[key][1]
+        self._misses[func.__name__] += 1
+        res = func(obj, *args, **kwargs)
+        self._entries[key] = ((args, kwargs), res)
+        if self._maxsize is not None and len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+        return res
 
-def conditional_cache(func):
-    """Custom decorator to conditionally apply @functools.cache."""
-    if USE_CACHE:
-        # Apply caching
-        return functools.cache(func)
-    else:
-        # Return the original function without caching
-        return func
-'''
+_smlp_terms_cache = SmlpTermsCache()
 
 def conditional_cache(func):
+    """Decorator memoizing func in the shared terms cache when caching is enabled."""
+    @functools.wraps(func)
     def wrapper(self, *args, **kwargs):
-        if self._cache_terms:
-            if not hasattr(self, '_cache'):
-                self._cache = {}
-            if func not in self._cache:
-                self._cache[func] = func(self, *args, **kwargs)
-            return self._cache[func]
-        else:
+        if not _smlp_terms_cache.enabled:
             return func(self, *args, **kwargs)
+        return _smlp_terms_cache.call(func, self, args, kwargs)
     return wrapper
-'''
 
 # Class SmlpTerms has methods for generating terms, and classes TreeTerms, PolyTerms and NNKerasTerms are inherited
 # from it but this inheritance is probably not implemented in the best way: TODO !!!: see if that can be improved.
@@ -82,7 +127,6 @@ class SmlpTerms:
         self._smlp_terms_logger = None
         self.report_file_prefix = None
         self.model_file_prefix = None
-        #self._cache_terms = False
         
         # supported operators in ast module for expression parsing and transformation
         # https://docs.python.org/3/library/ast.html -- AST (Abstract Syntax Trees)
@@ -146,8 +190,14 @@ class SmlpTerms:
         } #self._ast_operators_smlp_map
     
     
-    #def set_cache_terms(self, cache_terms):
-    #    self._cache_terms = cache_tems
+    # enable / disable memoization of term and formula constructors (see SmlpTermsCache)
+    def set_cache_terms(self, cache_terms:bool, cache_terms_size:int=None):
+        _smlp_terms_cache.set_cache(cache_terms, cache_terms_size)
+    
+    # log hits and misses of memoized term and formula constructors
+    def log_terms_cache_stats(self):
+        if _smlp_terms_cache.enabled:
+            self._smlp_terms_logger.info('Terms cache hits and misses: ' + str(_smlp_terms_cache.stats))
     
     @property
     @conditional_cache #@functools.cache
@@ -397,6 +447,73 @@ class SmlpTerms:
 
         return summed_counts
 
+    # Converts a dictionary with term2 / form2 values (or lists of them, as for flat tree encoding) into
+    # a JSON-serializable DAG: every distinct node of the expressions is stored exactly once in the list
+    # of nodes, as a list [id, attributes..., indices of operands in the list of nodes], where id is the
+    # operator id returned by smlp_destruct(). Sub-expressions shared within and across the expressions
+    # are identified using smlp.destruct_id() and are thus visited and stored only once. Values of the
+    # returned dictionary are the indices of the root nodes in the list of nodes. See dag_to_terms().
+    def terms_to_dag(self, term_dict:dict):
+        nodes = []
+        node_index = {}
+        def node(e):
+            e_id = smlp.destruct_id(e)
+            if e_id in node_index:
+                return node_index[e_id]
+            d = self.smlp_destruct(e)
+            if d['id'] == 'var':
+                n = ['var', d['name']]
+            elif d['id'] == 'const':
+                if d['type'] == 'A':
+                    raise Exception('Algebraic constants are not supported in serialization of terms')
+                c = self.smlp_cnst(e)
+                n = ['const', c.numerator, c.denominator]
+            elif d['id'] == 'prop':
+                n = ['prop', d['cmp']] + [node(a) for a in d['args']]
+            else:
+                n = [d['id']] + [node(a) for a in d['args']]
+            nodes.append(n)
+            node_index[e_id] = len(nodes) - 1
+            return len(nodes) - 1
+
+        roots = {}
+        for k, e in term_dict.items():
+            roots[k] = [node(f) for f in e] if isinstance(e, list) else node(e)
+        return {'nodes': nodes, 'roots': roots}
+
+    # Inverse of terms_to_dag(): rebuilds the terms and formulas from the DAG, sharing the
+    # sub-expressions that were shared in the serialized expressions.
+    def dag_to_terms(self, dag:dict):
+        cmp_ops = {'<': op.lt, '<=': op.le, '>': op.gt, '>=': op.ge, '==': op.eq, '!=': op.ne}
+        ops = {
+            'add': lambda args: args[0] + args[1],
+            'sub': lambda args: args[0] - args[1],
+            'mul': lambda args: args[0] * args[1],
+            'uadd': lambda args: +args[0],
+            'usub': lambda args: -args[0],
+            'ite': lambda args: self.smlp_ite(args[0], args[1], args[2]),
+            'and': lambda args: smlp.And(*args),
+            'or': lambda args: smlp.Or(*args),
+            'not': lambda args: self.smlp_not(args[0])}
+        exprs = []
+        for n in dag['nodes']:
+            if n[0] == 'var':
+                e = self.smlp_var(n[1])
+            elif n[0] == 'const':
+                e = self.smlp_cnst(Fraction(n[1], n[2]))
+            elif n[0] == 'prop':
+                e = cmp_ops[n[1]](exprs[n[2]], exprs[n[3]])
+            elif n[0] in ops:
+                e = ops[n[0]]([exprs[i] for i in n[1:]])
+            else:
+                raise Exception('Unsupported operator ' + str(n[0]) + ' in serialized terms')
+            exprs.append(e)
+
+        term_dict = {}
+        for k, r in dag['roots'].items():
+            term_dict[k] = [exprs[i] for i in r] if isinstance(r, list) else exprs[r]
+        return term_dict
+
 
     # this function doesn't take substitutions, but in addition to whatever cnst_fold() is doing, 
     # it simplifies arithmetics and con-/disjunctions and negations:
@@ -536,6 +653,7 @@ class SmlpTerms:
 
         return eval_(ast.parse(expr, mode='eval').body)
 
+    @conditional_cache
     def ast_expr_to_term(self, expr):
         #print('evaluating AST expression ====', expr)
         assert isinstance(expr, str)
@@ -743,6 +861,7 @@ class TreeTerms:
         }
         self.instSmlpTerms = SmlpTerms()
         self._compress_rules = None
+        self._leaf_tolerance = 0
     
     # set logger from a caller script
     def set_logger(self, logger):
@@ -753,6 +872,102 @@ class TreeTerms:
     
     def set_tree_encoding(self, tree_encoding:str):
         self._tree_encoding = tree_encoding
+    
+    def set_leaf_tolerance(self, leaf_tolerance:float):
+        if leaf_tolerance < 0:
+            raise Exception('Tree leaf tolerance must be non-negative')
+        self._leaf_tolerance = leaf_tolerance
+    
+    # Compression of the rules of a tree driven by error tolerance tol = self._leaf_tolerance: the leaf values
+    # (values in rule consequents) are quantized to multiples of 2*tol, which changes each of them by at most tol,
+    # and then pairs of leaves with equal values whose regions are adjacent boxes that together form a box (in
+    # particular, sibling leaves) are merged repeatedly; this does not change the predictions. To compare the
+    # boxes, the antecedents are first reduced to bound each feature at most once from above ('<=') and once 
+    # from below ('>'). Returns the compressed rules and the max change of leaf values per response.
+    def _compress_tree_leaves(self, rules:list, resp_names:list):
+        # the tightest bounds '<=' and '>' on each feature, in the order of first occurrence of the features
+        def box_antecedent(antecedent):
+            bounds = {}
+            for (feat, binop, threshold) in antecedent:
+                if binop == '<=':
+                    bounds[(feat, binop)] = threshold if (feat, binop) not in bounds else min(bounds[(feat, binop)], threshold)
+                elif binop == '>':
+                    bounds[(feat, binop)] = threshold if (feat, binop) not in bounds else max(bounds[(feat, binop)], threshold)
+                elif (feat, binop, threshold) not in bounds:
+                    bounds[(feat, binop, threshold)] = None
+            return [key if value is None else key + (value,) for key, value in bounds.items()]
+        
+        step = 2 * self._leaf_tolerance
+        leaf_error = dict([(resp_name, 0.0) for resp_name in resp_names])
+        quantized_rules = []
+        for rule in rules:
+            consequent_dict = {}
+            for resp_name, val in rule['consequent'].items():
+                consequent_dict[resp_name] = float(np.round(val / step) * step)
+                leaf_error[resp_name] = max(leaf_error[resp_name], abs(consequent_dict[resp_name] - val))
+            quantized_rules.append({'antecedent':box_antecedent(rule['antecedent']), 'consequent':consequent_dict, 
+                'coverage':rule['coverage']})
+        
+        rules = quantized_rules
+        while True:
+            # the boxes of rules i and j can be merged if they coincide on all features except for feature f, 
+            # where the box of rule i is lo_i < f <= t and the box of rule j is t < f <= hi_j
+            below_dict = {}
+            above_dict = {}
+            for i, rule in enumerate(rules):
+                for (feat, binop, threshold) in rule['antecedent']:
+                    others = frozenset([trp for trp in rule['antecedent'] if trp[0] != feat])
+                    feat_trps = tuple(sorted([trp for trp in rule['antecedent'] if trp[0] == feat and trp[1] != binop]))
+                    key = (others, feat, threshold)
+                    if binop == '<=':
+                        below_dict[key] = (i, feat_trps)
+                    elif binop == '>':
+                        above_dict[key] = (i, feat_trps)
+            merged = set()
+            merged_rules = []
+            for key, (i, below_trps) in below_dict.items():
+                if key not in above_dict:
+                    continue
+                (j, above_trps) = above_dict[key]
+                if i in merged or j in merged or rules[i]['consequent'] != rules[j]['consequent']:
+                    continue
+                merged_rules.append({'antecedent':list(key[0]) + list(below_trps) + list(above_trps), 
+                    'consequent':rules[i]['consequent'], 'coverage':rules[i]['coverage'] + rules[j]['coverage']})
+                merged.update([i, j])
+            if len(merged) == 0:
+                break
+            rules = [rule for i, rule in enumerate(rules) if i not in merged] + merged_rules
+        
+        # sort by samples count, as in _get_abstract_rules()
+        rules = sorted(rules, key=lambda rule: rule['coverage'], reverse=True)
+        return rules, leaf_error
+    
+    # Apply _compress_tree_leaves() to all trees of a model and report the reduction in rules and distinct leaf
+    # values, and the bound on the change of the model predictions. The model predicts the mean of the trees,
+    # thus the change of a prediction is bounded by the mean over the trees of the max change of leaf values;
+    # this bound holds for all inputs, in particular for the training data.
+    def compress_tree_leaves(self, trees:list, resp_names:list):
+        def leaf_values_count(trees):
+            return sum([len(set([rule['consequent'][resp_name] for tree_rules in trees for rule in tree_rules])) 
+                for resp_name in resp_names])
+        rules_count_befor = sum([len(tree_rules) for tree_rules in trees])
+        leaf_values_befor = leaf_values_count(trees)
+        compressed_trees = []
+        error_bounds = dict([(resp_name, 0.0) for resp_name in resp_names])
+        for tree_rules in trees:
+            compressed_rules, leaf_error = self._compress_tree_leaves(tree_rules, resp_names)
+            compressed_trees.append(compressed_rules)
+            for resp_name in resp_names:
+                error_bounds[resp_name] = error_bounds[resp_name] + leaf_error[resp_name] / len(trees)
+        self._smlp_terms_logger.info(
+            'Tree leaves compression statistics for response(s) {}:'.format(','.join(resp_names)) + \
+            '\n\tleaf tolerance             ' + str(self._leaf_tolerance) + \
+            '\n\ttree branches/rules before ' + str(rules_count_befor) + \
+            '\n\ttree branches/rules after  ' + str(sum([len(tree_rules) for tree_rules in compressed_trees])) + \
+            '\n\tdistinct leaf values before ' + str(leaf_values_befor) + \
+            '\n\tdistinct leaf values after  ' + str(leaf_values_count(compressed_trees)) + \
+            '\n\tprediction error bound     ' + str(error_bounds))
+        return compressed_trees
         
     def _tree_model_id(self, algo:str, tree_number:int, resp_name=None):
         assert algo is not None
@@ -763,6 +978,87 @@ class TreeTerms:
     def _tree_resp_id(self, tree_number:int, resp_name:str):
         return '_'.join(['tree', str(tree_number), resp_name])
     
+    # name of the bucket variable of feature feat_name in atoms encoding of tree models
+    def _tree_bucket_id(self, algo:str, feat_name:str, resp_name=None):
+        return '_'.join([self._tree_model_id(algo, None, resp_name), 'bucket', feat_name])
+    
+    # Shared split atoms encoding of tree models (tree_encoding 'atoms'): the distinct split thresholds 
+    # t_0 < t_1 < ... < t_m-1 of a feature x across all trees are collected, and a bucket variable b with
+    # definition b = ite(x > t_0, 1, 0) + ... + ite(x > t_m-1, 1, 0) is introduced; b ranges over 0..m. 
+    # The split conditions x <= t_k and x > t_k in all branches of all trees are then expressed as b <= k 
+    # and b >= k+1, respectively, thus each split atom x > t_k occurs only once in the model terms. This
+    # function returns the dictionary of definitions of the bucket variables, and a dictionary that maps 
+    # pairs (feature, threshold) to pairs (bucket variable, index of the threshold) used in rules_to_term().
+    def _tree_split_atoms(self, algo:str, trees:list, resp_name):
+        thresholds_dict = {}
+        for tree_rules in trees:
+            for rule in tree_rules:
+                for (feat, _, threshold) in rule['antecedent']:
+                    thresholds_dict.setdefault(feat, set()).add(threshold)
+        bucket_defs = {}
+        split_atoms = {}
+        for feat, thresholds in thresholds_dict.items():
+            bucket_name = self._tree_bucket_id(algo, feat, resp_name)
+            thresholds = sorted(thresholds)
+            bucket_defs[bucket_name] = self.instSmlpTerms.smlp_add_multi([self.instSmlpTerms.smlp_ite(
+                self.instSmlpTerms.smlp_gt(self.instSmlpTerms.smlp_var(feat), self.instSmlpTerms.smlp_cnst(t)), 
+                self.instSmlpTerms.smlp_cnst(1), self.instSmlpTerms.smlp_cnst(0)) for t in thresholds])
+            for k, t in enumerate(thresholds):
+                split_atoms[(feat, t)] = (bucket_name, k)
+        self._smlp_terms_logger.info('Tree model split atoms: {} features, {} distinct thresholds'.format(
+            len(thresholds_dict), len(split_atoms)))
+        return bucket_defs, split_atoms
+    
+    # Rules of a single regression tree computed directly from the arrays of the sklearn tree_ representation,
+    # as a table with a row per leaf: 'leaf' (node ids of the leaves), 'path_node' and 'path_left' (arrays of 
+    # shape (leaves, tree depth) with the split nodes on the path from the root to the leaf, padded with -1, and
+    # whether the path continues to the left child of the split node), 'value' (array of shape (leaves, 
+    # responses)) and 'coverage' (count of training samples in the leaf). Rows are sorted by decreasing coverage.
+    # The paths are propagated from the root one tree level at a time.
+    def _get_rules_table(self, tree, feature_names, resp_names):
+        tree_ = tree.tree_
+        children_left = tree_.children_left
+        children_right = tree_.children_right
+        is_split = children_left != _tree.TREE_LEAF
+        path_node = np.full((tree_.node_count, tree_.max_depth), -1)
+        path_left = np.zeros((tree_.node_count, tree_.max_depth), dtype=bool)
+        level = np.array([0])
+        depth = 0
+        while len(level) > 0:
+            nodes = level[is_split[level]]
+            if len(nodes) == 0:
+                break
+            left = children_left[nodes]
+            right = children_right[nodes]
+            path_node[left] = path_node[nodes]; path_left[left] = path_left[nodes]
+            path_node[right] = path_node[nodes]; path_left[right] = path_left[nodes]
+            path_node[left, depth] = nodes; path_left[left, depth] = True
+            path_node[right, depth] = nodes
+            level = np.concatenate([left, right])
+            depth += 1
+        leaves = np.flatnonzero(~is_split)
+        # tree_.value has shape (nodes, responses, 1) for regression trees
+        assert tree_.value.shape[1] == len(resp_names)
+        value = tree_.value[leaves, :, 0]
+        coverage = tree_.n_node_samples[leaves]
+        # sort by samples count
+        order = np.argsort(coverage)[::-1]
+        return {'leaf':leaves[order], 'path_node':path_node[leaves[order]], 'path_left':path_left[leaves[order]], 
+            'value':value[order], 'coverage':coverage[order]}
+    
+    # convert rules table computed by _get_rules_table() into the list of rules returned by _get_abstract_rules(),
+    # with the split conditions of antecedents in the order of the path from the root to the leaf
+    def _rules_table_to_rules(self, tree, rules_table, feature_names, resp_names):
+        split_feature = [feature_names[i] if i != _tree.TREE_UNDEFINED else None for i in tree.tree_.feature.tolist()]
+        split_threshold = tree.tree_.threshold.tolist()
+        rules = []
+        for path_node, path_left, value, coverage in zip(rules_table['path_node'].tolist(), 
+                rules_table['path_left'].tolist(), rules_table['value'].tolist(), rules_table['coverage'].tolist()):
+            antecedent = [(split_feature[node], '<=' if left else '>', split_threshold[node]) 
+                for node, left in zip(path_node, path_left) if node != -1]
+            rules.append({'antecedent':antecedent, 'consequent':dict(zip(resp_names, value)), 'coverage':coverage})
+        return rules
+    
     # generate rules from a single decision or regression tree that predicts a single response
     def _get_abstract_rules(self, tree, feature_names, resp_names, class_names, rounding=-1):
         #print('_get_abstract_rules: tree', tree, '\nresp_names', resp_names)
@@ -910,7 +1206,11 @@ class TreeTerms:
         # traverse trees, generate and print rules per tree (each rule correponds to a full branch in the tree)
         for indx, tree_est in enumerate(tree_estimators):
             #rules = self._get_rules(tree_est, feature_names, response_names, class_names)
-            rules = self._get_abstract_rules(tree_est, feature_names, response_names, class_names);
+            if class_names is None:
+                rules = self._rules_table_to_rules(tree_est, self._get_rules_table(tree_est, feature_names, 
+                    response_names), feature_names, response_names)
+            else:
+                rules = self._get_abstract_rules(tree_est, feature_names, response_names, class_names);
             trees_as_rules.append(rules)
             
             if log:
@@ -944,6 +1244,19 @@ class TreeTerms:
         return (self.instSmlpTerms._ast_operators_smlp_map[self._inequality_ops_ast_dict[p[1]]])(
             self.instSmlpTerms.smlp_var(p[0]), self.instSmlpTerms.smlp_cnst(p[2]))
     
+    # same as _rule_triplet_to_term() but the split condition p is expressed using the bucket variable
+    # of the feature p[0] (see _tree_split_atoms()); split_atoms maps (p[0], p[2]) to the bucket variable
+    # and the index k of threshold p[2] among the thresholds of the feature.
+    def _rule_triplet_to_atom_term(self, p, split_atoms:dict):
+        bucket_name, k = split_atoms[(p[0], p[2])]
+        bucket_var = self.instSmlpTerms.smlp_var(bucket_name)
+        if p[1] == '<=':
+            return self.instSmlpTerms.smlp_le(bucket_var, self.instSmlpTerms.smlp_cnst(k))
+        elif p[1] == '>':
+            return self.instSmlpTerms.smlp_ge(bucket_var, self.instSmlpTerms.smlp_cnst(k + 1))
+        else:
+            raise Exception('Unexpected binop ' + str(p[1]) + ' in tree split condition')
+    
 
     # Convert rules predicting the same responses into SMLP terms. These rules are generated using 
     # method trees_to_rules() of this class directly from sklearn DecisionTreeRegressor model.
@@ -993,7 +1306,7 @@ class TreeTerms:
         #print('antecedent size: ', len(antecedent), ' --> ', len(ant_reduced), flush=True)
         return ant_reduced, len(antecedent), len(ant_reduced)
 
-    def rules_to_term(self, algo, tree_number:int, rules:list, ant_reduction_stats:dict):
+    def rules_to_term(self, algo, tree_number:int, rules:list, ant_reduction_stats:dict, split_atoms=None):
         #print('rules_to_term start', flush=True)
         # Convert the antecedent and consequent of a rule (corresponding to a full branch in a tree)
         # into smlp terms and return a dictionary with response names as the keys and pairs of terms
@@ -1003,13 +1316,17 @@ class TreeTerms:
             antecedent = rule['antecedent']; #print('antecedent', antecedent)
             consequent = rule['consequent']; #print('consequent', consequent)
             antecedent, ant_befor, ant_after = self.compress_antecedent(antecedent)
+            if split_atoms is None:
+                triplet_to_term = self._rule_triplet_to_term
+            else:
+                triplet_to_term = lambda p: self._rule_triplet_to_atom_term(p, split_atoms)
             if len(antecedent) == 0:
                 ant = self.instSmlpTerms.smlp_true
             else:
-                ant = self._rule_triplet_to_term(antecedent[0])
+                ant = triplet_to_term(antecedent[0])
             for i, p in enumerate(antecedent):
                 if i > 0:
-                    ant = ant & self._rule_triplet_to_term(p)
+                    ant = ant & triplet_to_term(p)
             res_dict = {}
             for resp, val in consequent.items():
                 #term = smlp.Ite(ant, smlp.Cnst(val), smlp.Var('SMLP_UNDEFINED'))
@@ -1076,6 +1393,8 @@ class TreeTerms:
         else:
             raise Exception('Model trained using algorithm ' + str(algo) + ' is currently not supported in smlp_opt')
         trees = self.trees_to_rules(tree_estimators, feat_names, resp_names, None, False, None)
+        if self._leaf_tolerance > 0:
+            trees = self.compress_tree_leaves(trees, resp_names)
         def count_occurrences(int_list):
             counts = {}
             for element in int_list:
@@ -1085,6 +1404,11 @@ class TreeTerms:
                     counts[element] = 1
             return counts
         #print('------- trees ---------\n', trees); 
+        if self._tree_encoding == 'atoms':
+            bucket_defs, split_atoms = self._tree_split_atoms(algo, trees, 
+                resp_names[0] if len(resp_names) == 1 else None)
+        else:
+            bucket_defs, split_atoms = {}, None
         #print('tree_term_dict_dict start', flush=True)
         tree_term_dict_dict = {} 
         ant_reduction_stats = {'before':[], 'after':[]}
@@ -1092,7 +1416,7 @@ class TreeTerms:
         for i, tree_rules in enumerate(trees):
             #print('====== tree_rules ======\n', len(tree_rules), tree_rules)
             branches_count_per_tree.append(len(tree_rules))
-            tree_term_dict, ant_reduction_stats = self.rules_to_term(algo, i, tree_rules, ant_reduction_stats); #print('tree term_dict', tree_term_dict); 
+            tree_term_dict, ant_reduction_stats = self.rules_to_term(algo, i, tree_rules, ant_reduction_stats, split_atoms); #print('tree term_dict', tree_term_dict); 
             if self._tree_encoding == 'flat' and algo in ['dt_sklearn', 'rf_sklearn', 'et_sklearn', 'dt_caret', 'rf_caret', 'et_caret']:
                 assert list(tree_term_dict.keys()) == [self._tree_model_id(algo, i)]
             else:
@@ -1165,7 +1489,8 @@ class TreeTerms:
                                 self.instSmlpTerms.smlp_cnst(self.instSmlpTerms.smlp_q(1) / self.instSmlpTerms.smlp_q(int(number_of_trees))), tree_model_term_dict[resp_name])
 
         #print('tree_model_term_dict', tree_model_term_dict); print('tree_model_term_dict end', flush=True)
-        return tree_model_term_dict
+        # with atoms encoding, the definitions of the bucket variables are part of the model terms
+        return tree_model_term_dict | bucket_defs
 
     def tree_models_to_term(self, model, algo, feat_names, resp_names):
         #print('tree_models_to_term start', flush=True)
@@ -1174,10 +1499,14 @@ class TreeTerms:
         if isinstance(model, dict):
             # case when model is per response
             tree_model_term_dict = {}
+            aux_term_dict = {}
             for resp_name in resp_names:
                 tree_model = model[resp_name]
-                tree_model_term_dict[resp_name] = self.tree_model_to_term(tree_model, algo, 
-                    feat_names, [resp_name])[resp_name]
+                resp_term_dict = self.tree_model_to_term(tree_model, algo, feat_names, [resp_name])
+                tree_model_term_dict[resp_name] = resp_term_dict[resp_name]
+                # definitions of auxiliary variables, like bucket variables in atoms encoding
+                aux_term_dict.update(dict([(k, t) for k, t in resp_term_dict.items() if k != resp_name]))
+            tree_model_term_dict = tree_model_term_dict | aux_term_dict
         else:
             # there is one model covering all responses (one or multiple responses)
             tree_model_term_dict = self.tree_model_to_term(model, algo, feat_names, resp_names)
@@ -1303,31 +1632,59 @@ class PolyTerms: #(SmlpTerms):
 class NNKerasTerms: #(SmlpTerms):
     def __init__(self):
         self._smlp_terms_logger = None
+        self._nn_encoding = None
      
     # set logger from a caller script
     def set_logger(self, logger):
         self._smlp_terms_logger = logger
     
+    def set_nn_encoding(self, nn_encoding:str):
+        self._nn_encoding = nn_encoding
+    
+    # name of the auxiliary variable that represents node node_number of hidden layer layer_number
+    # in dag encoding of NN models; when a model is built per response, the response name is added
+    def _nn_node_id(self, layer_number:int, node_number:int, resp_names:list):
+        res = '_'.join(['nn_keras', 'layer', str(layer_number), 'node', str(node_number)])
+        return '_'.join([res, str(resp_names[0])]) if len(resp_names) == 1 else res
+    
+    # Used in dag encoding of NN models: replaces terms of the nodes of a hidden layer by auxiliary variables
+    # and adds the definitions of these variables (the node terms) to node_defs. The terms of the next layer 
+    # are then built from these variables, and the node terms are not duplicated within the terms of their
+    # successor nodes. Nodes with the same term share the variable, and constant nodes are not replaced.
+    def _nn_layer_node_vars(self, layer_terms, layer_number:int, resp_names:list, node_defs:dict):
+        node_vars = {}
+        layer_vars = []
+        for j, t in enumerate(layer_terms):
+            if smlp.is_ground(t):
+                layer_vars.append(t)
+                continue
+            t_id = smlp.destruct_id(t)
+            if t_id not in node_vars:
+                node_var = self._nn_node_id(layer_number, j, resp_names)
+                node_defs[node_var] = t
+                node_vars[t_id] = smlp.Var(node_var)
+            layer_vars.append(node_vars[t_id])
+        return layer_vars
+    
     # Creates smlp term for an internal node in NN based on terms built for the preceding layer 
     # (the argument called last_layer_terms); as well as the weights and bias for that node with
-    # respect to the preceding layer last_layer_terms.
+    # respect to the preceding layer last_layer_terms. The term is built in one call to libsmlp,
+    # which also drops the summands with zero weights.
     def _nn_dense_layer_node_term(self, last_layer_terms, node_weights, node_bias):
         #print('node_weights', node_weights.shape, type(node_weights), '\n', node_weights)
         #print('node_bias', node_bias.shape, type(node_bias), '\n', node_bias);
-        layer_term = None
-        for i,t in enumerate(last_layer_terms):
-            if i == 0:
-                layer_term = last_layer_terms[0] * smlp.Cnst(float(node_weights[0]))
-            else:
-                layer_term = layer_term + last_layer_terms[i] * smlp.Cnst(float(node_weights[i]))
-        layer_term = layer_term + smlp.Cnst(float(node_bias)) 
-
-        return layer_term
+        return smlp.linear_combination(last_layer_terms, node_weights.tolist(), float(node_bias))
 
     # Creates smlp term that represents an application of an activation function relu or linear
-    # on smlp term representing an NN node
-    def _nn_activation_term(self, activation_func, input_term):
+    # on smlp term representing an NN node. Argument node_state is 'active' or 'inactive' if the 
+    # input of relu is known to be non-negative or negative, respectively, in which case relu is
+    # encoded without the case split (see _nn_dense_layer_bounds()).
+    def _nn_activation_term(self, activation_func, input_term, node_state=None):
         if activation_func == 'relu':
+            if node_state == 'active':
+                return input_term
+            if node_state == 'inactive':
+                return smlp.Cnst(0)
             relu_term = smlp.Ite(input_term >= smlp.Cnst(0), input_term, smlp.Cnst(0))
             return relu_term
         elif activation_func == 'linear':
@@ -1335,6 +1692,29 @@ class NNKerasTerms: #(SmlpTerms):
         else:
             raise Exception('Unsupported activation function ' + str(activation_func))
 
+    # Interval bound propagation through a dense layer: given arrays last_lo and last_hi of lower and upper
+    # bounds on the nodes of the preceding layer (-np.inf / np.inf if unbounded), computes the bounds of the
+    # nodes of the current layer after applying the activation function, as well as the state of each node:
+    # for relu, nodes with the input bounded from below by a non-negative value are 'active', nodes with the
+    # input bounded from above by a negative value are 'inactive', and the remaining nodes are None. Bounds
+    # are computed in floating point and a small tolerance is used to decide the state of the nodes.
+    def _nn_dense_layer_bounds(self, last_lo, last_hi, layer_weights, layer_biases, activation_func):
+        w = layer_weights.astype(np.float64)
+        b = layer_biases.astype(np.float64)
+        # products with zero weights are ignored as they would be nan for unbounded nodes
+        with np.errstate(invalid='ignore'):
+            lo = np.where(w > 0, w * last_lo, 0).sum(axis=1) + np.where(w < 0, w * last_hi, 0).sum(axis=1) + b
+            hi = np.where(w > 0, w * last_hi, 0).sum(axis=1) + np.where(w < 0, w * last_lo, 0).sum(axis=1) + b
+            scale = np.where(w != 0, np.abs(w) * np.maximum(np.abs(last_lo), np.abs(last_hi)), 0).sum(axis=1) + np.abs(b)
+        tol = 1e-9 * scale
+        if activation_func == 'relu':
+            states = np.where(lo > tol, 'active', np.where(hi < -tol, 'inactive', None))
+            return np.maximum(lo, 0), np.maximum(hi, 0), list(states)
+        elif activation_func == 'linear':
+            return lo, hi, [None] * len(lo)
+        else:
+            raise Exception('Unsupported activation function ' + str(activation_func))
+    
     # Creates a list of smlp terms curr_layer_terms for an internal layer of a sequential NN.
     # Argument last_layer_terms is a list of smlp terms correponding to a preceding layer
     # (the input layer or an internal layer preceding to the current layer). The arguments
@@ -1343,16 +1723,24 @@ class NNKerasTerms: #(SmlpTerms):
     # activation function for the current layer. This function is called both for sequential
     # and functional API models from function nn_keras_model_to_formula(), which explicitly 
     # genrates last_layer_terms for the input layer (and subsequent layers are generated using
-    # _nn_dense_layer_terms, both for sequential and functional API models).
-    def _nn_dense_layer_terms(self, last_layer_terms, layer_weights, layer_biases, activation_func):
+    # _nn_dense_layer_terms, both for sequential and functional API models). Optional argument node_states
+    # is the list of states of the nodes of the current layer computed by _nn_dense_layer_bounds().
+    def _nn_dense_layer_terms(self, last_layer_terms, layer_weights, layer_biases, activation_func, node_states=None):
         #print('-------start computing next layer')
         #print('layer_weights', layer_weights.shape, '\n', layer_weights)
         #print('layer_biases', layer_biases.shape, '\n', layer_biases)
         #print('last_layer_terms', len(last_layer_terms)) #, last_layer_terms)
         assert layer_weights.shape[1] == len(last_layer_terms)
         assert layer_biases.shape[0] == layer_weights.shape[0]
-        curr_layer_terms = [self._nn_activation_term(activation_func, self._nn_dense_layer_node_term(
-            last_layer_terms, layer_weights[i], layer_biases[i])) for i in range(layer_weights.shape[0])]
+        # nodes with identical weights and bias (e.g., nodes with all weights zero) are computed once
+        # and share the same term; unique_rows_inverse[i] is the index of the i-th node in unique_rows
+        unique_rows, unique_rows_index, unique_rows_inverse = np.unique(np.column_stack((layer_weights, layer_biases)), 
+            axis=0, return_index=True, return_inverse=True)
+        if node_states is None:
+            node_states = [None] * layer_weights.shape[0]
+        unique_terms = [self._nn_activation_term(activation_func, self._nn_dense_layer_node_term(
+            last_layer_terms, row[:-1], row[-1]), node_states[i]) for row, i in zip(unique_rows, unique_rows_index)]
+        curr_layer_terms = [unique_terms[j] for j in unique_rows_inverse.reshape(-1)]
         #print('curr_layer_terms', len(curr_layer_terms))
         #print('+++++++done computing next layer')
         #print('curr_layer_terms', curr_layer_terms)
@@ -1390,17 +1778,27 @@ class NNKerasTerms: #(SmlpTerms):
         return model_type
     
     # Create SMLP terms from NN Keras model. Returns a dictionary with response names from model_resp_names as keys
-    # and respective model terms as the values.
-    def nn_keras_model_to_term(self, model, model_feat_names, model_resp_names, feat_names, resp_names):
+    # and respective model terms as the values. With dag encoding (option nn_encoding), the returned dictionary
+    # also contains the auxiliary variables that represent hidden nodes as keys, and their definitions as values.
+    # If input_bounds is not None, it is a list of pairs of lower and upper bounds on model_feat_names (None if
+    # unbounded); these bounds are propagated through the layers in order to encode relu nodes that are stably
+    # active or inactive within these bounds without the case split on the sign of their input.
+    def nn_keras_model_to_term(self, model, model_feat_names, model_resp_names, feat_names, resp_names, input_bounds=None):
         #from pprint import pprint
         #import inspect
         #print('model', model, type(model), model.summary())
         model_type = self._get_nn_keras_model_type(model)
         assert model_type in ['sequential', 'functional']
         model_terms_dict = {}
+        node_defs = {}
         # input variables layer as list of terms
         last_layer_terms = [smlp.Var(v) for v in model_feat_names]; #print('input layer terms', last_layer_terms)
-        for layer in model.layers:
+        if input_bounds is not None:
+            assert len(input_bounds) == len(model_feat_names)
+            last_lo = np.array([-np.inf if lo is None else float(lo) for lo, _ in input_bounds])
+            last_hi = np.array([np.inf if hi is None else float(hi) for _, hi in input_bounds])
+            node_state_counts = defaultdict(int)
+        for layer_number, layer in enumerate(model.layers):
             #print('layer type', type(layer).__name__ )
             #print('layer config', layer.get_config())
             if type(layer).__name__ == 'InputLayer':
@@ -1414,8 +1812,16 @@ class NNKerasTerms: #(SmlpTerms):
             weights, biases = layer.get_weights(); 
             #print('t_weights', weights.transpose().shape, '\n', weights.transpose()); 
             #print('t_biases', biases.transpose().shape, '\n', biases.transpose())
+            if input_bounds is not None:
+                curr_lo, curr_hi, node_states = self._nn_dense_layer_bounds(last_lo, last_hi, weights.transpose(), 
+                    biases.transpose(), layer_activation)
+                if layer_activation == 'relu':
+                    for state in node_states:
+                        node_state_counts[state] += 1
+            else:
+                node_states = None
             curr_layer_terms = self._nn_dense_layer_terms(last_layer_terms, weights.transpose(), 
-                biases.transpose(), layer_activation)
+                biases.transpose(), layer_activation, node_states)
             if model_type == 'functional' and layer.get_config()['name'] in resp_names:
                 #assert model_type == 'functional'
                 #print('layer.get_config()[name]', layer.get_config()['name'])
@@ -1425,12 +1831,21 @@ class NNKerasTerms: #(SmlpTerms):
                 #model_terms_dict[layer.get_config()['name']] = curr_layer_terms
                 model_terms_dict[model_resp_names[resp_index]] = curr_layer_terms[0]
             else:
-                last_layer_terms = curr_layer_terms
+                if self._nn_encoding == 'dag' and layer is not model.layers[-1]:
+                    last_layer_terms = self._nn_layer_node_vars(curr_layer_terms, layer_number, resp_names, node_defs)
+                else:
+                    last_layer_terms = curr_layer_terms
+                if input_bounds is not None:
+                    last_lo, last_hi = curr_lo, curr_hi
+        
+        if input_bounds is not None:
+            self._smlp_terms_logger.info('NN relu nodes stably active: {}, stably inactive: {}, unstable: {}'.format(
+                node_state_counts['active'], node_state_counts['inactive'], node_state_counts[None]))
 
         if model_type == 'functional':
-            return model_terms_dict
+            return model_terms_dict | node_defs
         else:
-            return dict(zip(model_resp_names, last_layer_terms))
+            return dict(zip(model_resp_names, last_layer_terms)) | node_defs
 
 
 # NOTE on terminology: The two most discussed scaling methods are Normalization and Standardization. 
@@ -1520,11 +1935,15 @@ class ModelTerms(ScalerTerms):
         #self._smlpTermsInst = SmlpTerms
         self._nnKerasTermsInst = NNKerasTerms()
         
-        #self._cache_terms = False
-        
         self.report_file_prefix = None
         self.model_file_prefix = None
         self._smlp_terms_logger = None
+        
+        # commands of external solvers racing against the default solver (see SmlpSolver.set_solver_portfolio)
+        self._solver_portfolio = None
+        
+        # save / re-use model terms in / from a cache file (see _model_terms_cache_key())
+        self._cache_model_terms = False
 
         # control parameter to decide whether to add input and knob variable ranges as part
         # of solver domain declaration or to only add variable type (int, real) declaration.
@@ -1545,22 +1964,56 @@ class ModelTerms(ScalerTerms):
         self._DEF_COMPRESS_RULES = True
         self._DEF_SIMPLIFY_TERMS = False
         self._DEF_TREE_ENCODING = 'nested' # 'flat' #  
-        #self._DEF_CACHE_TERMS = False
+        self._DEF_NN_ENCODING = 'nested'
+        self._DEF_NN_RELU_BOUNDS = False
+        self._DEF_CACHE_TERMS = False
+        self._DEF_CACHE_TERMS_SIZE = 100000
+        self._DEF_CACHE_MODEL_TERMS = False
+        self._DEF_TREE_LEAF_TOLERANCE = 0
+        self._tree_leaf_tolerance = self._DEF_TREE_LEAF_TOLERANCE
         self.model_term_params_dict = {
             'compress_rules': {'abbr':'compress_rules', 'default':str(self._DEF_COMPRESS_RULES), 'type':str_to_bool,
                 'help':'Should rules that represent tree branches be compressed to eliminate redundant repeated splitting ' +
                 'of ranges of model features after training tree based models, in order to build smaller model terms? ' +
                 '[default {}]'.format(str(self._DEF_COMPRESS_RULES))},
+            'tree_leaf_tolerance': {'abbr':'leaf_tol', 'default':self._DEF_TREE_LEAF_TOLERANCE, 'type':float,
+                'help':'Error tolerance for compressing tree based models before building model terms: leaf values are ' +
+                'quantized to multiples of twice the tolerance (thus change by at most the tolerance), and sibling ' +
+                'leaves with equal values are merged. The tolerance refers to the responses as predicted by the model ' +
+                '(scaled, if responses are scaled), and the resulting bound on the change of model predictions is ' +
+                'reported. Value 0 means no compression [default {}]'.format(str(self._DEF_TREE_LEAF_TOLERANCE))},
             'simplify_terms': {'abbr':'simplify_terms', 'default':str(self._DEF_SIMPLIFY_TERMS), 'type':str_to_bool,
                 'help':'Should terms be simplified using before building solver instance in model exploration modes? ' +
                 '[default {}]'.format(str(self._DEF_SIMPLIFY_TERMS))},
             'tree_encoding': {'abbr':'tree_encoding', 'default':str(self._DEF_TREE_ENCODING), 'type':str,
                 'help':'Strategy to encode tree model to solvers. Flat encoding cretea a formula from ' +
                 'each branch of a tree, while nested encoding builds formula from branches using nested ' +
-                'if-thn-else (ite) exoressions [default {}]'.format(str(self._DEF_COMPRESS_RULES))},
-            #'cache_terms': {'abbr':'cache_terms', 'default':str(self._DEF_CACHE_TERMS), 'type':str_to_bool,
-            #    'help':'Should terms be cached along building terms and formulas in model exploration modes? ' +
-            #    '[default {}]'.format(str(self._DEF_CACHE_TERMS))}
+                'if-thn-else (ite) exoressions. Atoms encoding is nested encoding where the split conditions ' +
+                'are shared across all trees of the model: each feature is represented by a bucket variable ' +
+                'that counts the distinct split thresholds of that feature below the feature value, and split ' +
+                'conditions are expressed as bounds on bucket variables [default {}]'.format(str(self._DEF_TREE_ENCODING))},
+            'nn_encoding': {'abbr':'nn_encoding', 'default':str(self._DEF_NN_ENCODING), 'type':str,
+                'help':'Strategy to encode NN models to solvers. Nested encoding substitutes the terms of ' +
+                'the nodes of each layer into the terms of the next layer, while dag encoding defines each ' +
+                'hidden node by an auxiliary variable and uses that variable in the next layer, which ' +
+                'avoids duplicating node terms [default {}]'.format(str(self._DEF_NN_ENCODING))},
+            'nn_relu_bounds': {'abbr':'nn_relu_bounds', 'default':str(self._DEF_NN_RELU_BOUNDS), 'type':str_to_bool,
+                'help':'Should bounds on NN model inputs (ranges of inputs and knobs in the spec, knob ranges ' +
+                'widened by stability radii) be propagated through the NN layers in order to encode relu nodes ' +
+                'that are stably active or inactive within these bounds as linear terms, without the case split? ' +
+                '[default {}]'.format(str(self._DEF_NN_RELU_BOUNDS))},
+            'cache_model_terms': {'abbr':'cache_model_terms', 'default':str(self._DEF_CACHE_MODEL_TERMS), 'type':str_to_bool,
+                'help':'Should model terms built in model exploration modes be saved in a cache file and re-used ' +
+                'in later runs with a saved model (option use_model), instead of building them again? The cache ' +
+                'is re-used only if the model file(s), data bounds, scaling and tree encoding options did not change ' +
+                '[default {}]'.format(str(self._DEF_CACHE_MODEL_TERMS))},
+            'cache_terms': {'abbr':'cache_terms', 'default':str(self._DEF_CACHE_TERMS), 'type':str_to_bool,
+                'help':'Should terms be cached along building terms and formulas in model exploration modes? ' +
+                'Repeated constructions of the same constants, variables and operations on the same operands ' +
+                'then re-use the already built term or formula [default {}]'.format(str(self._DEF_CACHE_TERMS))},
+            'cache_terms_size': {'abbr':'cache_terms_size', 'default':self._DEF_CACHE_TERMS_SIZE, 'type':int,
+                'help':'Maximal number of terms and formulas kept in the cache when option cache_terms is on; ' +
+                'least recently used ones are evicted first [default {}]'.format(str(self._DEF_CACHE_TERMS_SIZE))}
         }
         
     # set logger from a caller script
@@ -1597,6 +2050,10 @@ class ModelTerms(ScalerTerms):
         self._compress_rules = compress_rules
         self._treeTermsInst.set_compress_rules(compress_rules)
     
+    def set_tree_leaf_tolerance(self, tree_leaf_tolerance:float):
+        self._tree_leaf_tolerance = tree_leaf_tolerance
+        self._treeTermsInst.set_leaf_tolerance(tree_leaf_tolerance)
+    
     def set_simplify_terms(self, simplify_terms:bool):
         self._simplify_terms = simplify_terms
     
@@ -1604,8 +2061,18 @@ class ModelTerms(ScalerTerms):
         self._tree_encoding = tree_encoding
         self._treeTermsInst.set_tree_encoding(tree_encoding)
     
-    #def set_cache_terms(self, cache_terms:bool):
-    #    self._cache_terms = cache_terms
+    def set_nn_encoding(self, nn_encoding:str):
+        self._nn_encoding = nn_encoding
+        self._nnKerasTermsInst.set_nn_encoding(nn_encoding)
+    
+    def set_nn_relu_bounds(self, nn_relu_bounds:bool):
+        self._nn_relu_bounds = nn_relu_bounds
+    
+    def set_solver_portfolio(self, solver_portfolio:list):
+        self._solver_portfolio = solver_portfolio
+    
+    def set_cache_model_terms(self, cache_model_terms:bool):
+        self._cache_model_terms = cache_model_terms
     
     # file to dump tree model converted to SMLP term
     def smlp_model_term_file(self, resp:str, full:bool):
@@ -1662,11 +2129,12 @@ class ModelTerms(ScalerTerms):
     # Only a subset of all model algorithms supported in training and prediction modes are currently
     # supported in _compute_pure_model_terms(). For each supported model algorithm, a dedicated function
     # computing a dictionary of model terms from the model / dictionary of mdoels is called. 
-    def _compute_pure_model_terms(self, algo, model, model_feat_names, model_resp_names, feat_names, resp_names):
+    def _compute_pure_model_terms(self, algo, model, model_feat_names, model_resp_names, feat_names, resp_names,
+            input_bounds=None):
         assert not isinstance(model, dict)
         if algo == 'nn_keras': 
             model_term_dict = self._nnKerasTermsInst.nn_keras_model_to_term(model, model_feat_names, 
-                model_resp_names, feat_names, resp_names) 
+                model_resp_names, feat_names, resp_names, input_bounds) 
         elif algo == 'poly_sklearn':
             model_term_dict = self._polyTermsInst.poly_model_to_term(model_feat_names, model_resp_names, 
                 model[0].coef_, model[1].powers_, False, None)
@@ -1683,6 +2151,37 @@ class ModelTerms(ScalerTerms):
         return model_term_dict
     
     
+    # Bounds on model inputs used to simplify relu nodes in NN model terms (see nn_keras_model_to_term()), 
+    # computed from the ranges of inputs and knobs in the spec. Knob values in counter-examples to stability 
+    # can be outside of knob ranges by up to the stability radius, so knob ranges are widened by the radius, 
+    # and knobs without a radius are considered unbounded. If features were scaled prior to training, the 
+    # bounds are scaled the same way as the features. Returns a list of pairs of bounds, ordered as feat_names.
+    def _nn_input_bounds(self, feat_names, data_bounds, feat_were_scaled):
+        alpha_bounds_dict = self._specInst.get_spec_alpha_bounds_dict
+        eta_bounds_dict = self._specInst.get_spec_eta_bounds_dict
+        theta_radii_dict = self._specInst.get_spec_theta_radii_dict
+        input_bounds = []
+        for feat in feat_names:
+            bnds = alpha_bounds_dict[feat] if feat in alpha_bounds_dict else eta_bounds_dict.get(feat)
+            lo = -np.inf if bnds is None or bnds['min'] is None else float(bnds['min'])
+            hi = np.inf if bnds is None or bnds['max'] is None else float(bnds['max'])
+            if feat in eta_bounds_dict:
+                radii = theta_radii_dict.get(feat)
+                if radii is None or (radii['rad-abs'] is None and radii['rad-rel'] is None):
+                    lo, hi = -np.inf, np.inf
+                else:
+                    rad = float(radii['rad-abs']) if radii['rad-abs'] is not None else \
+                        float(radii['rad-rel']) * max(abs(lo), abs(hi))
+                    lo, hi = lo - rad, hi + rad
+            if feat_were_scaled:
+                mn = float(data_bounds[feat]['min'])
+                mx = float(data_bounds[feat]['max'])
+                # the scaled feature is constant 0 if mn == mx, see feature_scaler_to_term()
+                lo, hi = (0.0, 0.0) if mn == mx else ((lo - mn) / (mx - mn), (hi - mn) / (mx - mn))
+            input_bounds.append((lo, hi))
+        self._smlp_terms_logger.info('NN input bounds for relu simplification: ' + str(dict(zip(feat_names, input_bounds))))
+        return input_bounds
+    
     # This function takes an ML model (the argument 'model) as well as features and responses scaling info
     # as inputs and for each response in the model generates a term that encodes the "pure" model constraints
     # as well as constraints relating to scaling of features and/or responses if they were scaled prior to
@@ -1708,8 +2207,10 @@ class ModelTerms(ScalerTerms):
         model_resp_names = [self._scaled_name(resp) for resp in resp_names] if resp_were_scaled else resp_names #._scalerTermsInst
         #print('adding model terms: model_feat_names', model_feat_names, 'model_resp_names', model_resp_names, flush=True)
 
+        input_bounds = self._nn_input_bounds(feat_names, data_bounds, feat_were_scaled) if \
+            algo == 'nn_keras' and self._nn_relu_bounds else None
         model_term_dict = self._compute_pure_model_terms(algo, model, model_feat_names, model_resp_names, 
-            feat_names, resp_names); #print('model_term_dict', model_term_dict)
+            feat_names, resp_names, input_bounds); #print('model_term_dict', model_term_dict)
         
         model_full_term_dict = model_term_dict;
         
@@ -1746,7 +2247,9 @@ class ModelTerms(ScalerTerms):
                 responses_unscaler_terms_dict[resp_name] = self.smlp_cnst_fold(resp_term, #self.smlp_subst 
                     {self._scaled_name(resp_name): model_term_dict[self._scaled_name(resp_name)]})
             #print('responses_unscaler_terms_dict full model', responses_unscaler_terms_dict, flush=True)
-            model_full_term_dict = responses_unscaler_terms_dict
+            # keep definitions of auxiliary variables of the model (e.g., with NN dag encoding)
+            model_full_term_dict = responses_unscaler_terms_dict | dict([(k, t) for k, t in model_term_dict.items() 
+                if k not in model_resp_names])
         
         if resp_were_scaled and tree_flat_encoding:
             responses_scaler_terms_dict = self.feature_scaler_terms(data_bounds, resp_names)
@@ -1814,6 +2317,76 @@ class ModelTerms(ScalerTerms):
         #print('compute_models_terms_dict', models_full_terms_dict)
         return models_full_terms_dict
     
+    # file to save model terms computed by compute_models_terms_dict(), to be re-used in later runs
+    def model_terms_cache_file(self):
+        assert self.model_file_prefix is not None
+        return self.model_file_prefix + '_model_terms_cache.json'
+    
+    # files with model terms written by compute_models_terms_dict() for model_or_model_dict (see 
+    # smlp_model_term_file()), as paths relative to the model file prefix
+    def _model_term_files(self, model_or_model_dict, resp_names):
+        if isinstance(model_or_model_dict, dict):
+            resps = list(model_or_model_dict.keys())
+        else:
+            resps = [resp_names[0] if len(resp_names) == 1 else None]
+        return [self.smlp_model_term_file(resp, full)[len(self.model_file_prefix):] 
+            for resp in resps for full in [False, True]]
+    
+    # Key identifying model terms computed by compute_models_terms_dict(): a hash of the saved model file(s),
+    # of the data bounds file (if any) and of the options that affect the model terms. Returns None if the 
+    # saved model files cannot be found, in which case the model terms are not cached.
+    def _model_terms_cache_key(self, algo, model_features_dict, feat_names, resp_names, data_bounds_json_path, 
+            data_scaler, scale_features, scale_responses):
+        model_files = [f for f in sorted(glob.glob(self.model_file_prefix + '*_' + algo + '_model_complete*')) 
+            if os.path.isfile(f)]
+        if len(model_files) == 0:
+            return None
+        h = hashlib.sha256()
+        for path in model_files + ([data_bounds_json_path] if data_bounds_json_path is not None else []):
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+        params = [algo, model_features_dict, feat_names, resp_names, data_scaler, scale_features, scale_responses,
+            self._tree_encoding, self._compress_rules, self._tree_leaf_tolerance, self._nn_encoding, self._nn_relu_bounds]
+        if self._nn_relu_bounds:
+            params = params + [self._specInst.get_spec_alpha_bounds_dict, self._specInst.get_spec_eta_bounds_dict,
+                self._specInst.get_spec_theta_radii_dict]
+        h.update(json.dumps(params, default=str).encode())
+        return h.hexdigest()
+    
+    # load model terms from the cache file if it was saved with the same cache key, otherwise return None;
+    # the model term files saved with the terms are written as if the terms were computed in this run
+    def _load_model_terms_cache(self, cache_key):
+        cache_file = self.model_terms_cache_file()
+        if cache_key is None or not os.path.isfile(cache_file):
+            return None
+        with open(cache_file, 'r') as f:
+            cache = json.load(f)
+        if cache['key'] != cache_key:
+            self._smlp_terms_logger.info('Model terms cache file ' + str(cache_file) + ' is outdated, ignoring it')
+            return None
+        self._smlp_terms_logger.info('Loading model terms from cache file ' + str(cache_file))
+        for term_file, content in cache['term_files'].items():
+            with open(self.model_file_prefix + term_file, 'w') as f:
+                f.write(content)
+        return self.dag_to_terms(cache['terms'])
+    
+    # save model terms into the cache file, in the compact DAG format computed by terms_to_dag(), together
+    # with the content of the model term files term_files (see _model_term_files()) written when computing them
+    def _save_model_terms_cache(self, cache_key, model_full_term_dict, term_files:list[str]):
+        if cache_key is None:
+            return
+        cache_file = self.model_terms_cache_file()
+        self._smlp_terms_logger.info('Saving model terms to cache file ' + str(cache_file))
+        term_files_dict = {}
+        for term_file in term_files:
+            if os.path.isfile(self.model_file_prefix + term_file):
+                with open(self.model_file_prefix + term_file, 'r') as f:
+                    term_files_dict[term_file] = f.read()
+        with open(cache_file, 'w') as f:
+            json.dump({'key': cache_key, 'terms': self.terms_to_dag(model_full_term_dict), 
+                'term_files': term_files_dict}, f, separators=(',', ':'))
+    
     # This function computes orig_objv_terms_dict with names of objectives as keys and smlp terms
     # for objectives' expressions (spcified by used through command line or spec file) as the values; the  
     # inputs of objectives' expressions can only be feature and response names as declared in the domain. 
@@ -2155,9 +2728,6 @@ class ModelTerms(ScalerTerms):
                     tree_resp_name = self._treeTermsInst._tree_resp_id(i, resp)
                     domain_dict[tree_resp_name] = self.var_domain(resp, spec_domain_dict)
 
-        #print('domain_dict', domain_dict)
-        domain = smlp.domain(domain_dict)
-        
         if syst_expr_dict is not None:
             self._smlp_terms_logger.info('Building system terms: Start')
             for resp, syst_expr in syst_expr_dict.items():
@@ -2183,10 +2753,25 @@ class ModelTerms(ScalerTerms):
             model_full_term_dict = system_term_dict
         else:
             #print('model', model, flush=True)
-            model_full_term_dict = self.compute_models_terms_dict(algo, model, 
-                model_features_dict, feat_names, resp_names, data_bounds, data_scaler, scale_feat, scale_resp)
+            cache_key = self._model_terms_cache_key(algo, model_features_dict, feat_names, resp_names, 
+                data_bounds_json_path, data_scaler, scale_feat, scale_resp) if self._cache_model_terms else None
+            model_full_term_dict = self._load_model_terms_cache(cache_key)
+            if model_full_term_dict is None:
+                model_full_term_dict = self.compute_models_terms_dict(algo, model, 
+                    model_features_dict, feat_names, resp_names, data_bounds, data_scaler, scale_feat, scale_resp)
+                self._save_model_terms_cache(cache_key, model_full_term_dict, self._model_term_files(model, resp_names))
+        self.log_terms_cache_stats()
         self._smlp_terms_logger.info('Building model terms: End')
         
+        # declare auxiliary variables defined by the model besides the responses (e.g., variables representing
+        # hidden nodes in NN dag encoding); with flat tree encoding, keys of model_full_term_dict are not variables
+        if model_full_term_dict is not None:
+            for var, term in model_full_term_dict.items():
+                if var not in domain_dict and not isinstance(term, list):
+                    domain_dict[var] = smlp.component(self.smlp_real)
+        #print('domain_dict', domain_dict)
+        domain = smlp.domain(domain_dict)
+        
         model_consistent = self.check_alpha_eta_consistency(domain, model_full_term_dict, alpha, eta, 'ALL')
         if not model_consistent:
             return domain, system_term_dict, model_full_term_dict, eta, alpha, beta, True, False
@@ -2231,6 +2816,15 @@ class ModelTerms(ScalerTerms):
                     base_solver.add(eq_form)
         return base_solver
     
+    # write a line of values into the trace; the asynchronous trace writer (see SmlpTraceWriter) renders 
+    # the values into the csv line itself, in the writer thread
+    def _trace_row(self, row:list):
+        write_row = getattr(self._smlp_terms_tracer, 'write_row', None)
+        if write_row is not None:
+            write_row(row)
+        else:
+            self._smlp_terms_tracer.info(','.join([str(e) for e in row]))
+    
     # wrapper function on solver.check to measure runtime and return status in a convenient way
     def smlp_solver_check(self, solver, call_name:str, lemma_precision:int=0):
         approx_lemmas =  lemma_precision > 0
@@ -2239,6 +2833,9 @@ class ModelTerms(ScalerTerms):
         res = solver.check()
         #print('solver chack end', flush=True)
         end = time.time()
+        if self._solver_portfolio:
+            # report which of the racing solvers delivered the result (None if none of them returned sat or unsat)
+            self._smlp_terms_logger.info('Solver check {} decided by solver {}'.format(call_name, str(solver.winner())))
         if  isinstance(res, smlp.unknown):
             #print('smlp_unknown', smlp.unknown)
             status = 'unknown'
@@ -2258,68 +2855,41 @@ class ModelTerms(ScalerTerms):
             raise Exception('Unexpected solver result ' + str(res))
         
         anonym_interface_dict = self._specInst.get_anonymized_interface; #print('anonym_interface_dict', anonym_interface_dict)
+        groups = ['knobs', 'inputs', 'outputs']
         
         # genrate columns for trace file to enable viewing candidates and counter-example in a convenient way
         if call_name == 'interface_consistency':
-            if self._trace_anonymize:
-                interface_column_names = list(anonym_interface_dict['knobs'].values()) +  list(anonym_interface_dict['inputs'].values()) \
-                    + list(anonym_interface_dict['outputs'].values())
-            else:
-                interface_column_names = list(anonym_interface_dict['knobs'].keys()) +  list(anonym_interface_dict['inputs'].keys()) \
-                    + list(anonym_interface_dict['outputs'].keys())
+            interface_column_names = [n for g in groups for n in (anonym_interface_dict[g].values() if 
+                self._trace_anonymize else anonym_interface_dict[g].keys())]
             if self._trace_runtime == 0:
-                self._smlp_terms_tracer.info(','.join(['stage', 'solver'] + interface_column_names))
+                self._trace_row(['stage', 'solver'] + interface_column_names)
             else:
-                self._smlp_terms_tracer.info(','.join(['stage', 'solver', 'runtime'] + interface_column_names))
+                self._trace_row(['stage', 'solver', 'runtime'] + interface_column_names)
         
+        # values of knobs, inputs and outputs in the sat assignment, in the order of the trace columns (the order
+        # of anonymized names follows the order of original names); other variables in the domain are skipped,
+        # say variables declared per response for tree models. 
+        values = []
+        values_approx = []
         if status == 'sat':
-            assignment = {}
-            assignment_approx = {}
-            for k in sat_model.keys():
-                if k in anonym_interface_dict['knobs'].keys():
-                    name = k if not self._trace_anonymize else anonym_interface_dict['knobs'][k]
-                elif k in anonym_interface_dict['inputs'].keys():
-                    name = k if not self._trace_anonymize else anonym_interface_dict['inputs'][k]
-                elif k in anonym_interface_dict['outputs'].keys():
-                    name = k if not self._trace_anonymize else anonym_interface_dict['outputs'][k]
-                else:
-                    # TODO !!!!!!!!!!!: maybe expose tree values per response? will need to enhance function get_anonymized_interface
-                    name = None # covers case say when we have tree models and domain contain response declaration per model
-                if name is not None:
-                    assignment[name] = sat_model[k] if self._trace_precision == 0 else round(float(sat_model[k]), self._trace_precision)
-                    if approx_lemmas:
-                        assignment_approx[name] = sat_model_approx[k] if self._trace_precision == 0 else round(float(sat_model[k]), self._trace_precision)
-            
-            #print('sat_model', sat_model); print('assignment', assignment, self._trace_anonymize)
-            #print('anonym_interface_dict', anonym_interface_dict)
-            if self._trace_anonymize:
-                knob_values = [str(assignment[e]) for e in list(anonym_interface_dict['knobs'].values()) if e in assignment.keys()]
-                input_values = [str(assignment[e]) for e in list(anonym_interface_dict['inputs'].values()) if e in assignment.keys()]
-                output_values = [str(assignment[e]) for e in list(anonym_interface_dict['outputs'].values()) if e in assignment.keys()]
-                if approx_lemmas:
-                    knob_values_approx = [str(assignment_approx[e]) for e in list(anonym_interface_dict['knobs'].values()) if e in assignment.keys()]
-                    input_values_approx = [str(assignment_approx[e]) for e in list(anonym_interface_dict['inputs'].values()) if e in assignment.keys()]
-                    output_values_approx = [str(assignmentv[e]) for e in list(anonym_interface_dict['outputs'].values()) if e in assignment.keys()]
-            else:
-                knob_values = [str(assignment[e]) for e in list(anonym_interface_dict['knobs'].keys()) if e in assignment.keys()]
-                input_values = [str(assignment[e]) for e in list(anonym_interface_dict['inputs'].keys()) if e in assignment.keys()]
-                output_values = [str(assignment[e]) for e in list(anonym_interface_dict['outputs'].keys()) if e in assignment.keys()]
-                if approx_lemmas:
-                    knob_values_approx = [str(assignment_approx[e]) for e in list(anonym_interface_dict['knobs'].keys()) if e in assignment.keys()]
-                    input_values_approx = [str(assignment_approx[e]) for e in list(anonym_interface_dict['inputs'].keys()) if e in assignment.keys()]
-                    output_values_approx = [str(assignment_approx[e]) for e in list(anonym_interface_dict['outputs'].keys()) if e in assignment.keys()]
-        else:
-            knob_values = input_values = output_values = knob_values_approx = input_values_approx = output_values_approx = []
-        #print('knob_values', [type(kv) for kv in knob_values], 'input_values', [type(iv) for iv in input_values], 'output_values', [type(ov) for ov in output_values])
+            for g in groups:
+                for k in anonym_interface_dict[g].keys():
+                    if k in sat_model:
+                        values.append(sat_model[k] if self._trace_precision == 0 else 
+                            round(float(sat_model[k]), self._trace_precision))
+                        if approx_lemmas:
+                            values_approx.append(str(sat_model_approx[k]) if self._trace_precision == 0 else 
+                                round(float(sat_model[k]), self._trace_precision))
+        #print('values', values, 'values_approx', values_approx)
         if self._trace_runtime == 0:
-            self._smlp_terms_tracer.info(','.join([call_name, status] + knob_values + input_values + output_values))
+            self._trace_row([call_name, status] + values)
             if approx_lemmas and status == 'sat':
-                self._smlp_terms_tracer.info(','.join([call_name+'_approx', status] + knob_values_approx + input_values_approx + output_values_approx))
+                self._trace_row([call_name+'_approx', status] + values_approx)
         else:
             elapsed = round(end - start, self._trace_runtime)
-            self._smlp_terms_tracer.info(','.join([call_name, status, str(elapsed)] + knob_values + input_values + output_values))
+            self._trace_row([call_name, status, elapsed] + values)
             if approx_lemmas and status == 'sat':
-                self._smlp_terms_tracer.info(','.join([call_name+'_approx', status, str(elapsed)] + knob_values_approx + input_values_approx + output_values_approx))
+                self._trace_row([call_name+'_approx', status, elapsed] + values_approx)
         #if status == 'sat' and approx_lemmas:
             #print('res', type(res), res)
             #print('res.mode;', res.model, 'assignment', assignment, 'assignment_approx', assignment_approx); 
@@ -2341,7 +2911,8 @@ class ModelTerms(ScalerTerms):
     # like variables tree_i_resp that we decalre as part of domain for tree models with flat encoding).
     def get_solver_model(self, res):
         if self.solver_status_sat(res):
-            reduced_model = dict((k,v) for k,v in res.model.items() if k in self._specInst.get_spec_interface)
+            interface = set(self._specInst.get_spec_interface)
+            reduced_model = dict((k,v) for k,v in res.model.items() if k in interface)
             return reduced_model
         else:
             return None
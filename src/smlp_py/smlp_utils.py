@@ -3,6 +3,7 @@
 
 
 import os, datetime, sys, json
+import multiprocessing
 from fractions import Fraction
 from collections import OrderedDict
 from pandas import DataFrame, concat
@@ -14,7 +15,11 @@ import builtins
 
         
 NP2PY = {
+    np.int8: int,
+    np.int16: int,
+    np.int32: int,
     np.int64: int,
+    np.float32: float,
     np.float64: float,
 }
 
@@ -140,6 +145,31 @@ def response_scalers(gen, bnds):
 class SolverTimeoutError(Exception):
     pass
 '''
+# Function applied by the worker processes of parallel_map(); it is set in the parent process
+# before the workers are forked, thus it is inherited by the workers and need not be picklable.
+_PARALLEL_MAP_FUNC = None
+
+def _parallel_map_call(arg):
+    return _PARALLEL_MAP_FUNC(arg)
+
+# Apply function f to the elements of args_list using a pool of jobs worker processes and return 
+# the results in the order of args_list (independently from the order in which the jobs complete).
+# The workers are forked, therefore f can be a closure or a bound method referring to objects that
+# cannot be pickled (like smlp terms, formulas and domains); only the elements of args_list and the
+# values returned by f are sent between processes and need to be picklable. With jobs <= 1, f is
+# applied sequentially within the current process. This is also the case for calls of parallel_map() 
+# from within f in a worker process, since the (daemonic) workers cannot create worker processes.
+def parallel_map(f, args_list:list, jobs:int):
+    global _PARALLEL_MAP_FUNC
+    if jobs is None or jobs <= 1 or len(args_list) <= 1 or _PARALLEL_MAP_FUNC is not None:
+        return [f(arg) for arg in args_list]
+    _PARALLEL_MAP_FUNC = f
+    try:
+        with multiprocessing.get_context('fork').Pool(min(jobs, len(args_list))) as pool:
+            return pool.map(_parallel_map_call, args_list, chunksize=1)
+    finally:
+        _PARALLEL_MAP_FUNC = None
+
 # intersection of two lists, preserves the order in the first list but is not efficient
 def list_intersection(lst1, lst2):
     if not isinstance(lst1, list) :
@@ -235,7 +265,8 @@ def lists_union_order_preserving_without_duplicates(list_of_lists):
 def pd_df_col_is_numeric(df, col_name):
     res = np.issubdtype(df[col_name].dtype, np.number)
     if res:
-        assert df[col_name].dtype in [int, float]
+        # features might be downcast to narrower integer and float types, see SmlpData._compact_feature_dtypes()
+        assert np.issubdtype(df[col_name].dtype, np.integer) or np.issubdtype(df[col_name].dtype, np.floating)
     return res
 
 def pd_df_col_is_categorical(df, col_name):
@@ -6,12 +6,13 @@ import json
 
 import smlp
 from smlp_py.smlp_terms import ModelTerms, SmlpTerms
-from smlp_py.smlp_utils import np_JSONEncoder
+from smlp_py.smlp_utils import np_JSONEncoder, parallel_map
 
 class SmlpVerify:
     def __init__(self):
         self._smlpTermsInst = SmlpTerms()
         self._modelTermsInst = None #ModelTerms()
+        self._jobs = 1
         
         self._VACUITY_ASSERTION_NAME = 'consistency_check'
         self._DEF_ASSERTIONS_NAMES = None
@@ -44,6 +45,10 @@ class SmlpVerify:
     def set_model_terms_inst(self, model_terms_inst):
         self._modelTermsInst = model_terms_inst
     
+    # number of worker processes used to verify independent assertions
+    def set_jobs(self, jobs:int):
+        self._jobs = jobs
+    
     @property
     def assertions_results_file(self):
         assert self.report_file_prefix is not None
@@ -89,10 +94,12 @@ class SmlpVerify:
             domain:smlp.domain, alpha:smlp.form2, beta:smlp.form2, eta:smlp.form2, solver_logic:str, sat_approx=False, sat_precision=64):
         #print('asrt_forms_dict', asrt_forms_dict)
         assert list(asrt_forms_dict.keys()) == asrt_names
-        asrt_res_dict = {}
-        for i, (asrt_name, asrt_form) in enumerate(asrt_forms_dict.items()):
-            asrt_res_dict[asrt_name] = self.verify_asrt(model_full_term_dict, asrt_name, asrt_exprs[i], asrt_form, 
+        def verify_i(i):
+            asrt_name = asrt_names[i]
+            return self.verify_asrt(model_full_term_dict, asrt_name, asrt_exprs[i], asrt_forms_dict[asrt_name], 
                 domain, alpha, beta, eta, solver_logic, sat_approx, sat_precision)
+        # the assertions are independent and can be verified in parallel; results are reported in the order of asrt_names
+        asrt_res_dict = dict(zip(asrt_names, parallel_map(verify_i, list(range(len(asrt_names))), self._jobs)))
         #print('asrt_res_dict', asrt_res_dict)
         with open(self.assertions_results_file, 'w') as f: #json.dump(asrt_res_dict, f)
             json.dump(asrt_res_dict, f, indent='\t', cls=np_JSONEncoder) #cls= , use_decimal=True
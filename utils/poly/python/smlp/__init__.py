@@ -82,6 +82,15 @@ def destruct(e) -> dict:
 	"""
 	return libsmlp._dt(e)
 
+def destruct_id(e) -> int:
+	"""
+	Returns an integer identifying the node of the given term2 or form2
+	instance `e`. All occurrences of a shared sub-expression in the 'args'
+	returned by destruct() have the same identifier. It is only valid while
+	`e` is alive.
+	"""
+	return libsmlp._dt_id(e)
+
 def free_vars(e) -> set:
 	return set(libsmlp._free_vars(e))
 
@@ -91,6 +100,8 @@ def options(opts : dict = None) -> dict:
 
 	- ext_solver_cmd, same as cmd-line param -S, type str
 	- inc_solver_cmd, same as cmd-line param -I, type str
+	- race_solver_cmds, commands of external solvers that race against the
+	  default solver on every check, type list[str]
 	- intervals, same as cmd-line param -i, type int
 	- log_color, similar to cmd-line param -c, type int
 	- alg_dec_prec_approx, type int
@@ -103,6 +114,24 @@ def solver(incremental : bool, smt2_logic_str : str = None) -> solver:
 def cnst_fold(t, subst : dict = {}):
 	return libsmlp._cnst_fold(t, subst)
 
+def linear_combination(terms, coeffs, bias=0) -> term2:
+	"""
+	Returns the term2 instance corresponding to the sum of terms[i]*coeffs[i]
+	over all i, plus bias. The coefficients and bias are floats (e.g., rows of
+	a numpy array), summands with zero coefficient are left out. This is
+	equivalent to, but much faster than building the sum using '+' and '*'.
+	"""
+	return libsmlp._linear_combination(list(terms), [float(c) for c in coeffs], float(bias))
+
+def ival_eval(dom : domain, f : form2):
+	"""
+	Evaluates the formula f on all points of the domain dom using interval
+	arithmetic in double precision with correct rounding. Returns True (False)
+	if f holds (does not hold) on all points of dom, and None if this cannot
+	be decided using interval arithmetic.
+	"""
+	return libsmlp._ival_eval(dom, f)
+
 def component(ty : libsmlp.type, *, interval=None, grid=None) -> component:
 	assert interval is None or grid is None
 	if interval is not None:
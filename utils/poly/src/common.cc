@@ -80,6 +80,7 @@ Module smlp::mod_par  { "par" ,          CSI COL_FG_B COL_MAGENTA "m" };
 int solver::alg_dec_prec_approx = 10;
 opt<str> smlp::ext_solver_cmd;
 opt<str> smlp::inc_solver_cmd;
+vec<str> smlp::race_solver_cmds;
 long  smlp::intervals = -1;
 
 #define STR(x)	#x
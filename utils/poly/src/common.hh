@@ -267,6 +267,7 @@ extern Module mod_smlp, mod_cand, mod_coex, mod_par;
 
 extern opt<str> ext_solver_cmd;
 extern opt<str> inc_solver_cmd;
+extern vec<str> race_solver_cmds;
 extern long intervals;
 
 void set_loglvl(char *arg);
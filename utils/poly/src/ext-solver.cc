@@ -33,6 +33,22 @@ struct Pipe {
 }
 
 process::process(const char *cmd)
+{
+	spawn(cmd);
+}
+
+process::~process()
+{
+	reap();
+}
+
+void process::restart(const char *cmd)
+{
+	reap();
+	spawn(cmd);
+}
+
+void process::spawn(const char *cmd)
 {
 	Pipe i, o/*, e*/;
 	pid = fork();
@@ -63,7 +79,7 @@ process::process(const char *cmd)
 	// err = move(e.rd);
 }
 
-process::~process()
+void process::reap()
 {
 	if (pid == -1)
 		return;
@@ -78,6 +94,7 @@ process::~process()
 	}
 	log(mod_ext, WEXITSTATUS(status) ? WARN : NOTE,
 	    "child %d exited with code %d\n", pid, WEXITSTATUS(status));
+	pid = -1;
 }
 
 str ext_solver::get_info(const char *what)
@@ -99,6 +116,14 @@ str ext_solver::get_info(const char *what)
 ext_solver::ext_solver(const char *cmd, const char *logic)
 : process(cmd)
 , out_s((ungetc(' ', out), out))
+, cmd(cmd)
+{
+	if (logic)
+		this->logic = logic;
+	init();
+}
+
+void ext_solver::init()
 {
 	setvbuf(in, NULL, _IOLBF, 0);
 
@@ -120,14 +145,39 @@ ext_solver::ext_solver(const char *cmd, const char *logic)
 	if (name != "ksmt")
 		fprintf(in, "(set-option :produce-models true)\n");
 	if (logic)
-		fprintf(in, "(set-logic %s)\n", logic);
+		fprintf(in, "(set-logic %s)\n", logic->c_str());
+}
+
+/* Replaces the killed process by a new one in the state the old one was in
+ * before the interrupted check(). */
+void ext_solver::restart()
+{
+	note(mod_ext, "restarting interrupted ext-solver pid %d\n", pid);
+	process::restart(cmd.c_str());
+	out_s = es::smtlib2::parser((ungetc(' ', out), out));
+	init();
+	if (dom)
+		dump_smt2(in, *dom);
+	for (size_t i=0; i<size(asserted); i++) {
+		if (i)
+			fprintf(in, "(push 1)\n");
+		for (const sptr<form2> &f : asserted[i]) {
+			fprintf(in, "(assert ");
+			dump_smt2(in, *f);
+			fprintf(in, ")\n");
+		}
+	}
+	interrupted = false;
 }
 
 void ext_solver::declare(const domain &d)
 {
+	if (interrupted)
+		restart();
 	assert(!n_vars);
 	dump_smt2(in, d);
 	n_vars = size(d);
+	dom = d;
 }
 
 static bool matches(const es::arg &a, const std::string_view &v)
@@ -483,11 +533,16 @@ result ext_solver::check()
 	using es::arg;
 	using es::sexpr;
 
+	if (interrupted)
+		restart();
+
 	note(mod_ext,"solving...\n");
 	timing t;
 
 	fprintf(in, "(check-sat)\n");
 	out_s.skip_space();
+	if (interrupted)
+		return unknown { "interrupted" };
 	if (out_s.c == '(') {
 		opt<sexpr> e = out_s.compound();
 		assert(e);
@@ -499,6 +554,8 @@ result ext_solver::check()
 	}
 
 	opt<slit> res = out_s.atom();
+	if (!res && interrupted)
+		return unknown { "interrupted" };
 	assert(res);
 	note(mod_ext,"solved '%s' in %5.3fs\n", res->c_str(), (double)(timing {} - t));
 	if (*res == "unsat")
@@ -512,6 +569,8 @@ result ext_solver::check()
 	if (name == "Yices") {
 		for (size_t i=0; i<n_vars; i++) {
 			opt<sexpr> n = out_s.next();
+			if (!n && interrupted)
+				return unknown { "interrupted" };
 			assert(n);
 			assert(size(*n) == 3);
 			auto [it,ins] = m.insert(parse_smt2_asgn(*n));
@@ -520,6 +579,8 @@ result ext_solver::check()
 		return sat { move(m) };
 	}
 	opt<sexpr> no = out_s.next();
+	if (!no && interrupted)
+		return unknown { "interrupted" };
 	assert(no);
 	const sexpr &n = *no;
 	size_t off = 0;
@@ -538,7 +599,35 @@ result ext_solver::check()
 
 void ext_solver::add(const sptr<form2> &f)
 {
+	if (interrupted)
+		restart();
 	fprintf(in, "(assert ");
 	dump_smt2(in, *f);
 	fprintf(in, ")\n");
+	asserted.back().push_back(f);
+}
+
+void ext_solver::push()
+{
+	if (interrupted)
+		restart();
+	fprintf(in, "(push 1)\n");
+	asserted.emplace_back();
+}
+
+void ext_solver::pop()
+{
+	if (interrupted)
+		restart();
+	assert(size(asserted) > 1);
+	fprintf(in, "(pop 1)\n");
+	asserted.pop_back();
+}
+
+void ext_solver::interrupt()
+{
+	if (interrupted.exchange(true))
+		return;
+	note(mod_ext, "interrupting ext-solver pid %d\n", pid);
+	kill(pid, SIGKILL);
 }
@@ -10,6 +10,8 @@
 
 #include <es/smtlib2-parser.hh>
 
+#include <atomic>
+
 namespace smlp {
 
 struct process {
@@ -19,6 +21,14 @@ struct process {
 
 	explicit process(const char *cmd);
 	~process();
+
+protected:
+	/* Terminates the current child and starts 'cmd' in its place. */
+	void restart(const char *cmd);
+
+private:
+	void spawn(const char *cmd);
+	void reap();
 };
 
 struct split_version : protected vec<int> {
@@ -77,20 +87,36 @@ struct split_version : protected vec<int> {
 	}
 };
 
-struct ext_solver : process, solver {
+struct ext_solver : process, solver, interruptible {
 
 	explicit ext_solver(const char *cmd, const char *logic = nullptr);
 	void declare(const domain &d) override;
 	void add(const sptr<form2> &f) override;
 	result check() override;
+	void push() override;
+	void pop() override;
+
+	/* Terminates the solver process. Before it is used again, the solver is
+	 * restarted and the declarations and assertions are replayed. */
+	void interrupt() override;
 
 private:
+	std::atomic<bool> interrupted = false;
+
 	es::smtlib2::parser out_s;
 	str name, version;
 	split_version parsed_version;
 	size_t n_vars = 0;
 
+	/* what is needed to restart the solver after it has been interrupted */
+	str cmd;
+	opt<str> logic;
+	opt<domain> dom;
+	vec<vec<sptr<form2>>> asserted = vec<vec<sptr<form2>>>(1);
+
 	str get_info(const char *what);
+	void init();
+	void restart();
 
 	pair<hmap<size_t,kay::Q>,ival>
 	parse_algebraic_z3(const str &var, const es::arg &p, const es::slit &n);
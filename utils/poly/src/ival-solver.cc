@@ -195,15 +195,10 @@ static dbl::ival to_ival(const kay::Q &q)
 	return dbl::ival(q);
 }
 
-opt<pair<double,double>>
-smlp::dbl_interval_eval(const domain &dom, const sptr<term2> &t)
+/* Replace the domain with intervals in c, collect discrete vars in d */
+static void to_dbl_domain(const domain &dom, hmap<str,dbl::ival> &c,
+                          vec<pair<str,vec<dbl::ival>>> &d)
 {
-	/* need directed rounding downward for dbl::ival */
-	dbl::rounding_mode rnd(FE_DOWNWARD);
-
-	/* Replace the domain with intervals, collect discrete vars in d */
-	hmap<str,dbl::ival> c;
-	vec<pair<str,vec<dbl::ival>>> d;
 	for (const auto &[var,k] : dom)
 		k.range.match(
 		[&,var=var](const entire &) {
@@ -222,6 +217,17 @@ smlp::dbl_interval_eval(const domain &dom, const sptr<term2> &t)
 			});
 		}
 		);
+}
+
+opt<pair<double,double>>
+smlp::dbl_interval_eval(const domain &dom, const sptr<term2> &t)
+{
+	/* need directed rounding downward for dbl::ival */
+	dbl::rounding_mode rnd(FE_DOWNWARD);
+
+	hmap<str,dbl::ival> c;
+	vec<pair<str,vec<dbl::ival>>> d;
+	to_dbl_domain(dom, c, d);
 
 	opt<dbl::ival> r;
 	forall_products(d, c, [&r,&t](const hmap<str,dbl::ival> &dom) {
@@ -234,6 +240,26 @@ smlp::dbl_interval_eval(const domain &dom, const sptr<term2> &t)
 	return {};
 }
 
+opt<bool> smlp::dbl_interval_eval(const domain &dom, const sptr<form2> &f)
+{
+	/* need directed rounding downward for dbl::ival */
+	dbl::rounding_mode rnd(FE_DOWNWARD);
+
+	hmap<str,dbl::ival> c;
+	vec<pair<str,vec<dbl::ival>>> d;
+	to_dbl_domain(dom, c, d);
+
+	opt<res> r;
+	forall_products(d, c, [&r,&f](const hmap<str,dbl::ival> &dom) {
+		hmap<void *,dbl::ival> m;
+		res s = eval(dom, *f, m);
+		r = !r || *r == s ? s : MAYBE;
+	});
+	if (!r || *r == MAYBE)
+		return {};
+	return *r == YES;
+}
+
 static res eval(const hmap<str,dbl::ival> &dom, const form2 &f)
 {
 	hmap<void *,dbl::ival> m;
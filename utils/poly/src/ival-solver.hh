@@ -29,6 +29,12 @@ namespace smlp {
 opt<pair<double,double>>
 dbl_interval_eval(const domain &dom, const sptr<term2> &t);
 
+/* Interval evaluation of the formula f on the domain dom, see above. The result
+ * is true (false) if f holds (does not hold) on all points of dom, and it is
+ * empty if this could not be decided using interval arithmetic or if the
+ * domain is empty. */
+opt<bool> dbl_interval_eval(const domain &dom, const sptr<form2> &f);
+
 struct crit_solver : acc_solver {
 
 	result check() const override { return check(dom, make2f(asserts)); }
@@ -12,6 +12,7 @@
 #include "nn.hh"
 #include "poly.hh"
 #include "solver.hh"
+#include "ival-solver.hh"
 
 using namespace smlp;
 using namespace reals::eager;
@@ -28,6 +29,28 @@ static sptr<term2> mk_uop2(sptr<term2> a)
 	return make2t(uop2 { op, move(a) });
 }
 
+/* Returns the term sum_i ts[i]*cs[i] + bias, where ts is a sequence of term2
+ * and cs a sequence of floats of the same length. Summands with a zero
+ * coefficient are left out. */
+static sptr<term2> linear_combination(boost::python::object ts,
+                                      boost::python::object cs, double bias)
+{
+	using boost::python::extract;
+	ssize_t n = len(ts);
+	if (len(cs) != n)
+		throw std::invalid_argument("linear_combination: lengths of terms and coefficients differ");
+	sptr<term2> r;
+	for (ssize_t i=0; i<n; i++) {
+		double c = extract<double>(cs[i]);
+		if (c == 0)
+			continue;
+		sptr<term2> m = make2t(bop2 { bop2::MUL, extract<sptr<term2>>(ts[i]), make2t(cnst2 { kay::Q(c) }) });
+		r = r ? make2t(bop2 { bop2::ADD, move(r), move(m) }) : move(m);
+	}
+	sptr<term2> b = make2t(cnst2 { kay::Q(bias) });
+	return r ? make2t(bop2 { bop2::ADD, move(r), move(b) }) : b;
+}
+
 static sptr<term2> mk_ite(sptr<form2> c, sptr<term2> y, sptr<term2> n)
 {
 	return make2t(ite2 { move(c), move(y), move(n) });
@@ -159,6 +182,14 @@ static boost::python::dict dt_form(sptr<form2> f)
 	return r;
 }
 
+/* Identity of the node shared by all references to the same (sub-)expression,
+ * valid while the expression is alive. */
+template <typename T>
+static uintptr_t dt_id(const sptr<T> &e)
+{
+	return reinterpret_cast<uintptr_t>(e.get());
+}
+
 static kay::Q _mk_Q_F(double d) { return kay::Q(d); }
 static boost::python::object _mk_Q_Z(str s)
 {
@@ -270,6 +301,11 @@ static boost::python::dict options(boost::python::object o)
 					inc_solver_cmd.reset();
 				else
 					inc_solver_cmd = extract<str>(v);
+			} else if (k == "race_solver_cmds") {
+				race_solver_cmds.clear();
+				if (!v.is_none())
+					for (ssize_t j=0; j<len(v); j++)
+						race_solver_cmds.push_back(extract<str>(v[j]));
 			} else if (k == "intervals")
 				intervals = extract<decltype(intervals)>(v);
 			else if (k == "log_color")
@@ -290,6 +326,12 @@ static boost::python::dict options(boost::python::object o)
 		r[boost::python::str("ext_solver_cmd")] = boost::python::str(*ext_solver_cmd);
 	if (inc_solver_cmd)
 		r[boost::python::str("inc_solver_cmd")] = boost::python::str(*inc_solver_cmd);
+	if (!empty(race_solver_cmds)) {
+		boost::python::list l;
+		for (const str &c : race_solver_cmds)
+			l.append(boost::python::str(c));
+		r[boost::python::str("race_solver_cmds")] = l;
+	}
 	r[boost::python::str("intervals")] = boost::python::long_(intervals);
 	r[boost::python::str("log_color")] = boost::python::long_(Module::log_color ? 1 : 0);
 	r[boost::python::str("alg_dec_prec_approx")] = boost::python::long_(solver::alg_dec_prec_approx);
@@ -311,6 +353,28 @@ static void solver_add(const sptr<solver> &s, const sptr<form2> &f)
 	return s->add(f);
 }
 
+static void solver_push(const sptr<solver> &s)
+{
+	return s->push();
+}
+
+static void solver_pop(const sptr<solver> &s)
+{
+	return s->pop();
+}
+
+/* name of the solver that won the race in the last check(), None if s
+ * does not race solvers or none of them returned sat or unsat */
+static boost::python::object solver_winner(const sptr<solver> &s)
+{
+	const solver_race *r = dynamic_cast<const solver_race *>(s.get());
+	if (const solver_seq *q = dynamic_cast<const solver_seq *>(s.get()))
+		r = dynamic_cast<const solver_race *>(q->solvers.back().second.get());
+	if (!r || empty(r->winner()))
+		return boost::python::object();
+	return boost::python::str(r->winner());
+}
+
 static auto solver_check(const sptr<solver> &s)
 {
 	using boost::python::object;
@@ -332,6 +396,13 @@ static str Q_str(const kay::Q &q)
 	return kay::to_string(q);
 }
 
+static boost::python::object ival_eval(const domain &dom, const sptr<form2> &f)
+{
+	if (opt<bool> r = dbl_interval_eval(dom, f))
+		return boost::python::object(*r);
+	return {};
+}
+
 static component mk_component_entire(type ty)
 {
 	return component { entire {}, ty };
@@ -546,8 +617,11 @@ Note: The Python keyword 'not' is not defined for form2 expressions, use '~'."
 	def("_dt_cnst", dt_cnst_form);
 	def("_dt", dt_term);
 	def("_dt", dt_form);
+	def("_dt_id", dt_id<term2>);
+	def("_dt_id", dt_id<form2>);
 
 	def("Ite", mk_ite);
+	def("_linear_combination", linear_combination);
 	def("Var", mk_name);
 
 	def("true" , (sptr<form2>(*)())[]() -> sptr<form2> { return true2; });
@@ -626,6 +700,7 @@ Note: The Python keyword 'not' is not defined for form2 expressions, use '~'."
 	def("_mk_component_entire", mk_component_entire);
 	def("_mk_component_ival", mk_component_ival);
 	def("_mk_component_list", mk_component_list);
+	def("_ival_eval", ival_eval);
 
 /*
 	class_<kay::Z>("Z", init<signed long>())
@@ -679,6 +754,9 @@ Note: The Python keyword 'not' is not defined for form2 expressions, use '~'."
 		.def("declare", solver_declare_dict)
 		.def("add", solver_add)
 		.def("check", solver_check)
+		.def("push", solver_push)
+		.def("pop", solver_pop)
+		.def("winner", solver_winner)
 		;
 	def("_mk_solver", _mk_solver);
 
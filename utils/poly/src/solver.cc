@@ -16,9 +16,15 @@
 # include "z3-solver.hh"
 #endif
 
+#include <thread>
+#include <mutex>
+#include <condition_variable>
+
+#include <signal.h>   /* pthread_sigmask() */
+
 using namespace smlp;
 
-interruptible *interruptible::is_active;
+thread_local interruptible *interruptible::is_active;
 
 // template <typename T>
 str smlp::smt2_logic_str(const domain &dom, const sptr<form2> &e)
@@ -64,16 +70,98 @@ uptr<solver> smlp::mk_solver0(bool incremental, const char *logic)
 	return mk_solver0_(incremental, logic).second;
 }
 
+/* The default solver and, if race_solver_cmds is not empty, an external
+ * solver for each of these commands, racing against each other. */
+static pair<const Module *,uptr<solver>> mk_solver1_(bool incremental, const char *logic)
+{
+	auto [m,s] = mk_solver0_(incremental, logic);
+	if (empty(race_solver_cmds))
+		return { m, move(s) };
+#ifdef SMLP_ENABLE_EXT_SOLVER
+	vec<pair<str,uptr<solver>>> slvs;
+	const char *ext = ext_solver_cmd ? ext_solver_cmd->c_str() : nullptr;
+	const char *inc = inc_solver_cmd ? inc_solver_cmd->c_str() : nullptr;
+	const char *cmd = (inc && ext ? incremental : !ext) ? inc : ext;
+	slvs.emplace_back(cmd ? str(cmd) : str(m->name), move(s));
+	for (const str &c : race_solver_cmds)
+		slvs.emplace_back(c, std::make_unique<ext_solver>(c.c_str(), logic));
+	return { &mod_par, std::make_unique<solver_race>(move(slvs)) };
+#else
+	MDIE(mod_smlp,1,"racing external solvers requires support for "
+	                "external solvers\n");
+#endif
+}
+
 uptr<solver> smlp::mk_solver(bool incremental, const char *logic)
 {
 	if (intervals >= 0) {
 		vec<pair<const Module *,uptr<solver>>> slvs;
 		slvs.emplace_back(&mod_ival, std::make_unique<ival_solver>(intervals, logic));
 		slvs.emplace_back(&mod_crit, std::make_unique<crit_solver>());
-		slvs.emplace_back(mk_solver0_(incremental, logic));
+		slvs.emplace_back(mk_solver1_(incremental, logic));
 		return std::make_unique<solver_seq>(move(slvs));
 	}
-	return smlp::mk_solver0(incremental, logic);
+	return mk_solver1_(incremental, logic).second;
+}
+
+result solver_race::check()
+{
+	std::mutex mtx;
+	std::condition_variable cv;
+	vec<opt<result>> results(size(solvers));
+	opt<size_t> first;
+	size_t n_done = 0;
+
+	/* SIGINT and SIGALRM are handled in this thread: they interrupt all
+	 * solvers of the race, not just the one running in some worker */
+	interruptible *prev_active = interruptible::is_active;
+	interruptible::is_active = this;
+
+	vec<std::thread> threads;
+	for (size_t i=0; i<size(solvers); i++)
+		threads.emplace_back([&,i]{
+			sigset_t set;
+			sigemptyset(&set);
+			sigaddset(&set, SIGINT);
+			sigaddset(&set, SIGALRM);
+			pthread_sigmask(SIG_BLOCK, &set, NULL);
+			result r = solvers[i].second->check();
+			std::lock_guard<std::mutex> g(mtx);
+			if (!first && !r.get<unknown>())
+				first = i;
+			results[i] = move(r);
+			n_done++;
+			cv.notify_one();
+		});
+	{
+		std::unique_lock<std::mutex> g(mtx);
+		cv.wait(g, [&]{ return first || n_done == size(solvers); });
+		for (size_t i=0; i<size(solvers); i++)
+			if (!results[i])
+				if (interruptible *p = dynamic_cast<interruptible *>(solvers[i].second.get()))
+					p->interrupt();
+	}
+	for (std::thread &t : threads)
+		t.join();
+	interruptible::is_active = prev_active;
+
+	if (!first) {
+		last_winner.clear();
+		for (size_t i=0; i<size(solvers); i++)
+			info(mod_par,"%s: unknown: %s\n", solvers[i].first.c_str(),
+			     results[i]->get<unknown>()->reason.c_str());
+		return move(*results.back());
+	}
+	last_winner = solvers[*first].first;
+	note(mod_par,"solver '%s' won the race\n", last_winner.c_str());
+	return move(*results[*first]);
+}
+
+void solver_race::interrupt()
+{
+	for (const auto &[n,s] : solvers)
+		if (interruptible *p = dynamic_cast<interruptible *>(s.get()))
+			p->interrupt();
 }
 
 solver::all_solutions_iter_owned
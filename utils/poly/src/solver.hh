@@ -27,6 +27,11 @@ struct solver {
 	virtual void add(const sptr<form2> &f) = 0;
 	virtual result check() = 0;
 
+	/* Open / close an assertion scope: all formulas added after push()
+	 * are removed again by the matching pop(). */
+	virtual void push() = 0;
+	virtual void pop() = 0;
+
 	class all_solutions_iter {
 
 		friend all_solutions_iter all_solutions(solver &s);
@@ -136,9 +141,18 @@ struct acc_solver : solver {
 	result check() override { return static_cast<const acc_solver *>(this)->check(); }
 	virtual result check() const = 0;
 
+	void push() override { scopes.push_back(size(asserts.args)); }
+	void pop() override
+	{
+		assert(!empty(scopes));
+		asserts.args.resize(scopes.back());
+		scopes.pop_back();
+	}
+
 protected:
 	domain dom;
 	lbop2 asserts = { lbop2::AND, {} };
+	vec<size_t> scopes;
 };
 
 str smt2_logic_str(const domain &dom, const sptr<form2> &e);
@@ -167,6 +181,18 @@ struct solver_seq : solver {
 			s->add(f);
 	}
 
+	void push() override
+	{
+		for (const auto &[m,s] : solvers)
+			s->push();
+	}
+
+	void pop() override
+	{
+		for (const auto &[m,s] : solvers)
+			s->pop();
+	}
+
 	result check() override
 	{
 		result r = unknown { "solver sequence is empty" };
@@ -186,7 +212,60 @@ struct interruptible {
 	virtual ~interruptible() = default;
 	virtual void interrupt() = 0;
 
-	static interruptible *is_active;
+	/* The check() running in this thread. Signal handlers run in the main
+	 * thread, as solver_race blocks signals in its worker threads. */
+	static thread_local interruptible *is_active;
+};
+
+/* Runs check() of all solvers concurrently, each in its own thread, and
+ * returns the first definitive (sat or unsat) result. Solvers still running
+ * at that point are interrupted if they support it. All solvers get the same
+ * declarations and assertions. */
+struct solver_race : solver, interruptible {
+
+	const vec<pair<str,uptr<solver>>> solvers;
+
+	explicit solver_race(vec<pair<str,uptr<solver>>> solvers)
+	: solvers(move(solvers))
+	{ assert(!empty(this->solvers)); }
+
+	void declare(const domain &d) override
+	{
+		for (const auto &[n,s] : solvers)
+			s->declare(d);
+	}
+
+	void add(const sptr<form2> &f) override
+	{
+		for (const auto &[n,s] : solvers)
+			s->add(f);
+	}
+
+	void push() override
+	{
+		for (const auto &[n,s] : solvers)
+			s->push();
+	}
+
+	void pop() override
+	{
+		for (const auto &[n,s] : solvers)
+			s->pop();
+	}
+
+	result check() override;
+
+	/* Interrupts all solvers of the running check(). */
+	void interrupt() override;
+
+	/* name of the solver that delivered the result of the last check(),
+	 * empty if none of the solvers returned sat or unsat */
+	const str & winner() const { return last_winner; }
+
+private:
+	str last_winner;
 };
 
+
+
 }
@@ -24,6 +24,9 @@ struct z3_solver : solver, interruptible {
 		slv.add(interp(f, m));
 	}
 
+	void push() override { slv.push(); }
+	void pop() override { slv.pop(); }
+
 private:
 	z3::context ctx;
 	z3::solver slv;